@@ -0,0 +1,163 @@
+import os
+import pickle
+import shutil
+import argparse
+from collections import OrderedDict
+from collections.abc import Mapping
+from urllib.parse import quote
+
+# 分片格式版本，格式变化时递增，旧版本目录会被重新切分
+SHARD_VERSION = 1
+
+# 合并批次文件对应的分片目录后缀，例如 data/merged_batch.pkl.shards/
+SHARD_SUFFIX = '.shards'
+
+INDEX_FILE = 'index.pkl'
+
+
+def shard_dir_for(batch_path):
+    """合并批次pkl文件默认的分片目录"""
+    return batch_path + SHARD_SUFFIX
+
+
+def load_index(shard_dir):
+    """读取分片目录的索引"""
+    with open(os.path.join(shard_dir, INDEX_FILE), 'rb') as f:
+        return pickle.load(f)
+
+
+def is_up_to_date(batch_path, shard_dir):
+    """分片目录是否已由当前版本从未修改过的合并批次文件切分得到"""
+    if not os.path.exists(os.path.join(shard_dir, INDEX_FILE)):
+        return False
+    try:
+        index = load_index(shard_dir)
+    except Exception:
+        return False
+    stat = os.stat(batch_path)
+    return (index.get('version') == SHARD_VERSION
+            and index.get('source_size') == stat.st_size
+            and index.get('source_mtime_ns') == stat.st_mtime_ns)
+
+
+def describe_cell(cell):
+    """索引中记录的电池信息：周期数（MIT数据为cycles中的周期数）"""
+    cycles = cell.get('cycles') if isinstance(cell, dict) else None
+    return {'n_cycles': len(cycles) if cycles is not None else None}
+
+
+def shard_batch(batch_path, shard_dir=None, force=False):
+    """把合并批次pkl（{电池名: 电池数据}）切分为每颗电池一个pkl文件，另存索引
+
+    索引记录电池名（保持原字典顺序和键类型）、对应的分片文件、文件大小和周期数，以及源文件的大小和修改时间。
+    写入临时目录后整体改名，中断时不会留下不完整的分片。返回分片目录。
+    """
+    shard_dir = shard_dir or shard_dir_for(batch_path)
+    if not force and is_up_to_date(batch_path, shard_dir):
+        print(f"分片已是最新: {shard_dir}")
+        return shard_dir
+
+    print(f"读取 {batch_path} ...")
+    with open(batch_path, 'rb') as f:
+        batch = pickle.load(f)
+    if not isinstance(batch, dict):
+        raise ValueError("合并批次文件应为 {电池名: 电池数据} 字典")
+
+    tmp_dir = shard_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    cells = []
+    for position, key in enumerate(list(batch)):
+        # 序号前缀保证文件名唯一且按原顺序排列
+        filename = f"{position:05d}_{quote(str(key), safe='')}.pkl"
+        cell = batch.pop(key)
+        with open(os.path.join(tmp_dir, filename), 'wb') as f:
+            pickle.dump(cell, f, protocol=pickle.HIGHEST_PROTOCOL)
+        entry = {'key': key, 'file': filename, 'size': os.path.getsize(os.path.join(tmp_dir, filename))}
+        entry.update(describe_cell(cell))
+        cells.append(entry)
+        # 已写出的电池立即释放
+        del cell
+        print(f"{key}: {entry['n_cycles']} 个周期，{entry['size']} 字节")
+
+    stat = os.stat(batch_path)
+    index = {
+        'version': SHARD_VERSION,
+        'source': batch_path,
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'cells': cells,
+    }
+    with open(os.path.join(tmp_dir, INDEX_FILE), 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.replace(tmp_dir, shard_dir)
+    print(f"切分完成: {len(cells)} 颗电池，保存到 {shard_dir}")
+    return shard_dir
+
+
+class ShardedBatch(Mapping):
+    """分片后的合并批次，与原字典相同的只读映射接口：电池在被访问时才读取
+
+    遍历keys()或检查 in 不读取任何分片；items()/values()逐个读取，只保留最近访问的cache_size颗电池。
+    """
+
+    def __init__(self, shard_dir, cache_size=1):
+        self.shard_dir = shard_dir
+        self.index = load_index(shard_dir)
+        self._entries = {entry['key']: entry for entry in self.index['cells']}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        entry = self._entries[key]
+        with open(os.path.join(self.shard_dir, entry['file']), 'rb') as f:
+            cell = pickle.load(f)
+        if self.cache_size > 0:
+            self._cache[key] = cell
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return cell
+
+    def info(self, key):
+        """索引中记录的电池信息（分片文件、大小、周期数），不读取分片"""
+        return dict(self._entries[key])
+
+    def clear_cache(self):
+        self._cache.clear()
+
+
+def open_batch(path, cache_size=1):
+    """打开合并批次：分片目录或已有最新分片的pkl文件返回ShardedBatch，否则整体反序列化pkl"""
+    if os.path.isdir(path):
+        return ShardedBatch(path, cache_size)
+    shard_dir = shard_dir_for(path)
+    if is_up_to_date(path, shard_dir):
+        return ShardedBatch(shard_dir, cache_size)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把合并批次pkl切分为每颗电池一个文件，按需读取")
+    parser.add_argument("batch_path", nargs='?', default="./data/merged_batch.pkl", help="合并批次pkl文件")
+    parser.add_argument("--output", default=None, help="分片目录，默认为 <batch_path>.shards")
+    parser.add_argument("--force", action="store_true", help="忽略已有分片，重新切分")
+    args = parser.parse_args()
+    shard_batch(args.batch_path, args.output, force=args.force)
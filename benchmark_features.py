@@ -0,0 +1,159 @@
+import os
+import csv
+import json
+import time
+import argparse
+import warnings
+import numpy as np
+from cycle_view import CycleView
+from feature_utils import calculate_hausdorff_distance_single_segment
+from elbows import compare_elbows, find_elbows, kneed_elbows
+from synthetic_battery import make_battery
+from isu_all_features import ISU_FEATURE_GROUPS
+from matr_all_features import MATR_FEATURE_GROUPS
+
+# 电池规模：(名称, 周期数, 每周期采样点数)
+BATTERY_SIZES = [
+    ('small', 110, 200),
+    ('medium', 300, 500),
+    ('large', 1000, 1000),
+]
+
+# 豪斯多夫距离的段长度（点数）
+HAUSDORFF_SIZES = [100, 1000, 5000, 20000]
+
+# 拐点检测的曲线条数（每条40个点，与F57的CC充电起始段相同）
+ELBOW_COUNTS = [10, 100, 1000]
+
+# 拐点曲线的电压噪声标准差(V)：2e-4为低噪声，1e-3、3e-3接近实测的稀疏采样电压
+ELBOW_NOISES = [2e-4, 1e-3, 3e-3]
+
+# 基准中平滑拐点曲线的滑动平均窗口（点数）
+ELBOW_SMOOTH_WINDOW = 5
+
+
+def time_call(fn, repeat, setup=None):
+    """重复调用repeat次，返回最短耗时(s)和最后一次的返回值；setup在每次计时前调用，其结果作为fn的参数"""
+    best = np.inf
+    result = None
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        result = fn(arg) if setup is not None else fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_groups(sizes, repeat=3, formats=('isu', 'matr')):
+    """逐个特征组计时，每次计时使用新的周期视图，包含该组自己的数组转换开销"""
+    group_sets = {'isu': ISU_FEATURE_GROUPS, 'matr': MATR_FEATURE_GROUPS}
+    records = []
+    for fmt in formats:
+        for size_name, n_cycles, samples in sizes:
+            battery = make_battery(fmt, n_cycles, samples, seed=0)
+            for name, calculate, _ in group_sets[fmt]:
+                seconds, _ = time_call(calculate, repeat, setup=lambda: CycleView(battery))
+                records.append({'benchmark': f"{fmt} {name}", 'size': size_name,
+                                'cycles': n_cycles, 'samples': samples, 'seconds': seconds})
+                print(f"{fmt:5s} {name:8s} {size_name:7s} ({n_cycles}周期×{samples}点): {seconds * 1000:10.2f} ms")
+    return records
+
+
+def benchmark_hausdorff(sizes, repeat=3):
+    """豪斯多夫距离在不同段长度下的耗时，段为放电曲线形状的(时间, 电压)二维点"""
+    rng = np.random.default_rng(0)
+    records = []
+    for n in sizes:
+        x = np.linspace(0, 1, n)
+        segment = np.column_stack([x * 3600, 3.6 - 0.4 * x - 1.2 * x ** 6 + rng.normal(0, 1e-4, n)])
+        seconds, _ = time_call(lambda: calculate_hausdorff_distance_single_segment(segment), repeat)
+        records.append({'benchmark': 'hausdorff', 'size': n, 'cycles': None, 'samples': n, 'seconds': seconds})
+        print(f"hausdorff {n:6d}点: {seconds * 1000:10.2f} ms")
+    return records
+
+
+def elbow_curves(n, n_points=40, noise=2e-4, seed=0):
+    """CC充电起始段形状的(时间, 电压)曲线：电压先快速上升再趋于平缓，时间常数随机，噪声标准差为noise(V)"""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 20, n_points)
+    curves = []
+    for _ in range(n):
+        tau = rng.uniform(1, 5)
+        v = 3.3 + 0.3 * (1 - np.exp(-t / tau)) + 0.002 * t + rng.normal(0, noise, n_points)
+        curves.append((t, v))
+    return curves
+
+
+def smooth_moving_average(y, window=ELBOW_SMOOTH_WINDOW):
+    """两端按边界值延拓的滑动平均，代替F57中utils.smooth_curve的平滑步骤"""
+    pad = window // 2
+    padded = np.pad(np.asarray(y, dtype=np.float64), (pad, window - 1 - pad), mode='edge')
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+
+def benchmark_elbows(counts, repeat=3, noises=ELBOW_NOISES):
+    """批量拐点检测与逐条KneeLocator的耗时，并报告两者拐点下标的一致比例（未安装kneed时只计时前者）
+
+    每种噪声水平分别在原始曲线和平滑后的曲线上比较。find_elbows只在差值曲线的全局最大值处取拐点，
+    不做KneeLocator的局部极大值阈值判断，两者只在平滑后的曲线上一致；噪声接近实测水平（1e-3 V以上）时，
+    原始曲线上的一致比例明显下降，噪声更大时平滑后也会残留少量差异。
+    F57在get_elbow_curve中先平滑再找拐点，正是这一步保证了与KneeLocator等价。
+    """
+    records = []
+    for noise in noises:
+        for smoothed in (False, True):
+            label = f"noise={noise:g} {'smoothed' if smoothed else 'raw'}"
+            for n in counts:
+                curves = elbow_curves(n, noise=noise)
+                if smoothed:
+                    curves = [(t, smooth_moving_average(v)) for t, v in curves]
+                seconds, found = time_call(lambda: find_elbows(curves), repeat)
+                records.append({'benchmark': f"elbows {label}", 'size': n, 'cycles': None, 'samples': 40,
+                                'seconds': seconds})
+                line = f"elbows {label:22s} {n:6d}条: {seconds * 1000:10.2f} ms"
+                try:
+                    kneed_seconds, reference = time_call(lambda: kneed_elbows(curves), repeat)
+                except ImportError:
+                    print(line + "（未安装kneed，不与KneeLocator比较）")
+                    continue
+                records.append({'benchmark': f"kneelocator {label}", 'size': n, 'cycles': None, 'samples': 40,
+                                'seconds': kneed_seconds})
+                stats = compare_elbows(found, reference)
+                print(line + f"，KneeLocator {kneed_seconds * 1000:10.2f} ms，"
+                             f"一致 {stats['agree']}/{stats['curves']}，最大下标差 {stats['max_index_diff']}")
+    return records
+
+
+def save_records(records, output_path):
+    """按扩展名保存为.json或.csv"""
+    if os.path.splitext(output_path)[1].lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        return
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['benchmark', 'size', 'cycles', 'samples', 'seconds'])
+        writer.writeheader()
+        writer.writerows(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在合成电池数据上对各特征组和豪斯多夫距离计时，不需要data目录")
+    parser.add_argument("--sizes", nargs='+', default=[name for name, _, _ in BATTERY_SIZES],
+                        choices=[name for name, _, _ in BATTERY_SIZES], help="电池规模")
+    parser.add_argument("--formats", nargs='+', default=['isu', 'matr'], choices=['isu', 'matr'], help="数据集格式")
+    parser.add_argument("--hausdorff-sizes", nargs='+', type=int, default=HAUSDORFF_SIZES, help="豪斯多夫距离的段长度")
+    parser.add_argument("--elbow-counts", nargs='+', type=int, default=ELBOW_COUNTS, help="拐点检测的曲线条数")
+    parser.add_argument("--elbow-noises", nargs='+', type=float, default=ELBOW_NOISES,
+                        help="拐点曲线的电压噪声标准差(V)，每种分别在原始和平滑后的曲线上比较")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最短耗时")
+    parser.add_argument("--output", default=None, help="结果保存为.json或.csv")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    sizes = [size for size in BATTERY_SIZES if size[0] in args.sizes]
+    records = benchmark_groups(sizes, args.repeat, args.formats)
+    records += benchmark_hausdorff(args.hausdorff_sizes, args.repeat)
+    records += benchmark_elbows(args.elbow_counts, args.repeat, args.elbow_noises)
+    if args.output:
+        save_records(records, args.output)
+        print(f"结果保存到: {args.output}")
@@ -1,10 +1,14 @@
-import pickle
-import numpy as np
 import os
 import glob
+import argparse
+from dataset_manifest import load_manifest, print_manifest_fields
+from dataset_profile import profile_directory, print_profile
 
-def check_isu_fields():
-    """检查ISU数据集中的字段结构"""
+def check_isu_fields(workers=1, save=False):
+    """检查ISU数据集中的字段结构：统计全部文件、全部周期，workers为并行进程数
+
+    save为True时把统计报告保存到数据目录下（dataset_profile.json），之后未修改的文件不再重新读取。
+    """
     print("=== ISU数据集字段检查 ===")
     
     isu_dir = "data/ISU_ILCC"
@@ -15,60 +19,14 @@ def check_isu_fields():
     isu_files = glob.glob(os.path.join(isu_dir, "*.pkl"))
     print(f"找到 {len(isu_files)} 个ISU文件")
     
-    all_top_level_keys = set()
-    all_cycle_keys = set()
-    
-    for i, file_path in enumerate(isu_files[:3]):  # 只检查前3个文件
-        print(f"\n--- 文件 {i+1}: {os.path.basename(file_path)} ---")
-        
-        with open(file_path, 'rb') as f:
-            data = pickle.load(f)
-        
-        print(f"数据类型: {type(data)}")
-        
-        if isinstance(data, dict):
-            top_keys = list(data.keys())
-            print(f"顶层字段 ({len(top_keys)}个): {top_keys}")
-            all_top_level_keys.update(top_keys)
-            
-            # 检查cycle_data字段
-            if 'cycle_data' in data:
-                cycle_data = data['cycle_data']
-                print(f"cycle_data类型: {type(cycle_data)}")
-                print(f"cycle_data长度: {len(cycle_data) if hasattr(cycle_data, '__len__') else 'N/A'}")
-                
-                if isinstance(cycle_data, list) and len(cycle_data) > 0:
-                    # 检查第一个周期的字段
-                    first_cycle = cycle_data[0]
-                    if isinstance(first_cycle, dict):
-                        cycle_keys = list(first_cycle.keys())
-                        print(f"第1个周期字段 ({len(cycle_keys)}个): {cycle_keys}")
-                        all_cycle_keys.update(cycle_keys)
-                        
-                        # 显示每个字段的数据类型和示例值
-                        for key in cycle_keys:
-                            value = first_cycle[key]
-                            if isinstance(value, (list, np.ndarray)):
-                                print(f"  {key}: {type(value).__name__}[{len(value)}] - 示例: {value[:3] if len(value) > 0 else '空'}")
-                            else:
-                                print(f"  {key}: {type(value).__name__} - 值: {value}")
-                    
-                    # 检查最后一个周期
-                    if len(cycle_data) > 1:
-                        last_cycle = cycle_data[-1]
-                        if isinstance(last_cycle, dict):
-                            print(f"最后一个周期 (第{len(cycle_data)}个) 字段: {list(last_cycle.keys())}")
-            
-            # 检查其他顶层字段
-            for key in top_keys:
-                if key != 'cycle_data':
-                    value = data[key]
-                    if isinstance(value, (list, np.ndarray)):
-                        print(f"{key}: {type(value).__name__}[{len(value)}]")
-                    else:
-                        print(f"{key}: {type(value).__name__} - {value}")
-        else:
-            print(f"数据不是字典类型: {type(data)}")
+    # 有清单时先按清单列出每个文件的周期数和采样点数
+    print_manifest_fields(sorted(isu_files), load_manifest(isu_dir))
+
+    # 并行统计全部文件、全部周期的字段（默认不写入数据目录）
+    report = profile_directory(isu_dir, workers=workers, save=save)
+    print_profile(report)
+    all_top_level_keys = set(report['summary']['top_fields']) | {'cycle_data'}
+    all_cycle_keys = set(report['summary']['cycle_fields'])
     
     print(f"\n=== 汇总信息 ===")
     print(f"所有顶层字段: {sorted(all_top_level_keys)}")
@@ -91,5 +49,9 @@ def check_isu_fields():
     print(f"可能的电流字段: {current_fields}")
 
 if __name__ == "__main__":
-    check_isu_fields()
+    parser = argparse.ArgumentParser(description="检查ISU数据集全部文件的字段结构")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--save", action="store_true", help="把统计报告保存到数据目录下的dataset_profile.json")
+    args = parser.parse_args()
+    check_isu_fields(workers=args.workers, save=args.save)
     
\ No newline at end of file
@@ -1,4 +1,4 @@
-import pickle
+import argparse
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -6,6 +6,8 @@ import math
 
 from MIT.collect_base import BaseDataset
 from scipy import integrate
+from feature_utils import delta_q_statistics, log10_abs
+from batch_shards import open_batch
 
 # 针对一颗电池
 class DatasetOne(BaseDataset):
@@ -106,7 +108,7 @@ class DatasetOne(BaseDataset):
             T_list.append(np.mean(np.array(self.get_cycle_attr(idx, 'T'))))
 
         X = np.linspace(2, 100, 99)
-        sum_integal_2 = integrate.trapz(T_list, X)
+        sum_integal_2 = integrate.trapezoid(T_list, X)
         #
         # print('sum_integal_2: ', sum_integal_2)
 
@@ -182,18 +184,118 @@ class DatasetOne(BaseDataset):
 
         return result
 
+    @staticmethod
+    def extract_delta_q_batch(datasets):
+        """批量计算多颗电池的F1-F6，返回与datasets顺序一致的字典列表
+
+        把各电池的 Diff_100_10 堆叠成 N×1000 矩阵，统计量沿行一次算完，结果与逐个调用extract相同；
+        逐个计算时会抛出异常的电池（取对数的值为0、分母为0）在这里得到NaN或inf。
+        """
+        Diff_100_10 = np.stack([d.get_cycle_attr(100, 'Qdlin') - d.get_cycle_attr(10, 'Qdlin') for d in datasets])
+        stats = delta_q_statistics(Diff_100_10)
+        columns = {
+            'F1': log10_abs(stats['min']),
+            'F2': log10_abs(stats['mean']),
+            'F3': log10_abs(stats['var_ddof1']),
+            'F4': stats['log_skewness'],
+            'F5': stats['log_kurtosis'],
+            'F6': log10_abs(stats['last']),
+        }
+        return [{name: values[i] for name, values in columns.items()} for i in range(len(datasets))]
+
+    @staticmethod
+    def extract_batch(datasets):
+        """整批计算多颗电池的F1-F20，返回与datasets顺序一致的字典列表
+
+        summary各项取前100个周期堆叠为 电池×周期 矩阵，第2-100个周期的平均温度也堆叠成矩阵，特征沿周期轴一次算完。
+        extract中get_QD_slope会就地修改summary['QD']（大于1.3的值替换为前一个值），F12、F13读到的是修改后的值；
+        这里在副本上按同样的顺序计算，不修改原数据；结果与第一次调用extract相同，
+        只是F7-F10对全部电池一次最小二乘拟合、F17的周期平均温度按分段求和，与逐个计算有末位舍入差异。
+        """
+        QD = stack_summary(datasets, 'QD', 100)
+        IR = stack_summary(datasets, 'IR', 100)
+
+        # get_QD_slope(2,100)替换QD[2:100]中的大值；之后get_QD_slope(91,100)的窗口内不会再有需要替换的值
+        QD_clipped = QD.copy()
+        QD_clipped[:, 1:100] = hold_over_threshold(QD[:, 1:100], 1.3)
+        slope_2_100, intercept_2_100 = np.polyfit(np.arange(2, 101), QD_clipped[:, 1:100].T, deg=1)
+        slope_91_100, intercept_91_100 = np.polyfit(np.arange(91, 101), QD_clipped[:, 90:100].T, deg=1)
+
+        T_list = mean_temperature_batch(datasets, 2, 100)
+        X = np.linspace(2, 100, 99)
+
+        columns = {
+            'F7': slope_2_100,
+            'F8': intercept_2_100,
+            'F9': slope_91_100,
+            'F10': intercept_91_100,
+            'F11': QD[:, 1],
+            # 与内置max相同：忽略第一个之后的NaN
+            'F12': np.fmax.reduce(QD_clipped[:, 1:100] - QD[:, 1:2], axis=1),
+            'F13': QD_clipped[:, 99],
+            'F14': np.mean(stack_summary(datasets, 'chargetime', 6)[:, 1:6], axis=1),
+            'F15': np.max(stack_summary(datasets, 'Tmax', 100)[:, 1:100], axis=1),
+            'F16': np.min(stack_summary(datasets, 'Tmin', 100)[:, 1:100], axis=1),
+            'F17': integrate.trapezoid(T_list, X, axis=1),
+            'F18': IR[:, 1],
+            'F19': np.min(IR[:, 1:100], axis=1),
+            'F20': IR[:, 99] - IR[:, 1],
+        }
+        results = DatasetOne.extract_delta_q_batch(datasets)
+        for i, result in enumerate(results):
+            result.update({name: values[i] for name, values in columns.items()})
+        return results
+
+
+def stack_summary(datasets, key, n_cycles):
+    """各电池summary[key]的前n_cycles个值堆叠为 电池×周期 矩阵"""
+    return np.stack([np.asarray(d.battery['summary'][key][:n_cycles], dtype=np.float64) for d in datasets])
+
+
+def hold_over_threshold(values, threshold):
+    """逐行把大于threshold的值替换为前一个值（可连续传递），每行第一个值保留，与get_QD_slope中的循环相同"""
+    keep = ~(values > threshold)
+    keep[:, 0] = True
+    source = np.maximum.accumulate(np.where(keep, np.arange(values.shape[1]), 0), axis=1)
+    return np.take_along_axis(values, source, axis=1)
+
+
+def mean_temperature_batch(datasets, start, end):
+    """电池×周期 矩阵：各电池第start至end个周期温度的平均值，所有周期拼接后分段求和一次算完，无数据的周期为NaN"""
+    arrays = [np.asarray(d.get_cycle_attr(idx, 'T'), dtype=np.float64).ravel()
+              for d in datasets for idx in range(start, end + 1)]
+    lengths = np.array([len(a) for a in arrays])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    sums = np.full(len(arrays), np.nan)
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        # 空周期不参与分段，相邻非空段之间不含任何样本
+        sums[nonempty] = np.add.reduceat(np.concatenate(arrays), offsets[nonempty])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / lengths
+    return means.reshape(len(datasets), end - start + 1)
 
 
 if __name__ == "__main__":
-    file_path = r"./data/merged_batch.pkl"
-    batch1 = pickle.load(open(file_path, 'rb'))
-    battery_index = 0
-    for k, battery in batch1.items():
-
-        d = DatasetOne(battery, battery_index)
-        result_dict = d.extract()
-        battery_index += 1
-
-        # break
-        # if battery_index == 10:
-            # a = 0
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="提取MIT数据的F1-F20特征")
+    parser.add_argument("--file", default=r"./data/merged_batch.pkl", help="合并后的批次pkl文件")
+    parser.add_argument("--batch", action="store_true", help="整批张量计算（DatasetOne.extract_batch），否则逐颗电池调用extract")
+    args = parser.parse_args()
+
+    # 已用batch_shards.py切分时按需读取各电池
+    batch1 = open_batch(args.file)
+    if args.batch:
+        datasets = [DatasetOne(battery, battery_index) for battery_index, battery in enumerate(batch1.values())]
+        results = DatasetOne.extract_batch(datasets)
+        print(f"共计算 {len(results)} 颗电池的F1-F20")
+    else:
+        battery_index = 0
+        for k, battery in batch1.items():
+
+            d = DatasetOne(battery, battery_index)
+            result_dict = d.extract()
+            battery_index += 1
+
+            # break
+            # if battery_index == 10:
+                # a = 0
\ No newline at end of file
@@ -1,4 +1,4 @@
-import pickle
+import argparse
 import numpy as np
 import math
 import bisect
@@ -7,7 +7,8 @@ from utils import *
 from scipy.spatial.distance import directed_hausdorff
 
 from collect_base import BaseDataset
-from kneed import KneeLocator
+from batch_shards import open_batch
+from elbows import compare_elbows, find_elbows, kneed_elbows
 
 import matplotlib.pyplot as plt
 
@@ -15,6 +16,9 @@ import matplotlib.pyplot as plt
 class DatasetThree(BaseDataset):
     def __init__(self, battery, battery_index):
         super().__init__(battery, battery_index)
+        # 各周期的拐点下标和拐点处的垂直斜率，F57对同一电池的同一周期只计算一次
+        self._elbows = {}
+        self._elbow_slopes = {}
 
     def extract(self):
         # MVF at 100
@@ -139,11 +143,8 @@ class DatasetThree(BaseDataset):
         V = self.get_cycle_attr(cycle_id, 'V')
         t = self.get_cycle_attr(cycle_id, 't')
         discharge_begin = self.get_cycle_stages(cycle_id)['discharge_begin']
-        # 放电五分钟
-        for i in range(discharge_begin, len(t)):
-            if t[i] - t[discharge_begin] > 5:
-                dsc_5_min = i
-                break
+        # 放电五分钟：放电开始后第一个超过5分钟的采样点
+        dsc_5_min = first_index_after(t, discharge_begin, 5)
 
         V_100 = V[dsc_5_min:dsc_5_min+100]
         mvf = np.mean(abs(V_100-3.6))
@@ -174,9 +175,10 @@ class DatasetThree(BaseDataset):
         I = self.get_cycle_attr(cycle_id, 'I')
         I_bt = I[st:ed]
 
-        inverse_I_bt = [-item for item in I_bt]
-        id_1 = bisect.bisect_left(inverse_I_bt, -1)
-        id_2 = bisect.bisect_left(inverse_I_bt, -0.1)
+        # 与对取负后的列表做bisect_left相同（二分的探查顺序一致），每个阈值单独查找
+        inverse_I_bt = -np.asarray(I_bt, dtype=np.float64)
+        id_1 = int(np.searchsorted(inverse_I_bt, -1))
+        id_2 = int(np.searchsorted(inverse_I_bt, -0.1))
         a = self.get_cycle_attr(cycle_id, attr)
         diff_a = a[id_2 + st] - a[id_1 + st]
 
@@ -211,9 +213,8 @@ class DatasetThree(BaseDataset):
 
         return diff
 
-    def get_elbows_slope(self, cycle_id):
-        stages = self.get_cycle_stages(cycle_id)
-
+    def get_elbow_curve(self, cycle_id):
+        """F57使用的CC充电起始段：前200个采样点每5个取一个的 (t, V, 平滑后的V)"""
         st = 0
         ed = 200
         # if 'cc1_end' in stages.keys():
@@ -224,32 +225,39 @@ class DatasetThree(BaseDataset):
         #     else:
         #         ed = stages['cc3_begin']
 
-
-
         V_bt = self.get_cycle_attr(cycle_id, 'V')[st:ed:5] # 稀疏采样避免噪声
         t_bt = self.get_cycle_attr(cycle_id, 't')[st:ed:5]
 
-        # 先将曲线平滑 再找拐点
+        # 先将曲线平滑 再找拐点：find_elbows只在平滑后的曲线上与KneeLocator一致，不能省去这一步
         V_smooth = smooth_curve(V_bt)
-        kneedle = KneeLocator(t_bt, V_smooth, curve='concave', direction='increasing')
-        elbow_point = kneedle.elbow
-        # print(elbow_point)
+        return t_bt, V_bt, V_smooth
+
+    @staticmethod
+    def precompute_elbows(datasets, cycle_ids=(10, 100)):
+        """对多颗电池的指定周期一次性找拐点并写入各自的缓存，之后extract中的F57不再逐条计算"""
+        pending = [(d, cycle_id) for d in datasets for cycle_id in cycle_ids if cycle_id not in d._elbows]
+        curves = []
+        for d, cycle_id in pending:
+            t_bt, _, V_smooth = d.get_elbow_curve(cycle_id)
+            curves.append((t_bt, V_smooth))
+        for (d, cycle_id), index in zip(pending, find_elbows(curves)):
+            d._elbows[cycle_id] = index
 
-        index = find_closest_index(t_bt, elbow_point)
-
-        # print(f"拐点的索引: {inflection_indices}")
-        # if len(inflection_indices) != 1:
-        #     plt.plot(t_bt, V_smooth)
-        #     for index in inflection_indices:
-        #         plt.plot(t_bt[index], V_smooth[index], 'r+')
-        #     plt.show()
-
-        # plt.plot(t_bt, V_smooth)
-        # plt.plot(t_bt[index], V_smooth[index], 'r+')
-        # plt.show()
-        slope = perpendicular_slope_at_inflection(t_bt, V_bt, index)
-
-        return slope
+    def get_elbows_slope(self, cycle_id):
+        if cycle_id not in self._elbow_slopes:
+            t_bt, V_bt, V_smooth = self.get_elbow_curve(cycle_id)
+            if cycle_id not in self._elbows:
+                # 拐点：到归一化弦距离最大的点（见elbows.py）
+                self._elbows[cycle_id] = find_elbows([(t_bt, V_smooth)])[0]
+            index = self._elbows[cycle_id]
+            if index is None:
+                # 找不到拐点（曲线为直线或常数）
+                slope = np.nan
+            else:
+                slope = perpendicular_slope_at_inflection(t_bt, V_bt, index)
+            self._elbow_slopes[cycle_id] = slope
+
+        return self._elbow_slopes[cycle_id]
 
 
     def get_c_dc_time(self):
@@ -284,38 +292,71 @@ class DatasetThree(BaseDataset):
         return charge_and_dis_time
 
     def get_discharge_time(self, Current):
-        discharge_begin = 0
-        discharge_end = 0
-        for i in range(len(Current) - 1):
-            if [int(Current[i]), int(float(Current[i + 1]))] == [0, -1]:
-                discharge_begin = i
+        """放电起止位置：电流取整后最后一次由0变为-1的位置，和最后一次离开-4A（取整为-4、下一点大于-4）的位置，没有时为0"""
+        Current = np.asarray(Current, dtype=np.float64)
+        # int()向零取整，与np.trunc一致
+        level = np.trunc(Current)
+        discharge_begin = last_index((level[:-1] == 0) & (level[1:] == -1))
+        discharge_end = last_index((level[:-1] == -4) & (Current[1:] > -4))
+        return discharge_begin, discharge_end
 
-        for i in range(len(Current) - 1):
-            if (int(Current[i]) == -4) & (float(Current[i + 1]) > -4):
-                discharge_end = i
 
-        return discharge_begin, discharge_end
+def last_index(mask):
+    """mask中最后一个True的位置，没有时为0"""
+    indices = np.flatnonzero(mask)
+    return int(indices[-1]) if len(indices) > 0 else 0
 
 
-if __name__ == "__main__":
-    file_path = r"./data/merged_batch.pkl"
-    batch1 = pickle.load(open(file_path, 'rb'))
-    battery_index = 0
-    all_cc3_st_V = []
-    for k, battery in batch1.items():
-        d = DatasetThree(battery, battery_index)
+def first_index_after(t, start, interval):
+    """start之后第一个满足 t[i] - t[start] > interval 的位置i"""
+    t = np.asarray(t)
+    later = t[start:] - t[start] > interval
+    if not np.any(later):
+        raise ValueError(f"第{start}个采样点之后没有超过{interval}的时间点")
+    return start + int(np.argmax(later))
+
 
-        # temp_V = d.get_cc_3_beign_V()
-        # all_cc3_st_V.append(temp_V)
-        # d.get_stage_energe(15, 'Discharge')
-        result = d.extract()
+def check_elbows(batch, cycle_ids=(10, 100)):
+    """在全部电池的指定周期上比较批量拐点检测与KneeLocator的拐点下标，打印并返回一致情况"""
+    curves = []
+    for battery_index, battery in enumerate(batch.values()):
+        d = DatasetThree(battery, battery_index)
+        for cycle_id in cycle_ids:
+            t_bt, _, V_smooth = d.get_elbow_curve(cycle_id)
+            curves.append((t_bt, V_smooth))
+    stats = compare_elbows(find_elbows(curves), kneed_elbows(curves))
+    print(f"拐点一致: {stats['agree']}/{stats['curves']} ({stats['agree_ratio']:.1%})，最大下标差 {stats['max_index_diff']}")
+    return stats
 
-        for k,v in result.items():
-            print(f"{k}: {v}")
-        battery_index += 1
-        break
-        # # if battery_index == 10:
-            # a = 0
 
-    # min_v = min(all_cc3_st_V)
-    # print("min V is ", min_v)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取MIT数据的F47-F59特征")
+    parser.add_argument("--file", default=r"./data/merged_batch.pkl", help="合并后的批次pkl文件")
+    parser.add_argument("--check-elbows", action="store_true", help="在全部电池第10、100个周期上与KneeLocator比较拐点")
+    args = parser.parse_args()
+
+    file_path = args.file
+    # 已用batch_shards.py切分时只读取用到的电池
+    batch1 = open_batch(file_path)
+    if args.check_elbows:
+        check_elbows(batch1)
+    else:
+        battery_index = 0
+        all_cc3_st_V = []
+        for k, battery in batch1.items():
+            d = DatasetThree(battery, battery_index)
+
+            # temp_V = d.get_cc_3_beign_V()
+            # all_cc3_st_V.append(temp_V)
+            # d.get_stage_energe(15, 'Discharge')
+            result = d.extract()
+
+            for k,v in result.items():
+                print(f"{k}: {v}")
+            battery_index += 1
+            break
+            # # if battery_index == 10:
+                # a = 0
+
+        # min_v = min(all_cc3_st_V)
+        # print("min V is ", min_v)
\ No newline at end of file
@@ -0,0 +1,360 @@
+import os
+import glob
+import pickle
+import shutil
+import hashlib
+import argparse
+import traceback
+from collections.abc import Sequence
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cycle_view import CycleView, _to_column, discharge_capacity_fade
+
+# 列式存储格式版本，格式变化时递增，旧版本目录会被重新转换
+STORE_VERSION = 2
+
+# 每个电池转换后的目录后缀，例如 data_store/ISU_ILCC/xxx.pkl.cols/
+STORE_SUFFIX = '.cols'
+
+META_FILE = 'meta.pkl'
+
+
+def _field_file(store_dir, field, kind):
+    """信号字段对应的文件路径，kind为'values'或'offsets'；字段名转义后作为文件名"""
+    name = quote(field, safe='')
+    if kind == 'offsets':
+        return os.path.join(store_dir, f"{name}.offsets.npy")
+    return os.path.join(store_dir, f"{name}.npy")
+
+
+def _is_signal(value):
+    """周期字段是否为数值序列（列表、元组或数组）"""
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        return False
+    return np.asarray(value).dtype.kind in 'biuf'
+
+
+def convert_battery(battery_data, store_dir, source=None, source_sha256=None):
+    """将单颗电池数据写为列式存储目录
+
+    每个信号字段的所有周期首尾拼接为一个一维数组 <field>.npy，另存长度为周期数+1的偏移数组
+    <field>.offsets.npy，第k个周期为 values[offsets[k]:offsets[k+1]]。
+    电池级字段、周期中的标量字段和非数值字段保存在 meta.pkl 中。
+    写入临时目录后整体改名，中断时不会留下不完整的存储。
+    """
+    if not isinstance(battery_data, dict) or not isinstance(battery_data.get('cycle_data'), list):
+        raise ValueError("电池数据缺少cycle_data列表，无法转换")
+
+    cycle_data = battery_data['cycle_data']
+    n_cycles = len(cycle_data)
+    is_dict = np.array([isinstance(cycle, dict) for cycle in cycle_data], dtype=bool)
+
+    # 出现过数值序列的字段按信号列存储，其余字段留在每个周期的标量字典里
+    signal_fields = []
+    for cycle in cycle_data:
+        if isinstance(cycle, dict):
+            for key, value in cycle.items():
+                if key not in signal_fields and _is_signal(value):
+                    signal_fields.append(key)
+
+    scalars = []
+    for cycle in cycle_data:
+        if isinstance(cycle, dict):
+            scalars.append({k: v for k, v in cycle.items() if k not in signal_fields})
+        else:
+            scalars.append({})
+
+    tmp_dir = store_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    signals = {}
+    for field in signal_fields:
+        columns = []
+        present = np.zeros(n_cycles, dtype=bool)
+        for cycle_idx, cycle in enumerate(cycle_data):
+            value = cycle.get(field) if isinstance(cycle, dict) else None
+            present[cycle_idx] = value is not None
+            columns.append(_to_column(value))
+
+        # 与CycleView一致：全部为整数时保持int64（ISU纳秒时间戳），否则为float64
+        all_int = all(col.dtype.kind in 'iu' for col in columns if len(col) > 0)
+        dtype = np.int64 if all_int and any(len(col) > 0 for col in columns) else np.float64
+
+        offsets = np.zeros(n_cycles + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(col) for col in columns])
+        values = np.concatenate(columns).astype(dtype, copy=False) if columns else np.empty(0, dtype=dtype)
+
+        np.save(_field_file(tmp_dir, field, 'values'), values)
+        np.save(_field_file(tmp_dir, field, 'offsets'), offsets)
+        signals[field] = present
+        del columns, values
+
+    meta = {
+        'version': STORE_VERSION,
+        'source': source,
+        'source_sha256': source_sha256,
+        'battery': {k: v for k, v in battery_data.items() if k != 'cycle_data'},
+        'n_cycles': n_cycles,
+        'is_dict': is_dict,
+        'scalars': scalars,
+        'signals': signals,
+    }
+    if source is not None and os.path.exists(source):
+        stat = os.stat(source)
+        meta['source_size'] = stat.st_size
+        meta['source_mtime_ns'] = stat.st_mtime_ns
+    with open(os.path.join(tmp_dir, META_FILE), 'wb') as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+
+def load_meta(store_dir):
+    """读取列式存储目录的元数据"""
+    with open(os.path.join(store_dir, META_FILE), 'rb') as f:
+        return pickle.load(f)
+
+
+def is_up_to_date(pkl_path, store_dir):
+    """列式存储是否已由当前版本从未修改过的源文件转换得到"""
+    if not os.path.exists(os.path.join(store_dir, META_FILE)):
+        return False
+    try:
+        meta = load_meta(store_dir)
+    except Exception:
+        return False
+    stat = os.stat(pkl_path)
+    return (meta.get('version') == STORE_VERSION
+            and meta.get('source_size') == stat.st_size
+            and meta.get('source_mtime_ns') == stat.st_mtime_ns)
+
+
+def store_path_for(pkl_path, store_root):
+    """源pkl文件对应的列式存储目录"""
+    return os.path.join(store_root, os.path.basename(pkl_path) + STORE_SUFFIX)
+
+
+def convert_file(pkl_path, store_root, force=False):
+    """转换单个pkl文件，返回 (文件名, 状态, 错误信息)，状态为'converted'/'skipped'/'failed'"""
+    filename = os.path.basename(pkl_path)
+    store_dir = store_path_for(pkl_path, store_root)
+    try:
+        if not force and is_up_to_date(pkl_path, store_dir):
+            return filename, 'skipped', None
+        with open(pkl_path, 'rb') as f:
+            raw = f.read()
+        # 记录源文件哈希，特征结果缓存以此识别电池
+        battery_data = pickle.loads(raw)
+        convert_battery(battery_data, store_dir, source=pkl_path, source_sha256=hashlib.sha256(raw).hexdigest())
+        del raw, battery_data
+        return filename, 'converted', None
+    except Exception:
+        return filename, 'failed', traceback.format_exc()
+
+
+def convert_directory(data_dir, store_root, workers=1, force=False):
+    """将数据目录下的所有pkl文件转换为列式存储，已是最新的文件跳过"""
+    pkl_files = sorted(glob.glob(os.path.join(data_dir, '*.pkl')))
+    os.makedirs(store_root, exist_ok=True)
+    print(f"找到 {len(pkl_files)} 个pkl文件，转换到 {store_root}")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        results = (convert_file(path, store_root, force) for path in pkl_files)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(convert_file, path, store_root, force) for path in pkl_files]
+        results = (future.result() for future in futures)
+
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    try:
+        for filename, status, error in results:
+            counts[status] += 1
+            if status == 'failed':
+                print(f"转换 {filename} 失败:\n{error}")
+            else:
+                print(f"{filename}: {status}")
+    finally:
+        if workers > 1:
+            executor.shutdown()
+
+    print(f"转换完成: 新转换 {counts['converted']} 个，跳过 {counts['skipped']} 个，失败 {counts['failed']} 个")
+    return counts
+
+
+def list_store(store_root):
+    """列出存储根目录下的所有电池目录（按名称排序）"""
+    return sorted(glob.glob(os.path.join(store_root, '*' + STORE_SUFFIX)))
+
+
+class StoreCycles(Sequence):
+    """列式存储的周期序列：按需把单个周期还原为字典，信号字段为内存映射数组的切片"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, cycle_idx):
+        if isinstance(cycle_idx, slice):
+            return [self[i] for i in range(*cycle_idx.indices(len(self)))]
+        if cycle_idx < 0:
+            cycle_idx += len(self)
+        if not 0 <= cycle_idx < len(self):
+            raise IndexError("周期索引越界")
+        return self._view.cycle(cycle_idx)
+
+
+class StoreCycleView(CycleView):
+    """基于列式存储目录的周期视图，接口与CycleView一致
+
+    信号列在首次访问时以只读内存映射打开，只读取实际用到的字段；
+    array() 直接返回映射数组的切片，不复制数据。
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.meta = load_meta(store_dir)
+        self.battery_data = self.meta['battery']
+        self.cycle_data = StoreCycles(self)
+        self._arrays = {}
+        self._phases = {}
+        self._fade = None
+        self._derived = {}
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta['n_cycles']
+
+    def column(self, field):
+        """返回信号字段的 (拼接数组, 偏移数组)，字段不存在时返回None"""
+        if field not in self.meta['signals']:
+            return None
+        column = self._columns.get(field)
+        if column is None:
+            values_path = _field_file(self.store_dir, field, 'values')
+            try:
+                values = np.load(values_path, mmap_mode='r')
+            except ValueError:
+                # 部分numpy版本无法映射空文件
+                values = np.load(values_path)
+                values.setflags(write=False)
+            offsets = np.load(_field_file(self.store_dir, field, 'offsets'))
+            column = (values, offsets)
+            self._columns[field] = column
+        return column
+
+    def cycle(self, cycle_idx):
+        cycle_idx = self._normalize_index(cycle_idx)
+        if not self.meta['is_dict'][cycle_idx]:
+            return {}
+        cycle = dict(self.meta['scalars'][cycle_idx])
+        for field, present in self.meta['signals'].items():
+            if present[cycle_idx]:
+                cycle[field] = self.array(cycle_idx, field)
+        return cycle
+
+    def has_field(self, cycle_idx, field):
+        cycle_idx = self._normalize_index(cycle_idx)
+        present = self.meta['signals'].get(field)
+        if present is not None:
+            return bool(present[cycle_idx])
+        return self.meta['scalars'][cycle_idx].get(field) is not None
+
+    def sample_count(self, cycle_idx, field='current_in_A'):
+        cycle_idx = self._normalize_index(cycle_idx)
+        column = self.column(field)
+        if column is None:
+            return super().sample_count(cycle_idx, field)
+        offsets = column[1]
+        return int(offsets[cycle_idx + 1] - offsets[cycle_idx])
+
+    def array(self, cycle_idx, field):
+        cycle_idx = self._normalize_index(cycle_idx)
+        arr = self._arrays.get((cycle_idx, field))
+        if arr is not None:
+            return arr
+        column = self.column(field)
+        if column is None:
+            # 标量或非数值字段，与CycleView相同地转换并缓存
+            key = (cycle_idx, field)
+            arr = self._arrays.get(key)
+            if arr is None:
+                arr = _to_column(self.meta['scalars'][cycle_idx].get(field))
+                self._arrays[key] = arr
+            return arr
+        values, offsets = column
+        return values[offsets[cycle_idx]:offsets[cycle_idx + 1]].view(np.ndarray)
+
+    def _peek(self, cycle_idx, field):
+        return self.array(cycle_idx, field)
+
+    def _compute_fade(self, n_cycles):
+        current = self.column('current_in_A')
+        capacity = self.column('discharge_capacity_in_Ah')
+        # 两列逐周期等长时直接在拼接数组的前缀上计算，无需逐周期切片
+        if current is not None and capacity is not None and np.array_equal(current[1], capacity[1]):
+            offsets = current[1][:n_cycles + 1]
+            end = offsets[-1]
+            return discharge_capacity_fade(current[0][:end], capacity[0][:end], offsets)
+        return super()._compute_fade(n_cycles)
+
+    def materialize(self, cycle_indices, fields=None):
+        """把指定周期的信号从内存映射复制到内存中，之后访问这些周期不再读文件
+
+        fields为None时复制全部信号字段；其余周期仍按需从内存映射读取。
+        """
+        if fields is None:
+            fields = list(self.meta['signals'])
+        for field in fields:
+            column = self.column(field)
+            if column is None:
+                continue
+            values, offsets = column
+            for cycle_idx in cycle_indices:
+                if 0 <= cycle_idx < len(self):
+                    arr = np.array(values[offsets[cycle_idx]:offsets[cycle_idx + 1]])
+                    arr.setflags(write=False)
+                    self._arrays[(cycle_idx, field)] = arr
+
+    def clear_cache(self):
+        """释放缓存，同时关闭已打开的内存映射"""
+        super().clear_cache()
+        self._columns.clear()
+
+
+def battery_name(path):
+    """电池名称：pkl文件为文件名，列式存储目录为其源pkl文件名"""
+    if os.path.isdir(path):
+        source = load_meta(path).get('source')
+        if source:
+            return os.path.basename(source)
+        return os.path.basename(os.path.normpath(path))[:-len(STORE_SUFFIX)]
+    return os.path.basename(path)
+
+
+def open_battery(path):
+    """打开电池数据：列式存储目录返回StoreCycleView，pkl文件返回反序列化后的字典"""
+    if os.path.isdir(path):
+        return StoreCycleView(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将ISU/MATR电池pkl文件转换为内存映射列式存储")
+    parser.add_argument("data_dir", help="pkl文件所在目录，例如 data/ISU_ILCC")
+    parser.add_argument("store_root", help="列式存储输出目录，例如 data_store/ISU_ILCC")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--force", action="store_true", help="忽略已有结果，全部重新转换")
+    args = parser.parse_args()
+    convert_directory(args.data_dir, args.store_root, workers=args.workers, force=args.force)
@@ -0,0 +1,202 @@
+import os
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from columnar_store import StoreCycleView, open_battery, battery_name
+from cycle_view import as_cycle_view
+
+# 周期的充放电顺序
+ORDER_CHARGE_FIRST = 'charge_first'
+ORDER_DISCHARGE_FIRST = 'discharge_first'
+ORDER_REST = 'rest'
+
+# 判定充放电的阈值：电流绝对值(A)、充放电容量(Ah)，与原先逐文件检查时相同
+CURRENT_THRESHOLD = 0.01
+CAPACITY_THRESHOLD = 0.001
+
+# 电压趋势取每个周期的前若干个点做线性拟合
+VOLTAGE_TREND_POINTS = 10
+
+ORDER_COLUMNS = ['Battery_Name', 'Cycle', 'Samples', 'Order', 'Charge_Start', 'Discharge_Start', 'Voltage_Slope']
+
+
+def concatenated(view, field):
+    """周期信号首尾拼接的 (float64数组, 偏移数组)，第k个周期为 [offsets[k], offsets[k+1])
+
+    列式存储直接使用存储中的拼接数组，pkl数据逐周期转换后拼接一次。
+    """
+    if isinstance(view, StoreCycleView):
+        column = view.column(field)
+        if column is not None:
+            values, offsets = column
+            offsets = np.asarray(offsets, dtype=np.int64)
+            return np.asarray(values[:offsets[-1]], dtype=np.float64), offsets
+    arrays = [view.array(cycle_idx, field) for cycle_idx in range(len(view))]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(arr) for arr in arrays])
+    values = np.concatenate(arrays).astype(np.float64) if arrays else np.empty(0)
+    return values, offsets
+
+
+def first_true(mask, offsets):
+    """每个周期内mask第一个为True的位置（相对周期起点），没有时为-1
+
+    把False位置替换为数组长度后按周期分段求最小值，相当于对每个周期做argmax-on-mask，全部周期一次完成。
+    """
+    result = np.full(len(offsets) - 1, -1, dtype=np.int64)
+    starts = offsets[:-1]
+    nonempty = np.diff(offsets) > 0
+    if not np.any(nonempty):
+        return result
+    positions = np.where(mask, np.arange(len(mask)), len(mask))
+    # 空周期不参与分段，相邻非空段之间不含任何样本
+    first = np.minimum.reduceat(positions, starts[nonempty])
+    cycles = np.flatnonzero(nonempty)
+    found = first < offsets[1:][nonempty]
+    result[cycles[found]] = first[found] - starts[cycles[found]]
+    return result
+
+
+def voltage_slopes(voltage, offsets, n_points=VOLTAGE_TREND_POINTS):
+    """每个周期前n_points个电压点对采样序号的最小二乘斜率(V/步)，点数不超过n_points的周期为NaN"""
+    slopes = np.full(len(offsets) - 1, np.nan)
+    long_enough = np.diff(offsets) > n_points
+    if not np.any(long_enough):
+        return slopes
+    x = np.arange(n_points) - (n_points - 1) / 2
+    window = voltage[offsets[:-1][long_enough, None] + np.arange(n_points)]
+    slopes[long_enough] = window @ x / np.sum(x * x)
+    return slopes
+
+
+def classify_cycles(view):
+    """逐周期判断电池的充放电顺序，返回按列组织的字典（各列为长度等于周期数的数组）
+
+    顺序以充放电容量首次超过CAPACITY_THRESHOLD的位置先后判断（与原先的检查相同，同一位置时记为先放电）；
+    两种容量都没有变化的周期按首个超过CURRENT_THRESHOLD的电流方向判断，电流也没有时为rest。
+    Charge_Start / Discharge_Start 为周期内电流首次大于CURRENT_THRESHOLD / 小于-CURRENT_THRESHOLD的样本位置（没有时为-1），
+    即按电流方向划分阶段时充电段、放电段的起点。
+    """
+    view = as_cycle_view(view)
+    n_cycles = len(view)
+    current, current_offsets = concatenated(view, 'current_in_A')
+    charge_cap, charge_offsets = concatenated(view, 'charge_capacity_in_Ah')
+    discharge_cap, discharge_offsets = concatenated(view, 'discharge_capacity_in_Ah')
+    voltage, voltage_offsets = concatenated(view, 'voltage_in_V')
+
+    charge_start = first_true(current > CURRENT_THRESHOLD, current_offsets)
+    discharge_start = first_true(current < -CURRENT_THRESHOLD, current_offsets)
+    charge_rise = first_true(charge_cap > CAPACITY_THRESHOLD, charge_offsets)
+    discharge_rise = first_true(discharge_cap > CAPACITY_THRESHOLD, discharge_offsets)
+
+    order = np.full(n_cycles, ORDER_REST, dtype=object)
+    # 电流判断（先赋值，有容量变化的周期再由容量判断覆盖）
+    has_charge = charge_start >= 0
+    has_discharge = discharge_start >= 0
+    order[has_charge & (~has_discharge | (charge_start < discharge_start))] = ORDER_CHARGE_FIRST
+    order[has_discharge & (~has_charge | (discharge_start < charge_start))] = ORDER_DISCHARGE_FIRST
+    # 容量判断
+    has_charge = charge_rise >= 0
+    has_discharge = discharge_rise >= 0
+    order[has_charge & (~has_discharge | (charge_rise < discharge_rise))] = ORDER_CHARGE_FIRST
+    order[has_discharge & (~has_charge | (discharge_rise <= charge_rise))] = ORDER_DISCHARGE_FIRST
+
+    return {
+        'Cycle': np.arange(1, n_cycles + 1),
+        'Samples': np.diff(current_offsets),
+        'Order': order,
+        'Charge_Start': charge_start,
+        'Discharge_Start': discharge_start,
+        'Voltage_Slope': voltage_slopes(voltage, voltage_offsets),
+    }
+
+
+def classify_file(file_path):
+    """加载单个电池文件（pkl或列式存储目录）并逐周期判断，返回 (电池名, 结果列, 错误信息)"""
+    name = os.path.basename(file_path)
+    try:
+        name = battery_name(file_path)
+        return name, classify_cycles(open_battery(file_path)), None
+    except Exception:
+        return name, None, traceback.format_exc()
+
+
+def iter_classified(file_paths, workers=1):
+    """按文件顺序产出每个电池的判断结果；workers>1时使用进程池并行"""
+    if workers <= 1:
+        for file_path in file_paths:
+            yield classify_file(file_path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(classify_file, file_paths):
+            yield result
+
+
+def write_order_table(output_path, file_paths, workers=1):
+    """逐个电池判断并写入逐周期顺序表（制表符分隔，列见ORDER_COLUMNS），返回 {电池名: 结果列} 与失败的电池名列表"""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    results = {}
+    failed = []
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\t'.join(ORDER_COLUMNS) + '\n')
+        for name, columns, error in iter_classified(file_paths, workers):
+            if error is not None:
+                failed.append(name)
+                print(f"处理 {name} 失败:\n{error}")
+                continue
+            for row in zip(*(columns[column] for column in ORDER_COLUMNS[1:])):
+                cycle, samples, order, charge_start, discharge_start, slope = row
+                f.write(f"{name}\t{cycle}\t{samples}\t{order}\t{charge_start}\t{discharge_start}\t{slope:.6f}\n")
+            results[name] = columns
+    return results, failed
+
+
+def read_order_table(path):
+    """读取逐周期顺序表，返回 {电池名: {列名: 数组}}，Order列为字符串数组，其余为数值数组"""
+    rows = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline().rstrip('\n').split('\t')
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) == len(header):
+                rows.setdefault(parts[0], []).append(parts[1:])
+    table = {}
+    for name, battery_rows in rows.items():
+        columns = list(zip(*battery_rows))
+        table[name] = {
+            'Cycle': np.array(columns[0], dtype=np.int64),
+            'Samples': np.array(columns[1], dtype=np.int64),
+            'Order': np.array(columns[2]),
+            'Charge_Start': np.array(columns[3], dtype=np.int64),
+            'Discharge_Start': np.array(columns[4], dtype=np.int64),
+            'Voltage_Slope': np.array(columns[5], dtype=np.float64),
+        }
+    return table
+
+
+def order_counts(columns):
+    """各顺序的周期数"""
+    values, counts = np.unique(columns['Order'].astype(str), return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
+
+
+if __name__ == "__main__":
+    from feature_pipeline import list_battery_files
+
+    parser = argparse.ArgumentParser(description="逐周期判断全部电池的充放电顺序，输出逐周期顺序表")
+    parser.add_argument("--data-dir", default="data/MATR", help="pkl文件所在目录")
+    parser.add_argument("--store", default=None, help="从列式存储目录读取，代替data-dir下的pkl文件")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--output", default="./result/cycle_order.txt", help="输出文件")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    results, failed = write_order_table(args.output, list_battery_files(args.data_dir, args.store), workers)
+    for name, columns in results.items():
+        print(f"{name}: {order_counts(columns)}")
+    if failed:
+        print(f"处理失败 {len(failed)} 个文件: {failed}")
+    print(f"结果保存到: {args.output}")
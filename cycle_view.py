@@ -0,0 +1,152 @@
+import numpy as np
+from phase_table import PhaseTable
+
+
+class CycleView:
+    """单颗电池的周期视图：每个周期的信号列表只转换一次为连续数组并缓存，供F1-F59各特征组共享"""
+
+    def __init__(self, battery_data):
+        self.battery_data = battery_data
+        self.cycle_data = battery_data.get('cycle_data', [])
+        self._arrays = {}
+        self._phases = {}
+        self._fade = None
+        self._derived = {}
+
+    def __len__(self):
+        return len(self.cycle_data)
+
+    def _normalize_index(self, cycle_idx):
+        if cycle_idx < 0:
+            cycle_idx += len(self.cycle_data)
+        return cycle_idx
+
+    def cycle(self, cycle_idx):
+        """返回原始周期字典（非字典周期返回空字典）"""
+        cycle = self.cycle_data[self._normalize_index(cycle_idx)]
+        return cycle if isinstance(cycle, dict) else {}
+
+    def has_field(self, cycle_idx, field):
+        """周期中是否存在该字段且不为None"""
+        return self.cycle(cycle_idx).get(field) is not None
+
+    def sample_count(self, cycle_idx, field='current_in_A'):
+        """周期某信号的采样点数，不转换数组；字段缺失时为0"""
+        value = self.cycle(cycle_idx).get(field)
+        if value is None:
+            return 0
+        return len(value) if hasattr(value, '__len__') else 1
+
+    def array(self, cycle_idx, field):
+        """获取周期某信号的只读连续数组，首次访问时转换并缓存
+
+        浮点数据统一为float64；整数数据（如ISU的纳秒时间戳）保持int64，避免大数值转浮点丢失精度。
+        字段缺失或为None时返回空数组。
+        """
+        cycle_idx = self._normalize_index(cycle_idx)
+        key = (cycle_idx, field)
+        arr = self._arrays.get(key)
+        if arr is None:
+            arr = _to_column(self.cycle(cycle_idx).get(field))
+            self._arrays[key] = arr
+        return arr
+
+    def phases(self, cycle_idx):
+        """获取周期的阶段表（由电流一次性划分，首次访问时计算并缓存）"""
+        cycle_idx = self._normalize_index(cycle_idx)
+        table = self._phases.get(cycle_idx)
+        if table is None:
+            table = PhaseTable(self.array(cycle_idx, 'current_in_A'))
+            self._phases[cycle_idx] = table
+        return table
+
+    def discharge_capacity_fade(self, stop=None):
+        """容量衰减向量：每个周期放电阶段（电流<0）的最大放电容量，无放电样本的周期为0
+
+        对全部周期一次性拼接后向量化计算并缓存，供F7-F13、F21、F58、F59等共享。
+        stop: 只需要前stop个周期时指定，此时只读取并计算这一前缀
+        """
+        n_cycles = len(self) if stop is None else min(stop, len(self))
+        if self._fade is None or len(self._fade) < n_cycles:
+            fade = self._compute_fade(n_cycles)
+            fade.setflags(write=False)
+            self._fade = fade
+        return self._fade[:n_cycles]
+
+    def _compute_fade(self, n_cycles):
+        """计算前n_cycles个周期的容量衰减向量"""
+        currents = []
+        capacities = []
+        for cycle_idx in range(n_cycles):
+            current = self._peek(cycle_idx, 'current_in_A')
+            capacity = self._peek(cycle_idx, 'discharge_capacity_in_Ah')
+            # 电流或容量缺失的周期按空周期处理；长度不一致时按较短者对齐
+            n = min(len(current), len(capacity))
+            currents.append(current[:n])
+            capacities.append(capacity[:n])
+        offsets = np.zeros(n_cycles + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(c) for c in currents])
+        flat_current = np.concatenate(currents) if currents else np.empty(0)
+        flat_capacity = np.concatenate(capacities) if capacities else np.empty(0)
+        return discharge_capacity_fade(flat_current, flat_capacity, offsets)
+
+    def _peek(self, cycle_idx, field):
+        """读取周期信号：已缓存则复用，否则临时转换而不写入缓存"""
+        arr = self._arrays.get((cycle_idx, field))
+        if arr is None:
+            arr = _to_column(self.cycle(cycle_idx).get(field))
+        return arr
+
+    def derived(self, key, compute):
+        """缓存由周期数据派生的整电池结果（如Q(V)矩阵），同一key只计算一次"""
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
+
+    def clear_cache(self):
+        """释放已缓存的数组、阶段表、容量衰减向量和派生结果"""
+        self._arrays.clear()
+        self._phases.clear()
+        self._fade = None
+        self._derived.clear()
+
+
+def _to_column(value):
+    """将周期字段值转换为只读的一维连续数组"""
+    if value is None:
+        arr = np.empty(0, dtype=np.float64)
+    else:
+        arr = np.atleast_1d(np.asarray(value))
+        if arr.dtype.kind in 'iu':
+            arr = np.ascontiguousarray(arr, dtype=np.int64)
+        else:
+            arr = np.ascontiguousarray(arr, dtype=np.float64)
+        # 取视图后再设只读，避免修改调用方传入的原数组
+        arr = arr.view()
+    arr.setflags(write=False)
+    return arr
+
+
+def discharge_capacity_fade(current, capacity, offsets):
+    """由首尾拼接的电流、放电容量数组计算每个周期放电阶段的最大放电容量
+
+    offsets长度为周期数+1，第k个周期覆盖 [offsets[k], offsets[k+1])；无放电样本的周期为0。
+    放电容量中的NaN样本被忽略（与原先先过滤再求最大值一致），放电样本全为NaN的周期同样为0。
+    """
+    offsets = np.asarray(offsets)
+    fade = np.zeros(len(offsets) - 1, dtype=np.float64)
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        # 非放电样本置为-inf，按周期分段求最大值（fmax跳过NaN）；空周期不参与分段，相邻非空段之间不含任何样本
+        values = np.where(current < 0, capacity, -np.inf)
+        fade[nonempty] = np.fmax.reduceat(values, offsets[:-1][nonempty])
+        fade[np.isneginf(fade) | np.isnan(fade)] = 0
+    return fade
+
+
+def as_cycle_view(battery_data):
+    """接受CycleView或原始battery_data字典，统一返回CycleView"""
+    if isinstance(battery_data, CycleView):
+        return battery_data
+    return CycleView(battery_data)
@@ -0,0 +1,142 @@
+from cycle_view import CycleView, _to_column, as_cycle_view
+
+# 适配器只覆盖isu/、matr/两套特征模块所用的ISU-ILCC和MATR数据；
+# MIT（Severson）批次数据由collect_1.py、collect_3.py基于MIT.collect_base.BaseDataset及其summary单独计算，不经过本层
+
+# 规范周期字段：特征计算统一使用的字段名和单位（与MATR数据一致）
+# time_in_s为秒；ISU的纳秒时间戳换算为相对电池第一个时间点的秒数，差值计算不损失精度
+CANONICAL_FIELDS = ['current_in_A', 'voltage_in_V', 'charge_capacity_in_Ah', 'discharge_capacity_in_Ah',
+                    'time_in_s', 'temperature_in_C', 'Qdlin']
+
+
+def nanoseconds_since_start(view, values):
+    """纳秒时间戳换算为相对电池第一个时间点的秒数：先做整数减法再除以1e9，与原先 差值/1e9 的结果一致"""
+    if len(values) == 0:
+        return values
+    return (values - view.time_origin()) / 1e9
+
+
+class DatasetAdapter:
+    """数据集适配器：把某个数据来源的字段名和单位映射到规范结构
+
+    field_map: {规范字段: 来源字段}，未列出的字段同名
+    converters: {规范字段: 函数(规范视图, 来源数组) -> 规范数组}，单位换算
+    """
+
+    def __init__(self, name, field_map=None, converters=None):
+        self.name = name
+        self.field_map = field_map or {}
+        self.converters = converters or {}
+
+    def __repr__(self):
+        return f"DatasetAdapter({self.name!r})"
+
+    @property
+    def is_identity(self):
+        """来源数据已是规范结构，不需要包装"""
+        return not self.field_map and not self.converters
+
+    def source_field(self, field):
+        return self.field_map.get(field, field)
+
+    def view(self, battery_data):
+        """规范周期视图，接受原始battery_data字典或周期视图
+
+        已是规范视图（由任一适配器转换）时原样返回；来源已是规范结构时直接返回来源视图。
+        包装视图缓存在来源视图上，同一颗电池的各特征组共用一个。
+        """
+        if isinstance(battery_data, CanonicalCycleView):
+            return battery_data
+        source = as_cycle_view(battery_data)
+        if self.is_identity:
+            return source
+        return source.derived(('canonical', self.name), lambda: CanonicalCycleView(source, self))
+
+
+class CanonicalCycleView(CycleView):
+    """来源周期视图上的规范视图：按适配器换算字段名和单位
+
+    需要换算的字段首次访问时转换并缓存；其余字段、阶段表和容量衰减向量直接使用来源视图（及其缓存和快速路径）。
+    cycle()返回来源的原始周期字典，字段名为来源字段名。
+    """
+
+    def __init__(self, source, adapter):
+        self.source = source
+        self.adapter = adapter
+        self.battery_data = source.battery_data
+        self.cycle_data = source.cycle_data
+        self._arrays = {}
+        self._phases = {}
+        self._fade = None
+        self._derived = {}
+        self._time_origin = None
+
+    def __len__(self):
+        return len(self.source)
+
+    def cycle(self, cycle_idx):
+        return self.source.cycle(cycle_idx)
+
+    def has_field(self, cycle_idx, field):
+        return self.source.has_field(cycle_idx, self.adapter.source_field(field))
+
+    def sample_count(self, cycle_idx, field='current_in_A'):
+        return self.source.sample_count(cycle_idx, self.adapter.source_field(field))
+
+    def array(self, cycle_idx, field):
+        convert = self.adapter.converters.get(field)
+        if convert is None:
+            return self.source.array(cycle_idx, self.adapter.source_field(field))
+        cycle_idx = self._normalize_index(cycle_idx)
+        key = (cycle_idx, field)
+        arr = self._arrays.get(key)
+        if arr is None:
+            arr = _to_column(convert(self, self.source.array(cycle_idx, self.adapter.source_field(field))))
+            self._arrays[key] = arr
+        return arr
+
+    def _peek(self, cycle_idx, field):
+        arr = self._arrays.get((cycle_idx, field))
+        if arr is not None:
+            return arr
+        arr = self.source._peek(cycle_idx, self.adapter.source_field(field))
+        convert = self.adapter.converters.get(field)
+        return arr if convert is None else _to_column(convert(self, arr))
+
+    def _same_as_source(self, field):
+        """字段在来源中同名且不需要换算，来源视图按该字段计算的结果可以直接使用"""
+        return field not in self.adapter.converters and self.adapter.source_field(field) == field
+
+    def phases(self, cycle_idx):
+        if not self._same_as_source('current_in_A'):
+            return super().phases(cycle_idx)
+        return self.source.phases(cycle_idx)
+
+    def discharge_capacity_fade(self, stop=None):
+        if not (self._same_as_source('current_in_A') and self._same_as_source('discharge_capacity_in_Ah')):
+            return super().discharge_capacity_fade(stop)
+        return self.source.discharge_capacity_fade(stop)
+
+    def time_origin(self):
+        """电池第一个时间点（来源单位），即第一个有时间数据的周期的第一个值"""
+        if self._time_origin is None:
+            field = self.adapter.source_field('time_in_s')
+            for cycle_idx in range(len(self.source)):
+                if self.source.sample_count(cycle_idx, field) > 0:
+                    self._time_origin = self.source.array(cycle_idx, field)[0]
+                    break
+        return self._time_origin
+
+    def clear_cache(self):
+        """释放本视图和来源视图的缓存"""
+        super().clear_cache()
+        self.source.clear_cache()
+
+
+# ISU-ILCC：字段名已是规范名，时间为纳秒时间戳
+ISU_ADAPTER = DatasetAdapter('isu', converters={'time_in_s': nanoseconds_since_start})
+
+# MATR：即规范结构
+MATR_ADAPTER = DatasetAdapter('matr')
+
+ADAPTERS = {adapter.name: adapter for adapter in (ISU_ADAPTER, MATR_ADAPTER)}
@@ -0,0 +1,219 @@
+import os
+import glob
+import json
+import pickle
+import hashlib
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cycle_view import CycleView
+
+# 清单格式版本，记录内容变化时递增，旧清单中的条目全部重新生成
+MANIFEST_VERSION = 1
+
+# 清单文件名，放在数据目录下
+MANIFEST_FILE = 'manifest.json'
+
+# 采样间隔中位数超过该值时认为时间戳单位为纳秒（以秒计的采样间隔不会超过一天多）
+NS_INTERVAL_THRESHOLD = 1e5
+
+
+def manifest_path_for(data_dir):
+    return os.path.join(data_dir, MANIFEST_FILE)
+
+
+def detect_time_unit(view):
+    """由第一个有两个以上时间点的周期的采样间隔中位数判断time_in_s的单位：'s'或'ns'，无时间数据时为None"""
+    for cycle_idx in range(len(view)):
+        t = view.array(cycle_idx, 'time_in_s')
+        if len(t) < 2:
+            continue
+        dt = np.diff(t)
+        dt = dt[dt > 0]
+        if len(dt) > 0:
+            return 'ns' if np.median(dt) > NS_INTERVAL_THRESHOLD else 's'
+    return None
+
+
+def time_dtype(view):
+    """第一个有时间数据的周期中time_in_s的数组类型（整数为int64，其余为float64），无时间数据时为None"""
+    for cycle_idx in range(len(view)):
+        if view.has_field(cycle_idx, 'time_in_s'):
+            return str(view.array(cycle_idx, 'time_in_s').dtype)
+    return None
+
+
+def describe_battery(battery_data):
+    """电池数据的清单内容：周期数、每个周期的采样点数、顶层字段、周期字段、时间单位
+
+    周期字段为任一周期中出现过的字段名（值可能为None）；partial_fields为并非每个周期都有非None值的字段。
+    """
+    view = CycleView(battery_data)
+    field_counts = {}
+    for cycle_idx in range(len(view)):
+        for field, value in view.cycle(cycle_idx).items():
+            field_counts[field] = field_counts.get(field, 0) + (value is not None)
+    return {
+        'n_cycles': len(view),
+        'sample_counts': [view.sample_count(cycle_idx) for cycle_idx in range(len(view))],
+        'top_fields': sorted(battery_data) if isinstance(battery_data, dict) else [],
+        'cycle_fields': sorted(field_counts),
+        'partial_fields': sorted(field for field, count in field_counts.items() if count < len(view)),
+        'time_unit': detect_time_unit(view),
+        'time_dtype': time_dtype(view),
+    }
+
+
+def describe_file(pkl_path):
+    """读取pkl文件生成清单条目，返回 (文件名, 条目, 错误信息)"""
+    filename = os.path.basename(pkl_path)
+    try:
+        stat = os.stat(pkl_path)
+        with open(pkl_path, 'rb') as f:
+            raw = f.read()
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': hashlib.sha256(raw).hexdigest()}
+        entry.update(describe_battery(pickle.loads(raw)))
+        return filename, entry, None
+    except Exception:
+        return filename, None, traceback.format_exc()
+
+
+def load_manifest(data_dir, manifest_path=None):
+    """读取数据目录的清单，返回 {文件名: 条目}；清单不存在、损坏或版本不符时返回空字典"""
+    manifest_path = manifest_path or manifest_path_for(data_dir)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(entries, data_dir, manifest_path=None):
+    """先写临时文件再改名保存清单"""
+    manifest_path = manifest_path or manifest_path_for(data_dir)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': entries}, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def is_fresh(entry, file_path):
+    """清单条目是否对应文件当前的内容（按大小和修改时间判断）"""
+    if entry is None:
+        return False
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+
+
+def fresh_entry(manifest, file_path):
+    """文件在清单中的条目，文件已修改或不在清单中时返回None"""
+    entry = manifest.get(os.path.basename(file_path))
+    return entry if is_fresh(entry, file_path) else None
+
+
+def build_manifest(data_dir, workers=1, manifest_path=None, force=False):
+    """生成或增量更新数据目录的清单：只重新读取新增或修改过的pkl文件，删除已不存在文件的条目
+
+    返回 {文件名: 条目}。读取失败的文件不写入清单，下次更新时重试。
+    """
+    pkl_files = sorted(glob.glob(os.path.join(data_dir, '*.pkl')))
+    old = {} if force else load_manifest(data_dir, manifest_path)
+    entries = {}
+    stale = []
+    for path in pkl_files:
+        entry = old.get(os.path.basename(path))
+        if is_fresh(entry, path):
+            entries[os.path.basename(path)] = entry
+        else:
+            stale.append(path)
+    print(f"找到 {len(pkl_files)} 个pkl文件，需要读取 {len(stale)} 个")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        results = (describe_file(path) for path in stale)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(describe_file, path) for path in stale]
+        results = (future.result() for future in futures)
+
+    failed = 0
+    try:
+        for filename, entry, error in results:
+            if error is not None:
+                failed += 1
+                print(f"读取 {filename} 失败:\n{error}")
+            else:
+                entries[filename] = entry
+                print(f"{filename}: {entry['n_cycles']} 个周期")
+    finally:
+        if workers > 1:
+            executor.shutdown()
+
+    # 按文件名排序保存，清单内容与文件读取顺序无关
+    entries = {name: entries[name] for name in sorted(entries)}
+    save_manifest(entries, data_dir, manifest_path)
+    print(f"清单更新完成: 共 {len(entries)} 个文件，新读取 {len(stale) - failed} 个，失败 {failed} 个")
+    return entries
+
+
+def split_short_files(file_paths, manifest, min_cycles):
+    """按清单挑出周期数不足min_cycles的文件，返回 (仍需处理的文件, [(文件名, 周期数)])
+
+    清单中没有或已过期的文件留给提取流程按实际数据判断。
+    """
+    remaining = []
+    short = []
+    for path in file_paths:
+        entry = fresh_entry(manifest, path)
+        if entry is not None and entry['n_cycles'] < min_cycles:
+            short.append((os.path.basename(path), entry['n_cycles']))
+        else:
+            remaining.append(path)
+    return remaining, short
+
+
+def print_manifest_fields(file_paths, manifest):
+    """按清单打印每个文件的周期数、采样点数、时间单位和缺失字段，不读取数据
+
+    返回 (全部顶层字段, 全部周期字段, 清单中没有或已过期的文件)；没有清单时返回None。
+    """
+    if not manifest:
+        return None
+    print("按清单汇总（不读取数据）:")
+    top_fields = set()
+    cycle_fields = set()
+    uncovered = []
+    for path in file_paths:
+        entry = fresh_entry(manifest, path)
+        if entry is None:
+            uncovered.append(path)
+            continue
+        counts = entry['sample_counts']
+        line = (f"  {os.path.basename(path)}: {entry['n_cycles']} 个周期，"
+                f"采样点数 {min(counts, default=0)}-{max(counts, default=0)}，时间单位 {entry['time_unit']}")
+        if entry['partial_fields']:
+            line += f"，部分周期缺少或为None: {entry['partial_fields']}"
+        print(line)
+        top_fields.update(entry['top_fields'])
+        cycle_fields.update(entry['cycle_fields'])
+    return top_fields, cycle_fields, uncovered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成或更新电池数据目录的清单（周期数、采样点数、字段、时间单位）")
+    parser.add_argument("data_dir", help="pkl文件所在目录，例如 data/ISU_ILCC")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--output", default=None, help="清单文件，默认为数据目录下的manifest.json")
+    parser.add_argument("--force", action="store_true", help="忽略已有清单，全部重新读取")
+    args = parser.parse_args()
+    build_manifest(args.data_dir, workers=args.workers, manifest_path=args.output, force=args.force)
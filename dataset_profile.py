@@ -0,0 +1,384 @@
+import os
+import glob
+import json
+import pickle
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cycle_view import CycleView
+from dataset_manifest import detect_time_unit, is_fresh
+
+# 报告格式版本，统计内容变化时递增，旧报告中的逐文件统计全部重新生成
+PROFILE_VERSION = 2
+
+# 报告文件名，放在数据目录下
+PROFILE_FILE = 'dataset_profile.json'
+
+# 各时间单位换算为秒的倍数
+TIME_UNIT_SECONDS = {'s': 1.0, 'ns': 1e-9}
+
+# 每个字段保留的异常值示例数
+MAX_ERROR_EXAMPLES = 3
+
+
+def profile_path_for(data_dir):
+    return os.path.join(data_dir, PROFILE_FILE)
+
+
+class RunningStats:
+    """可合并的流式统计：个数、NaN个数、无穷值个数、有限值的最小值、最大值、均值和方差
+
+    每批数据先用numpy求批内均值和平方偏差和，再按Chan等人的并行公式合并，
+    大数值（如纳秒时间戳）也不会因平方和相减而损失精度。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nan = 0
+        self.inf = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add_array(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nan_mask = np.isnan(values)
+        inf_mask = np.isinf(values)
+        self.nan += int(np.count_nonzero(nan_mask))
+        self.inf += int(np.count_nonzero(inf_mask))
+        finite = values[~(nan_mask | inf_mask)]
+        if len(finite) == 0:
+            return
+        batch = RunningStats()
+        batch.count = len(finite)
+        batch.min = float(finite.min())
+        batch.max = float(finite.max())
+        batch.mean = float(finite.mean())
+        batch.m2 = float(np.sum((finite - batch.mean) ** 2))
+        self.merge(batch)
+
+    def merge(self, other):
+        self.nan += other.nan
+        self.inf += other.inf
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.min, self.max, self.mean, self.m2 = other.count, other.min, other.max, other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / self.count)) if self.count > 0 else None
+
+    def to_dict(self):
+        finite = self.count > 0
+        return {'count': self.count, 'nan': self.nan, 'inf': self.inf,
+                'min': self.min if finite else None, 'max': self.max if finite else None,
+                'mean': self.mean if finite else None, 'std': self.std, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.count, stats.nan, stats.inf, stats.m2 = d['count'], d['nan'], d['inf'], d['m2']
+        if stats.count > 0:
+            stats.min, stats.max, stats.mean = d['min'], d['max'], d['mean']
+        return stats
+
+
+class FieldStats:
+    """一个周期字段在全部周期上的统计：出现次数、为None的次数、数据类型、长度分布和数值分布
+
+    长度分布按2的幂分桶（桶k包含长度在[2^(k-1), 2^k)之间的周期，桶0为空数组），可直接合并。
+    无法转换为数组的值（如长度不一的嵌套列表）记为异常：errors为次数，error_examples为前几条错误信息。
+    """
+
+    def __init__(self):
+        self.present = 0
+        self.none = 0
+        self.dtypes = {}
+        self.lengths = RunningStats()
+        self.length_hist = {}
+        self.values = RunningStats()
+        self.errors = 0
+        self.error_examples = []
+
+    def add(self, value):
+        self.present += 1
+        if value is None:
+            self.none += 1
+            return
+        try:
+            self._add_value(value)
+        except (TypeError, ValueError, OverflowError) as e:
+            self.errors += 1
+            self._add_examples([f"{type(value).__name__}: {type(e).__name__}: {e}"])
+
+    def _add_examples(self, examples):
+        for example in examples:
+            if len(self.error_examples) >= MAX_ERROR_EXAMPLES:
+                break
+            if example not in self.error_examples:
+                self.error_examples.append(example)
+
+    def _add_value(self, value):
+        arr = np.asarray(value)
+        dtype = type(value).__name__ if arr.dtype == object else str(arr.dtype)
+        self.dtypes[dtype] = self.dtypes.get(dtype, 0) + 1
+        length = arr.size
+        self.lengths.add_array([length])
+        bucket = str(int(length).bit_length())
+        self.length_hist[bucket] = self.length_hist.get(bucket, 0) + 1
+        if arr.dtype.kind in 'biuf':
+            self.values.add_array(arr)
+
+    def merge(self, other):
+        self.present += other.present
+        self.none += other.none
+        for table, other_table in ((self.dtypes, other.dtypes), (self.length_hist, other.length_hist)):
+            for key, count in other_table.items():
+                table[key] = table.get(key, 0) + count
+        self.lengths.merge(other.lengths)
+        self.values.merge(other.values)
+        self.errors += other.errors
+        self._add_examples(other.error_examples)
+
+    def to_dict(self):
+        return {'present': self.present, 'none': self.none, 'dtypes': self.dtypes,
+                'lengths': self.lengths.to_dict(), 'length_hist': self.length_hist, 'values': self.values.to_dict(),
+                'errors': self.errors, 'error_examples': self.error_examples}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.present, stats.none = d['present'], d['none']
+        stats.dtypes, stats.length_hist = dict(d['dtypes']), dict(d['length_hist'])
+        stats.lengths = RunningStats.from_dict(d['lengths'])
+        stats.values = RunningStats.from_dict(d['values'])
+        stats.errors, stats.error_examples = d['errors'], list(d['error_examples'])
+        return stats
+
+
+def profile_battery(battery_data):
+    """单颗电池的统计：周期数、各周期字段的FieldStats、顶层字段类型、采样间隔（秒）和时间倒退的次数"""
+    view = CycleView(battery_data)
+    fields = {}
+    for cycle_idx in range(len(view)):
+        for field, value in view.cycle(cycle_idx).items():
+            fields.setdefault(field, FieldStats()).add(value)
+
+    # 时间无法转换为数组的周期已在time_in_s的字段统计中记为异常，这里跳过
+    try:
+        time_unit = detect_time_unit(view)
+    except (TypeError, ValueError):
+        time_unit = None
+    interval = RunningStats()
+    backward_steps = 0
+    for cycle_idx in range(len(view)):
+        try:
+            t = view.array(cycle_idx, 'time_in_s')
+        except (TypeError, ValueError):
+            continue
+        if len(t) < 2:
+            continue
+        dt = np.diff(t)
+        backward_steps += int(np.count_nonzero(dt < 0))
+        interval.add_array(dt * TIME_UNIT_SECONDS.get(time_unit, 1.0))
+
+    top_fields = {}
+    if isinstance(battery_data, dict):
+        top_fields = {key: type(value).__name__ for key, value in battery_data.items() if key != 'cycle_data'}
+    return {
+        'n_cycles': len(view),
+        'time_unit': time_unit,
+        'top_fields': top_fields,
+        'fields': {field: stats.to_dict() for field, stats in fields.items()},
+        'interval_s': interval.to_dict(),
+        'backward_steps': backward_steps,
+    }
+
+
+def profile_file(pkl_path):
+    """读取单个pkl文件并统计，返回 (文件名, 统计, 错误信息)"""
+    filename = os.path.basename(pkl_path)
+    try:
+        stat = os.stat(pkl_path)
+        with open(pkl_path, 'rb') as f:
+            battery_data = pickle.load(f)
+        record = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        record.update(profile_battery(battery_data))
+        return filename, record, None
+    except Exception:
+        return filename, None, traceback.format_exc()
+
+
+def summarize_files(files):
+    """把逐文件统计逐个合并为整个数据集的统计，合并结果的大小与文件数、周期数无关"""
+    n_cycles = 0
+    fields = {}
+    top_fields = {}
+    interval = RunningStats()
+    backward_steps = 0
+    time_units = {}
+    for record in files.values():
+        n_cycles += record['n_cycles']
+        for field, d in record['fields'].items():
+            fields.setdefault(field, FieldStats()).merge(FieldStats.from_dict(d))
+        for key, type_name in record['top_fields'].items():
+            entry = top_fields.setdefault(key, {'files': 0, 'types': {}})
+            entry['files'] += 1
+            entry['types'][type_name] = entry['types'].get(type_name, 0) + 1
+        interval.merge(RunningStats.from_dict(record['interval_s']))
+        backward_steps += record['backward_steps']
+        unit = str(record['time_unit'])
+        time_units[unit] = time_units.get(unit, 0) + 1
+
+    cycle_fields = {}
+    for field, stats in sorted(fields.items()):
+        d = stats.to_dict()
+        # 缺失率：该字段不存在的周期占全部周期的比例；None率：字段值为None的周期占比
+        d['missing_rate'] = 1 - stats.present / n_cycles if n_cycles else 0.0
+        d['none_rate'] = stats.none / n_cycles if n_cycles else 0.0
+        d['nan_rate'] = stats.values.nan / (stats.values.count + stats.values.nan + stats.values.inf) \
+            if stats.values.count + stats.values.nan + stats.values.inf else 0.0
+        cycle_fields[field] = d
+    return {'n_files': len(files), 'n_cycles': n_cycles, 'time_units': time_units,
+            'top_fields': dict(sorted(top_fields.items())), 'cycle_fields': cycle_fields,
+            'interval_s': interval.to_dict(), 'backward_steps': backward_steps}
+
+
+def load_profile(data_dir, output_path=None):
+    """读取数据集统计报告，不存在、损坏或版本不符时返回None"""
+    output_path = output_path or profile_path_for(data_dir)
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return report if report.get('version') == PROFILE_VERSION else None
+
+
+def profile_directory(data_dir, workers=1, output_path=None, force=False, save=True):
+    """并行统计数据目录下全部pkl文件的全部周期，增量更新并保存报告（JSON），返回报告
+
+    已有报告中大小和修改时间未变的文件直接复用逐文件统计，只重新读取新增或修改过的文件。
+    save为False时只返回报告，不写文件（已有报告仍会被复用）。
+    报告包含：summary为合并后的整体统计（各字段的类型、长度分布、缺失/None/NaN比例、最值、采样间隔），
+    files为逐文件统计，failed为读取失败的文件及错误信息。
+    """
+    output_path = output_path or profile_path_for(data_dir)
+    pkl_files = sorted(glob.glob(os.path.join(data_dir, '*.pkl')))
+    old = None if force else load_profile(data_dir, output_path)
+    old_files = old['files'] if old is not None else {}
+    files = {}
+    stale = []
+    for path in pkl_files:
+        record = old_files.get(os.path.basename(path))
+        if is_fresh(record, path):
+            files[os.path.basename(path)] = record
+        else:
+            stale.append(path)
+    print(f"找到 {len(pkl_files)} 个pkl文件，需要读取 {len(stale)} 个")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    def collect(path, future):
+        try:
+            return future.result()
+        except Exception:
+            # 工作进程异常退出（BrokenProcessPool）等情况，只记为该文件失败
+            return os.path.basename(path), None, traceback.format_exc()
+
+    if workers <= 1:
+        results = (profile_file(path) for path in stale)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(profile_file, path) for path in stale]
+        results = (collect(path, future) for path, future in zip(stale, futures))
+
+    failed = {}
+    try:
+        for filename, record, error in results:
+            if error is not None:
+                failed[filename] = error
+                print(f"读取 {filename} 失败:\n{error}")
+            else:
+                files[filename] = record
+    finally:
+        if workers > 1:
+            executor.shutdown()
+
+    files = {name: files[name] for name in sorted(files)}
+    report = {'version': PROFILE_VERSION, 'summary': summarize_files(files), 'files': files, 'failed': failed}
+    if not save:
+        return report
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    return report
+
+
+def print_profile(report):
+    """打印整体统计：每个周期字段一行"""
+    summary = report['summary']
+    print(f"共 {summary['n_files']} 个文件、{summary['n_cycles']} 个周期，时间单位: {summary['time_units']}")
+    if report['failed']:
+        print(f"读取失败 {len(report['failed'])} 个文件: {sorted(report['failed'])}")
+    print(f"顶层字段: {summary['top_fields']}")
+    for field, d in summary['cycle_fields'].items():
+        lengths, values = d['lengths'], d['values']
+        line = f"  {field}: 类型 {d['dtypes']}，缺失 {d['missing_rate']:.2%}，None {d['none_rate']:.2%}，NaN {d['nan_rate']:.2%}"
+        if lengths['count'] > 0:
+            line += f"，长度 {lengths['min']:.0f}-{lengths['max']:.0f}"
+        if values['count'] > 0:
+            line += f"，取值 [{values['min']:.6g}, {values['max']:.6g}]"
+        if d['errors'] > 0:
+            line += f"，异常 {d['errors']} 次（{'; '.join(d['error_examples'])}）"
+        print(line)
+    interval = summary['interval_s']
+    if interval['count'] > 0:
+        print(f"采样间隔(s): 最小 {interval['min']:.6g}，最大 {interval['max']:.6g}，"
+              f"均值 {interval['mean']:.6g}，标准差 {interval['std']:.6g}，时间倒退 {summary['backward_steps']} 次")
+
+
+def file_problems(report, file_path, required_fields):
+    """按统计报告检查单个文件是否可用于特征提取，不读取数据，返回问题描述列表（空列表表示未发现问题）"""
+    filename = os.path.basename(file_path)
+    if filename in report['failed']:
+        return ["文件读取失败"]
+    record = report['files'].get(filename)
+    if not is_fresh(record, file_path):
+        return ["文件不在统计报告中或已修改"]
+    problems = []
+    for field in required_fields:
+        d = record['fields'].get(field)
+        if d is None or d['present'] - d['none'] < record['n_cycles']:
+            problems.append(f"{field} 在部分周期缺失或为None")
+        elif d['errors'] > 0:
+            problems.append(f"{field} 在 {d['errors']} 个周期无法转换为数组")
+        elif d['values']['nan'] > 0:
+            problems.append(f"{field} 含 {d['values']['nan']} 个NaN")
+    if record['backward_steps'] > 0:
+        problems.append(f"时间倒退 {record['backward_steps']} 次")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="并行统计电池数据目录全部文件、全部周期的字段类型、长度、缺失率、取值范围和采样间隔")
+    parser.add_argument("data_dir", help="pkl文件所在目录，例如 data/ISU_ILCC")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--output", default=None, help="报告文件（JSON），默认为数据目录下的dataset_profile.json")
+    parser.add_argument("--force", action="store_true", help="忽略已有报告，全部重新读取")
+    args = parser.parse_args()
+    report = profile_directory(args.data_dir, workers=args.workers, output_path=args.output, force=args.force)
+    print_profile(report)
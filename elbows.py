@@ -0,0 +1,79 @@
+import numpy as np
+
+# 与KneeLocator比较时，拐点位置相差不超过该采样点数即认为一致
+DEFAULT_INDEX_TOLERANCE = 1
+
+
+def pad_curves(curves):
+    """把长度不一的 (x, y) 曲线列表补齐为两个 曲线数×最大点数 的float64矩阵，不足部分为NaN"""
+    n_points = max((len(x) for x, _ in curves), default=0)
+    xs = np.full((len(curves), n_points), np.nan)
+    ys = np.full((len(curves), n_points), np.nan)
+    for row, (x, y) in enumerate(curves):
+        xs[row, :len(x)] = x
+        ys[row, :len(y)] = y
+    return xs, ys
+
+
+def difference_curves(xs, ys):
+    """逐行把曲线归一化到[0, 1]后求 y - x，即各点到归一化对角线（弦）的距离（相差常数因子√2）
+
+    与KneeLocator(curve='concave', direction='increasing')内部的差值曲线相同；NaN补齐的位置仍为NaN。
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_min = np.nanmin(xs, axis=1, keepdims=True)
+        y_min = np.nanmin(ys, axis=1, keepdims=True)
+        x_norm = (xs - x_min) / (np.nanmax(xs, axis=1, keepdims=True) - x_min)
+        y_norm = (ys - y_min) / (np.nanmax(ys, axis=1, keepdims=True) - y_min)
+    return y_norm - x_norm
+
+
+def elbow_indices(xs, ys):
+    """凹形递增曲线的拐点：逐行取到弦距离最大的点，全部曲线一次计算
+
+    xs, ys: 曲线数×点数 矩阵（可用pad_curves补齐），返回每条曲线拐点的下标；
+    曲线少于3个点、x或y为常数等找不到拐点时为-1。
+    KneeLocator取差值曲线上第一个超过阈值后回落的局部极大值，这里取全局最大值：曲线平滑时两者相同，
+    噪声较大的原始曲线上KneeLocator会停在噪声造成的局部极大值，两者不再一致，因此输入应先平滑。
+    """
+    xs = np.atleast_2d(np.asarray(xs, dtype=np.float64))
+    ys = np.atleast_2d(np.asarray(ys, dtype=np.float64))
+    difference = difference_curves(xs, ys)
+    valid = np.isfinite(difference)
+    indices = np.argmax(np.where(valid, difference, -np.inf), axis=1)
+    # 最大距离不为正（直线或凸形）时没有拐点
+    found = np.sum(valid, axis=1) >= 3
+    found[found] = difference[found, indices[found]] > 0
+    return np.where(found, indices, -1)
+
+
+def find_elbows(curves):
+    """一组 (x, y) 曲线的拐点下标列表，找不到时为None；曲线应已平滑（见elbow_indices）"""
+    if not curves:
+        return []
+    return [int(index) if index >= 0 else None for index in elbow_indices(*pad_curves(curves))]
+
+
+def kneed_elbows(curves):
+    """用kneed.KneeLocator逐条求拐点下标（与原先get_elbows_slope相同的参数），找不到时为None，用于对比"""
+    from kneed import KneeLocator
+
+    indices = []
+    for x, y in curves:
+        elbow = KneeLocator(x, y, curve='concave', direction='increasing').elbow
+        indices.append(None if elbow is None else int(np.argmin(np.abs(np.asarray(x) - elbow))))
+    return indices
+
+
+def compare_elbows(found, reference, tolerance=DEFAULT_INDEX_TOLERANCE):
+    """比较两组拐点下标，返回曲线数、一致数（都为None或相差不超过tolerance个点）、一致比例和最大下标差"""
+    agree = 0
+    max_diff = 0
+    for a, b in zip(found, reference):
+        if a is None or b is None:
+            agree += a is None and b is None
+            continue
+        max_diff = max(max_diff, abs(a - b))
+        agree += abs(a - b) <= tolerance
+    n = len(found)
+    return {'curves': n, 'agree': agree, 'agree_ratio': agree / n if n else 1.0, 'max_index_diff': max_diff}
@@ -1,16 +1,18 @@
+import argparse
+from feature_table import convert_table
+
 # 提取指定特征列：F1, F5, F11, F14, F59, Cycle_Life
-input_file = "matr_all_features.txt"
-output_file = "matr_selected_features.txt"
+SELECTED_COLUMNS = ['Battery_Name', 'F1', 'F5', 'F11', 'F14', 'F59', 'Cycle_Life']
 
-with open(input_file, 'r', encoding='utf-8') as f:
-    lines = f.readlines()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按列名从特征表中提取指定特征")
+    parser.add_argument("--input", default="matr_all_features.txt", help="输入特征表")
+    parser.add_argument("--output", default="matr_selected_features.txt",
+                        help="输出文件，扩展名为.npy时保存为结构化数组，.parquet时保存为Parquet（需要pyarrow），其余为制表符分隔文本")
+    parser.add_argument("--columns", nargs='+', default=SELECTED_COLUMNS, help="按列名选择，例如 F1 F5 Cycle_Life")
+    args = parser.parse_args()
 
-with open(output_file, 'w', encoding='utf-8') as f:
-    for line in lines:
-        parts = line.strip().split('\t')
-        if len(parts) >= 61:  # 确保有足够的列（包括Cycle_Life）
-            # 提取指定列：Battery_Name(0), F1(1), F5(5), F11(11), F14(14), F59(59), Cycle_Life(60)
-            selected = [parts[0], parts[1], parts[5], parts[11], parts[14], parts[59], parts[60]]
-            f.write('\t'.join(selected) + '\n')
+    # 逐行流式读取，不需要把整个特征表读入内存
+    convert_table(args.input, args.output, args.columns)
 
-print(f"已提取特征并保存到 {output_file}")
\ No newline at end of file
+    print(f"已提取特征并保存到 {args.output}")
@@ -0,0 +1,99 @@
+import os
+import pickle
+import hashlib
+
+# 计算文件哈希时每次读取的块大小
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def sha256_file(path):
+    """计算文件内容的sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_dump(obj, path):
+    """先写临时文件再改名，多个进程同时写入时读到的总是完整文件"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+class FeatureCache:
+    """按电池文件内容哈希缓存各特征组的计算结果
+
+    每颗电池一个缓存文件 entries/<sha256>.pkl，记录周期数和各特征组的 (版本号, 特征值)；
+    特征组的版本号即各特征模块中的FEATURE_VERSION，修改某组特征后递增版本号，只有该组会被重新计算。
+    文件哈希按 (路径, 大小, 修改时间) 记在 hashes/ 下，文件未变化时不必重新读取整个文件。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.entries_dir = os.path.join(cache_dir, 'entries')
+        self.hashes_dir = os.path.join(cache_dir, 'hashes')
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.hashes_dir, exist_ok=True)
+
+    def _hash_stamp_path(self, path):
+        name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.hashes_dir, name + '.pkl')
+
+    def file_hash(self, path):
+        """电池文件的内容哈希；列式存储目录使用转换时记录的源文件哈希"""
+        if os.path.isdir(path):
+            from columnar_store import load_meta
+            source_hash = load_meta(path).get('source_sha256')
+            if source_hash is None:
+                raise ValueError(f"列式存储缺少源文件哈希，请重新转换: {path}")
+            return source_hash
+
+        stat = os.stat(path)
+        stamp_path = self._hash_stamp_path(path)
+        stamp = _load(stamp_path)
+        if stamp is not None and stamp[:2] == (stat.st_size, stat.st_mtime_ns):
+            return stamp[2]
+        file_hash = sha256_file(path)
+        _atomic_dump((stat.st_size, stat.st_mtime_ns, file_hash), stamp_path)
+        return file_hash
+
+    def _entry_path(self, key):
+        return os.path.join(self.entries_dir, key + '.pkl')
+
+    def lookup(self, key, versions):
+        """读取缓存
+
+        versions: {组名: 当前版本号}
+        返回 (周期数, {组名: 特征值})，只包含版本号一致的组；没有缓存时周期数为None
+        """
+        entry = _load(self._entry_path(key))
+        if entry is None:
+            return None, {}
+        groups = {}
+        for name, version in versions.items():
+            cached = entry['groups'].get(name)
+            if cached is not None and cached[0] == version:
+                groups[name] = cached[1]
+        return entry['n_cycles'], groups
+
+    def store(self, key, n_cycles, groups, versions):
+        """写入缓存，groups为本次可用的全部组 {组名: 特征值}，与已有的其他组合并"""
+        entry = _load(self._entry_path(key)) or {'n_cycles': n_cycles, 'groups': {}}
+        entry['n_cycles'] = n_cycles
+        for name, values in groups.items():
+            entry['groups'][name] = (versions[name], list(values))
+        _atomic_dump(entry, self._entry_path(key))
@@ -0,0 +1,392 @@
+import os
+import sys
+import traceback
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from cycle_view import as_cycle_view
+from columnar_store import StoreCycleView, open_battery, battery_name
+from feature_cache import FeatureCache
+from feature_profile import FeatureProfiler, measure, save_report, print_summary
+from prefetch import prefetch, warm_file
+from dataset_manifest import split_short_files
+from feature_table import FEATURE_NAMES, HORIZON_COLUMN, FeatureTableWriter, horizon_feature_names, table_columns
+
+# 参与特征提取的最少周期数，F1-F59均依赖前100个周期
+MIN_CYCLES = 100
+
+
+def feature_header(feature_names=FEATURE_NAMES, key_columns=()):
+    """特征表表头：Battery_Name、F1-F59、Cycle_Life（多时域时为对应的宽表或长表列）"""
+    return "\t".join(table_columns(feature_names, key_columns)) + "\n"
+
+
+class HorizonGroup:
+    """固定预测时域的特征组计算函数：calculate(view, horizon=horizon)，可被进程池序列化"""
+
+    def __init__(self, calculate, horizon):
+        self.calculate = calculate
+        self.horizon = horizon
+
+    def __call__(self, view):
+        return self.calculate(view, horizon=self.horizon)
+
+
+def expand_horizons(groups, horizons):
+    """把特征组展开到多个预测时域，组名为 组名@时域，按时域、再按组的顺序排列
+
+    展开后的特征组可直接用于compute_groups、extract_file、write_feature_table等：
+    同一颗电池各时域共用一个周期视图，已加载的周期数组、阶段表和容量衰减向量在时域之间共享，
+    缓存也按 组名@时域 分别保存。
+    """
+    for horizon in horizons:
+        # F1-F10的ΔQ以第10次循环为参考，F9-F10需要最后10个周期，时域须大于10
+        if horizon <= 10:
+            raise ValueError(f"预测时域须大于10: {horizon}")
+    return [(f"{name}@{horizon}", HorizonGroup(calculate, horizon), version)
+            for horizon in horizons for name, calculate, version in groups]
+
+
+def min_cycles(groups):
+    """参与特征提取的最少周期数：MIN_CYCLES，展开了更长时域时为最长的时域"""
+    horizons = [getattr(calculate, 'horizon', MIN_CYCLES) for _, calculate, _ in groups]
+    return max([MIN_CYCLES] + horizons)
+
+
+def compute_groups(view, groups, cached=None, profiler=None):
+    """计算各组特征，cached中已有的组直接复用，返回 {组名: 特征列表}
+
+    groups: [(组名, 计算函数, 版本号), ...]，按输出列顺序排列
+    profiler: FeatureProfiler，指定时记录每个特征组的耗时和内存峰值
+    """
+    cached = cached or {}
+    return {name: cached[name] if name in cached else measure(profiler, name, calculate, view)
+            for name, calculate, _ in groups}
+
+
+def merge_groups(results, groups, quiet=False):
+    """按列顺序拼接各组特征；quiet为True时不打印特征数量检查（如在线提取中每个周期都调用时）"""
+    # 验证特征数量
+    if not quiet:
+        print("  特征数量检查: " + ", ".join(f"{name}({len(results[name])})" for name, _, _ in groups))
+
+    # 合并所有特征
+    all_features = []
+    for name, _, _ in groups:
+        all_features += list(results[name])
+    return all_features
+
+
+def group_module(calculate):
+    """特征组计算函数所在的特征模块（按时域展开的特征组取原计算函数的模块）"""
+    calculate = getattr(calculate, 'calculate', calculate)
+    return sys.modules[calculate.__module__]
+
+
+def dataset_adapter(groups):
+    """各特征组模块用ADAPTER声明的数据集适配器；有特征组未声明或各组不一致时返回None，由各特征组自行转换"""
+    adapters = {getattr(group_module(calculate), 'ADAPTER', None) for _, calculate, _ in groups}
+    return adapters.pop() if len(adapters) == 1 else None
+
+
+def cycle_requirements(groups):
+    """汇总各特征组声明读取的周期，返回 (周期索引列表, 容量衰减向量需要的前缀周期数)
+
+    特征模块用REQUIRED_CYCLES声明读取的周期索引，用FADE_CYCLES声明需要容量衰减向量的前多少个周期
+    （None表示全部周期）。有特征组未声明时周期索引返回None，表示需要全部周期。
+    按时域展开的特征组使用模块的horizon_requirements(时域)。
+    """
+    cycles = set()
+    fade_cycles = 0
+    for _, calculate, _ in groups:
+        horizon = getattr(calculate, 'horizon', None)
+        module = group_module(calculate)
+        if horizon is not None and hasattr(module, 'horizon_requirements'):
+            required, group_fade = module.horizon_requirements(horizon)
+        else:
+            required = getattr(module, 'REQUIRED_CYCLES', None)
+            group_fade = getattr(module, 'FADE_CYCLES', None)
+        if required is None:
+            return None, None
+        cycles.update(required)
+        if group_fade is None or fade_cycles is None:
+            fade_cycles = None
+        else:
+            fade_cycles = max(fade_cycles, group_fade)
+    return sorted(cycles), fade_cycles
+
+
+def load_battery(file_path, groups):
+    """加载电池并返回周期视图（特征组声明了数据集适配器时为规范周期视图）
+
+    列式存储目录只把各特征组声明的周期读入内存，其余周期保持内存映射、按需读取；
+    F58等需要全部周期的特征只扫描电流和放电容量两列。pkl文件只能整体反序列化。
+    """
+    battery = open_battery(file_path)
+    if isinstance(battery, StoreCycleView):
+        cycles, _ = cycle_requirements(groups)
+        battery.materialize(range(len(battery)) if cycles is None else cycles)
+    return canonical_view(battery, groups)
+
+
+def canonical_view(battery_data, groups):
+    """加载时按特征组的数据集适配器统一转换一次，各特征组共用同一个规范周期视图"""
+    adapter = dataset_adapter(groups)
+    if adapter is None:
+        return as_cycle_view(battery_data)
+    return adapter.view(battery_data)
+
+
+def extract_all_features(battery_data, filename, groups, profiler=None):
+    """提取单颗电池的全部特征，周期数不足时返回 (None, None)"""
+    # 各特征组共享同一个周期视图，每个周期的数组只转换一次
+    view = canonical_view(battery_data, groups)
+    if profiler is not None:
+        profiler.record_sizes(view)
+    required = min_cycles(groups)
+    if len(view) < required:
+        print(f"跳过 {filename}: 周期数不足{required}个，实际周期数: {len(view)}")
+        return None, None
+
+    all_features = merge_groups(compute_groups(view, groups, profiler=profiler), groups)
+
+    # 标签：循环寿命
+    y = len(view)
+
+    return all_features, y
+
+
+def prepare_file(file_path, groups, cache_dir=None, profiler=None):
+    """读取阶段：查找缓存，需要计算时加载电池，返回 (缓存键, 缓存中的周期数, 命中缓存的特征组结果, 周期视图)
+
+    全部特征组命中缓存或缓存记录的周期数不足时不加载电池，周期视图为None。
+    """
+    if cache_dir is None:
+        return None, None, {}, measure(profiler, 'load', load_battery, file_path, groups)
+
+    versions = {name: version for name, _, version in groups}
+    cache = FeatureCache(cache_dir)
+    key = measure(profiler, 'hash', cache.file_hash, file_path)
+    n_cycles, cached = measure(profiler, 'cache', cache.lookup, key, versions)
+    if (n_cycles is not None and n_cycles < min_cycles(groups)) or len(cached) == len(groups):
+        return key, n_cycles, cached, None
+    return key, n_cycles, cached, measure(profiler, 'load', load_battery, file_path, groups)
+
+
+def prefetch_file(file_path, groups, cache_dir=None):
+    """在预读线程中执行prepare_file（不记录性能，见iter_results）"""
+    return prepare_file(file_path, groups, cache_dir)
+
+
+def extract_file(file_path, groups, cache_dir=None, profile=False, prepared=None):
+    """加载单个电池文件（pkl或列式存储目录）并提取特征，返回 (文件名, 特征, 标签, 错误信息, 性能记录)
+
+    异常被捕获并以错误信息返回，不影响其他电池。
+    指定cache_dir时按文件内容哈希查找缓存，全部特征组命中时不再读取电池数据，
+    只有缺失或版本号变化的特征组会被重新计算。
+    profile为True时记录加载、缓存查找和各特征组的耗时与内存峰值（见feature_profile.py），否则性能记录为None。
+    prepared: 返回prefetch_file结果的无参函数（如预读线程的future.result），指定时不再自己读取，
+    性能记录中另以'wait'阶段记录等待预读完成的时间。
+    """
+    filename = os.path.basename(file_path)
+    profiler = None
+    try:
+        filename = battery_name(file_path)
+        if profile:
+            profiler = FeatureProfiler(filename)
+            with profiler:
+                features, label = _extract_file(file_path, filename, groups, cache_dir, profiler, prepared)
+        else:
+            features, label = _extract_file(file_path, filename, groups, cache_dir, prepared=prepared)
+        error = None
+    except Exception:
+        features, label, error = None, None, traceback.format_exc()
+    return filename, features, label, error, None if profiler is None else profiler.report()
+
+
+def _extract_file(file_path, filename, groups, cache_dir=None, profiler=None, prepared=None):
+    """extract_file的主体，返回 (特征, 标签)，周期数不足时为 (None, None)"""
+    if prepared is None:
+        key, n_cycles, cached, view = prepare_file(file_path, groups, cache_dir, profiler)
+    else:
+        key, n_cycles, cached, view = measure(profiler, 'wait', prepared)
+    if cache_dir is None:
+        return extract_all_features(view, filename, groups, profiler)
+
+    versions = {name: version for name, _, version in groups}
+    required = min_cycles(groups)
+    cache = FeatureCache(cache_dir)
+    if n_cycles is not None and n_cycles < required:
+        print(f"跳过 {filename}: 周期数不足{required}个，实际周期数: {n_cycles}（缓存）")
+        return None, None
+    if len(cached) == len(groups):
+        print(f"  {filename}: 全部特征组命中缓存")
+        return merge_groups(cached, groups), n_cycles
+
+    if profiler is not None:
+        profiler.record_sizes(view)
+    if len(view) < required:
+        print(f"跳过 {filename}: 周期数不足{required}个，实际周期数: {len(view)}")
+        cache.store(key, len(view), {}, versions)
+        return None, None
+
+    results = compute_groups(view, groups, cached, profiler)
+    cache.store(key, len(view), results, versions)
+    recomputed = [name for name, _, _ in groups if name not in cached]
+    print(f"  {filename}: 重新计算 {', '.join(recomputed)}")
+    return merge_groups(results, groups), len(view)
+
+
+def iter_results(file_paths, groups, workers=1, cache_dir=None, profile=False, prefetch_depth=0):
+    """按文件顺序产出每个电池的提取结果；workers>1时使用进程池并行计算
+
+    prefetch_depth>0时读取与计算重叠：
+    - 单进程时后台线程提前读取后面prefetch_depth个电池（缓存查找和反序列化），内存中最多多驻留这么多颗电池；
+      profile为True时不预读：tracemalloc的峰值是整个进程的，后台读取的内存会计入当前电池的各阶段，
+      与计算重叠的读取耗时也会被重复计入各阶段占比；
+    - 进程池时后台线程按顺序把后面prefetch_depth个文件提前读入操作系统页缓存，文件读完后才提交计算任务，
+      工作进程加载时不再等待磁盘或网络存储；最多同时提交workers+prefetch_depth个任务。
+    """
+    if workers <= 1:
+        if profile and prefetch_depth > 0:
+            print("性能分析时不预读，各阶段的耗时和内存峰值只含本电池")
+            prefetch_depth = 0
+        if prefetch_depth <= 0:
+            for file_path in file_paths:
+                yield extract_file(file_path, groups, cache_dir, profile)
+            return
+        load = partial(prefetch_file, groups=groups, cache_dir=cache_dir)
+        for file_path, future in prefetch(file_paths, load, prefetch_depth):
+            yield extract_file(file_path, groups, cache_dir, profile, future.result)
+        return
+
+    def collect(file_path, future):
+        try:
+            return future.result()
+        except Exception:
+            # 工作进程异常退出等情况
+            return os.path.basename(file_path), None, None, traceback.format_exc(), None
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if prefetch_depth <= 0:
+            futures = [executor.submit(extract_file, file_path, groups, cache_dir, profile) for file_path in file_paths]
+            # 按提交顺序收集结果，保证输出顺序与文件名顺序一致
+            for file_path, future in zip(file_paths, futures):
+                yield collect(file_path, future)
+            return
+
+        pending = deque()
+        for file_path, warmed in prefetch(file_paths, warm_file, prefetch_depth):
+            # 等该文件读入页缓存后再提交，否则工作进程与预读线程重复读取同一文件；预读失败时由工作进程报告错误
+            warmed.exception()
+            pending.append((file_path, executor.submit(extract_file, file_path, groups, cache_dir, profile)))
+            if len(pending) >= workers + prefetch_depth:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
+def list_battery_files(data_dir=None, store_root=None):
+    """按名称排序列出电池文件：指定store_root时为列式存储目录，否则为data_dir下的pkl文件"""
+    if store_root is not None:
+        from columnar_store import list_store
+        return list_store(store_root)
+    pkl_files = sorted(f for f in os.listdir(data_dir) if f.endswith('.pkl'))
+    return [os.path.join(data_dir, filename) for filename in pkl_files]
+
+
+def read_completed(output_filename, feature_names=FEATURE_NAMES, key_columns=(), rows_per_battery=1):
+    """读取已有特征表中已完成的电池名；表头不符或文件不存在时返回None
+
+    长表中每颗电池有rows_per_battery行（每个时域一行），行数齐全的电池才算完成。
+    """
+    if not os.path.exists(output_filename):
+        return None
+    n_columns = len(table_columns(feature_names, key_columns))
+    with open(output_filename, 'r', encoding='utf-8') as f:
+        if f.readline() != feature_header(feature_names, key_columns):
+            return None
+        counts = {}
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            # 只认完整的行，中断时写了一半的最后一行会被重新计算
+            if line.endswith('\n') and len(parts) == n_columns:
+                counts[parts[0]] = counts.get(parts[0], 0) + 1
+        return {name for name, count in counts.items() if count >= rows_per_battery}
+
+
+def write_feature_table(output_filename, file_paths, groups, workers=1, cache_dir=None, resume=False,
+                        profile_path=None, horizons=None, layout='wide', prefetch_depth=0, manifest=None):
+    """逐个电池提取特征并立即写入特征表，中途中断时已写入的电池不会丢失
+
+    resume为True且已有表头一致的输出文件时，跳过已写入的电池并在文件末尾追加；
+    否则重新写入。返回 (写入的电池名列表, 失败的电池名列表)。
+    profile_path: 指定时记录每个电池各阶段的耗时与内存峰值，结束后按扩展名保存为.json或.csv报告并打印汇总
+    horizons: 预测时域列表（如 [25, 50, 75, 100]），一次读取电池数据计算各时域的特征；
+    layout为'wide'时每颗电池一行、列名为 F1_h25 等，为'long'时每个时域一行、增加Horizon列
+    prefetch_depth: 提前读取的电池数，见iter_results
+    manifest: 数据目录的清单（dataset_manifest.load_manifest），清单中周期数不足的文件直接跳过，不再读取
+    """
+    feature_names = FEATURE_NAMES
+    key_columns = ()
+    rows_per_battery = 1
+    if horizons is not None:
+        groups = expand_horizons(groups, horizons)
+        if layout == 'wide':
+            feature_names = horizon_feature_names(horizons)
+        elif layout == 'long':
+            key_columns = (HORIZON_COLUMN,)
+            rows_per_battery = len(horizons)
+        else:
+            raise ValueError(f"未知的表格形式: {layout}，可选 'wide' 或 'long'")
+    n_columns = len(table_columns(feature_names, key_columns))
+
+    completed = read_completed(output_filename, feature_names, key_columns, rows_per_battery) if resume else None
+    if completed is not None:
+        # 丢弃中断时可能残留的不完整末行，长表中还要丢弃时域不齐的电池
+        with open(output_filename, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.endswith('\n')]
+        kept = [lines[0]] + [line for line in lines[1:]
+                             if len(line.rstrip('\n').split('\t')) == n_columns and line.split('\t')[0] in completed]
+        with open(output_filename, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        file_paths = [path for path in file_paths if battery_name(path) not in completed]
+        print(f"续写 {output_filename}: 已完成 {len(completed)} 个电池，剩余 {len(file_paths)} 个")
+        mode = 'a'
+    else:
+        mode = 'w'
+
+    if manifest:
+        file_paths, short = split_short_files(file_paths, manifest, min_cycles(groups))
+        for filename, n_cycles in short:
+            print(f"跳过 {filename}: 周期数不足{min_cycles(groups)}个，实际周期数: {n_cycles}（清单）")
+
+    processed_files = []
+    failed_files = []
+    profile_records = []
+    with FeatureTableWriter(output_filename, feature_names, mode=mode, key_columns=key_columns) as writer:
+        for filename, features, label, error, records in iter_results(file_paths, groups, workers, cache_dir,
+                                                                      profile_path is not None, prefetch_depth):
+            if records:
+                profile_records += records
+            if error is not None:
+                failed_files.append(filename)
+                print(f"处理 {filename} 失败:\n{error}")
+                continue
+
+            if features is not None:
+                if rows_per_battery == 1:
+                    writer.write_row(filename, features, label)
+                else:
+                    n = len(features) // rows_per_battery
+                    for i, horizon in enumerate(horizons):
+                        writer.write_row(filename, features[i * n:(i + 1) * n], label, keys=(horizon,))
+                processed_files.append(filename)
+                print(f"处理 {filename}，特征数: {len(features)}，标签: {label}")
+
+    if profile_path is not None:
+        save_report(profile_records, profile_path)
+        print_summary(profile_records)
+        print(f"性能报告保存到: {profile_path}")
+
+    return processed_files, failed_files
@@ -0,0 +1,112 @@
+import os
+import csv
+import json
+import time
+import tracemalloc
+
+# 性能报告的列
+REPORT_COLUMNS = ['battery', 'stage', 'wall_s', 'cpu_s', 'peak_bytes',
+                  'n_cycles', 'samples_cycle_10', 'samples_cycle_100', 'total_samples']
+
+
+def input_sizes(view):
+    """电池的输入规模：周期数、第10/100次循环的采样点数、全部周期的采样点总数（按电流信号计）"""
+    n_cycles = len(view)
+    return {
+        'n_cycles': n_cycles,
+        'samples_cycle_10': view.sample_count(9) if n_cycles > 9 else 0,
+        'samples_cycle_100': view.sample_count(99) if n_cycles > 99 else 0,
+        'total_samples': sum(view.sample_count(cycle_idx) for cycle_idx in range(n_cycles)),
+    }
+
+
+class FeatureProfiler:
+    """记录单颗电池各阶段（加载、缓存查找、各特征组）的墙钟时间、CPU时间和内存峰值
+
+    作为上下文管理器使用时按需启动tracemalloc，退出时停止；内存峰值为该阶段内相对阶段开始时新增的已分配内存峰值。
+    tracemalloc的峰值是整个进程的，记录期间不应有其他线程在分配内存（见feature_pipeline.iter_results）。
+    """
+
+    def __init__(self, battery):
+        self.battery = battery
+        self.records = []
+        self.sizes = {}
+        self._started = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def measure(self, stage, fn, *args):
+        """调用fn(*args)并记录该阶段的耗时和内存峰值，返回fn的结果"""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        result = fn(*args)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        peak = tracemalloc.get_traced_memory()[1] - base if tracing else None
+        self.records.append({'battery': self.battery, 'stage': stage,
+                             'wall_s': wall, 'cpu_s': cpu, 'peak_bytes': peak})
+        return result
+
+    def record_sizes(self, view):
+        self.sizes = input_sizes(view)
+
+    def report(self):
+        """各阶段的记录，附带电池的输入规模"""
+        return [dict(record, **self.sizes) for record in self.records]
+
+
+def measure(profiler, stage, fn, *args):
+    """profiler为None时直接调用fn，否则记录该阶段"""
+    if profiler is None:
+        return fn(*args)
+    return profiler.measure(stage, fn, *args)
+
+
+def summarize(records):
+    """按阶段汇总：次数、墙钟时间和CPU时间合计、最大内存峰值，按墙钟时间从大到小排列"""
+    stages = {}
+    for record in records:
+        summary = stages.setdefault(record['stage'], {'stage': record['stage'], 'count': 0,
+                                                      'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': 0})
+        summary['count'] += 1
+        summary['wall_s'] += record['wall_s']
+        summary['cpu_s'] += record['cpu_s']
+        summary['peak_bytes'] = max(summary['peak_bytes'], record['peak_bytes'] or 0)
+    return sorted(stages.values(), key=lambda s: s['wall_s'], reverse=True)
+
+
+def print_summary(records):
+    total = sum(record['wall_s'] for record in records) or 1.0
+    print("各阶段耗时汇总:")
+    for s in summarize(records):
+        print(f"  {s['stage']:10s} 次数 {s['count']:5d}  墙钟 {s['wall_s']:9.3f}s ({s['wall_s'] / total:6.1%})  "
+              f"CPU {s['cpu_s']:9.3f}s  最大内存峰值 {s['peak_bytes'] / 2 ** 20:9.1f} MiB")
+
+
+def save_report(records, output_path):
+    """按扩展名保存性能记录：.json为记录列表，其余为CSV"""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.splitext(output_path)[1].lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        return output_path
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+    return output_path
@@ -0,0 +1,208 @@
+import os
+import numpy as np
+
+NAME_COLUMN = 'Battery_Name'
+LABEL_COLUMN = 'Cycle_Life'
+# 长表中的预测时域列
+HORIZON_COLUMN = 'Horizon'
+
+# F1-F59全部特征列名
+FEATURE_NAMES = [f"F{i}" for i in range(1, 60)]
+
+
+def table_columns(feature_names=FEATURE_NAMES, key_columns=()):
+    """特征表的全部列：Battery_Name、键列（如长表的Horizon）、各特征、Cycle_Life"""
+    return [NAME_COLUMN] + list(key_columns) + list(feature_names) + [LABEL_COLUMN]
+
+
+def horizon_feature_names(horizons, feature_names=FEATURE_NAMES):
+    """多时域宽表的特征列名：每个时域一组，列名为 特征名_h时域（如 F1_h25）"""
+    return [f"{name}_h{horizon}" for horizon in horizons for name in feature_names]
+
+
+class FeatureTableWriter:
+    """制表符分隔特征表的流式写入器，每行写入后立即刷新，中途中断时已写入的行不会丢失
+
+    mode为'a'时在已有文件末尾追加且不再写表头。key_columns为电池名之后、特征之前的键列（如长表的Horizon）。
+    """
+
+    def __init__(self, path, feature_names=FEATURE_NAMES, mode='w', key_columns=()):
+        self.path = path
+        self.key_columns = list(key_columns)
+        self.columns = table_columns(feature_names, key_columns)
+        self.f = open(path, mode, encoding='utf-8')
+        if mode == 'w':
+            self.f.write("\t".join(self.columns) + "\n")
+            self.f.flush()
+
+    def write_row(self, name, features, label, keys=()):
+        if len(features) != len(self.columns) - 2 - len(self.key_columns) or len(keys) != len(self.key_columns):
+            raise ValueError(f"{name}: 特征数 {len(features)} 与表头不一致")
+        feature_str = "\t".join([str(key) for key in keys] + [f"{feat:.6f}" for feat in features])
+        self.f.write(f"{name}\t{feature_str}\t{label}\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_header(path):
+    """读取特征表表头，文件为空时返回空列表"""
+    with open(path, 'r', encoding='utf-8') as f:
+        line = f.readline()
+    return line.strip().split('\t') if line else []
+
+
+def _column_indices(header, columns):
+    if columns is None:
+        return list(range(len(header)))
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise KeyError(f"特征表中没有这些列: {missing}")
+    return [header.index(c) for c in columns]
+
+
+def iter_rows(path, columns=None):
+    """逐行读取特征表，按列名选出指定列，产出原始字符串列表；列数不足表头的行被跳过
+
+    只在内存中保留当前行，适合任意大小的特征表。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline().strip().split('\t')
+        indices = _column_indices(header, columns)
+        for line in f:
+            parts = line.strip().split('\t')
+            if len(parts) >= len(header):
+                yield [parts[i] for i in indices]
+
+
+def select_columns(path, output_path, columns):
+    """按列名挑选列，流式写出新的制表符分隔特征表"""
+    with open(output_path, 'w', encoding='utf-8') as out:
+        out.write("\t".join(columns) + "\n")
+        for row in iter_rows(path, columns):
+            out.write("\t".join(row) + "\n")
+
+
+def _column_dtypes(columns, name_width):
+    """各列的类型：电池名为定长字符串，循环寿命和预测时域为整数，其余特征为float64"""
+    dtypes = []
+    for column in columns:
+        if column == NAME_COLUMN:
+            dtypes.append((column, f'U{max(name_width, 1)}'))
+        elif column in (LABEL_COLUMN, HORIZON_COLUMN):
+            dtypes.append((column, np.int64))
+        else:
+            dtypes.append((column, np.float64))
+    return np.dtype(dtypes)
+
+
+def _convert_row(row, dtype):
+    values = []
+    for value, name in zip(row, dtype.names):
+        kind = dtype[name].kind
+        if kind == 'U':
+            values.append(value)
+        elif kind == 'i':
+            values.append(int(float(value)))
+        else:
+            values.append(float(value))
+    return tuple(values)
+
+
+def _scan(path, columns):
+    """第一遍扫描：统计行数和电池名最大长度，用于确定数组形状与字符串宽度"""
+    n_rows = 0
+    name_width = 0
+    name_pos = columns.index(NAME_COLUMN) if NAME_COLUMN in columns else None
+    for row in iter_rows(path, columns):
+        n_rows += 1
+        if name_pos is not None:
+            name_width = max(name_width, len(row[name_pos]))
+    return n_rows, name_width
+
+
+def read_structured(path, columns=None):
+    """读取特征表为NumPy结构化数组（字段名即列名）"""
+    if columns is None:
+        columns = read_header(path)
+    n_rows, name_width = _scan(path, columns)
+    dtype = _column_dtypes(columns, name_width)
+    table = np.empty(n_rows, dtype=dtype)
+    for i, row in enumerate(iter_rows(path, columns)):
+        table[i] = _convert_row(row, dtype)
+    return table
+
+
+def save_npy(path, output_path, columns=None):
+    """将特征表流式转换为.npy结构化数组，之后可用 np.load(output_path, mmap_mode='r') 内存映射读取
+
+    分两遍读取文本：第一遍确定行数和字符串宽度，第二遍逐行写入内存映射文件，不需要一次性载入整个表。
+    """
+    if columns is None:
+        columns = read_header(path)
+    n_rows, name_width = _scan(path, columns)
+    dtype = _column_dtypes(columns, name_width)
+    table = np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype, shape=(n_rows,))
+    for i, row in enumerate(iter_rows(path, columns)):
+        table[i] = _convert_row(row, dtype)
+    table.flush()
+    del table
+    return output_path
+
+
+def save_parquet(path, output_path, columns=None, batch_rows=10000):
+    """将特征表按批流式转换为Parquet文件（需要安装pyarrow）"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("保存Parquet需要安装pyarrow: pip install pyarrow")
+
+    if columns is None:
+        columns = read_header(path)
+    dtype = _column_dtypes(columns, 1)
+    fields = []
+    for name in columns:
+        kind = dtype[name].kind
+        if kind == 'U':
+            fields.append(pa.field(name, pa.string()))
+        elif kind == 'i':
+            fields.append(pa.field(name, pa.int64()))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    schema = pa.schema(fields)
+
+    def flush(batch):
+        arrays = [pa.array([row[j] for row in batch], type=schema.field(j).type) for j in range(len(columns))]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    with pq.ParquetWriter(output_path, schema) as writer:
+        batch = []
+        for row in iter_rows(path, columns):
+            batch.append(_convert_row(row, dtype))
+            if len(batch) >= batch_rows:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    return output_path
+
+
+def convert_table(path, output_path, columns=None):
+    """按输出文件扩展名选择格式：.npy、.parquet，其余按制表符分隔文本写出"""
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext == '.npy':
+        return save_npy(path, output_path, columns)
+    if ext == '.parquet':
+        return save_parquet(path, output_path, columns)
+    if columns is None:
+        columns = read_header(path)
+    select_columns(path, output_path, columns)
+    return output_path
@@ -0,0 +1,118 @@
+import math
+import numpy as np
+
+# 分块计算点对距离时单个临时块允许占用的内存上限（字节）
+PAIRWISE_BLOCK_BYTES = 32 * 1024 * 1024
+
+# 候选最大点对的相对容差，仅用于吸收平方距离与np.linalg.norm之间的舍入差异
+_CANDIDATE_RTOL = 1e-12
+
+
+def calculate_hausdorff_distance_single_segment(segment, max_block_bytes=PAIRWISE_BLOCK_BYTES):
+    """计算段内豪斯多夫距离：段内任意两点之间的最大欧氏距离
+
+    按行分块向量化计算平方距离，临时内存不超过max_block_bytes；
+    最后对接近最大值的候选点对逐一用np.linalg.norm求值，结果与逐对双重循环完全一致。
+    非有限值的处理与原先的 np.max(全部点对距离) 相同：任一点的任一坐标为NaN时，无论该点在段中的位置，结果都为NaN
+    （不是Python内置max那种只在第一个元素为NaN时才返回NaN的语义）；含±inf时为inf，
+    两点同一坐标为同号inf（差为NaN）时为NaN。
+    """
+    points = np.asarray(segment, dtype=np.float64)
+    if len(points) < 2:
+        return 0
+    points = points.reshape(len(points), -1)
+    finite = np.isfinite(points).all(axis=1)
+    if not finite.all():
+        if np.isnan(points).any():
+            return np.float64(np.nan)
+        # 含±inf的点与其他点的距离为inf，只需检查这些点与其他点的差中是否出现NaN
+        rows = np.flatnonzero(~finite)
+        with np.errstate(invalid='ignore'):
+            diff = points[rows, None, :] - points[None, :, :]
+        diff[np.arange(len(rows)), rows] = 0
+        return np.float64(np.nan) if np.isnan(diff).any() else np.float64(np.inf)
+    n, dim = points.shape
+
+    # 每块行数：块内差值数组为 rows × n × dim 个float64
+    rows_per_block = max(1, max_block_bytes // (8 * n * dim))
+
+    best_sq = -np.inf
+    candidates = []
+    for start in range(0, n - 1, rows_per_block):
+        stop = min(start + rows_per_block, n - 1)
+        # 每行只需与其后的点比较；块内重复比较的对称点对不影响最大值
+        diff = points[start:stop, None, :] - points[None, start + 1:, :]
+        sq = np.einsum('ijk,ijk->ij', diff, diff)
+        block_max = np.max(sq)
+        if np.isnan(block_max):
+            return np.float64(np.nan)
+        if block_max < best_sq * (1 - _CANDIDATE_RTOL):
+            continue
+        best_sq = max(best_sq, block_max)
+        rows, cols = np.nonzero(sq >= block_max * (1 - _CANDIDATE_RTOL))
+        candidates.append((sq[rows, cols], rows + start, cols + start + 1))
+
+    threshold = best_sq * (1 - _CANDIDATE_RTOL)
+    best = None
+    for sq_values, rows, cols in candidates:
+        keep = sq_values >= threshold
+        for i, j in zip(rows[keep], cols[keep]):
+            dist = np.linalg.norm(points[i] - points[j])
+            if best is None or dist > best:
+                best = dist
+    return best
+
+
+def delta_q_statistics(delta_q):
+    """对ΔQ(V)矩阵逐行计算F1-F6用到的统计量，每行一颗电池，所有电池一次完成
+
+    先逐行去均值并求平方，各阶中心矩复用同一份中间结果；
+    运算顺序与np.var、scipy.stats.skew/kurtosis以及MATR/DatasetOne的自定义公式一致，单行结果与逐个电池计算完全相同。
+    返回字典，各项为长度N的数组：
+    min、mean、var（总体方差）、var_ddof1（样本方差）、skew、kurtosis（scipy定义，kurtosis为超额峰度）、
+    log_kurtosis（ln|m4/m2²|，MATR F5与DatasetOne F5）、log_skewness（ln|m3/(Σd²)^1.5|，DatasetOne F4）、last（最后一个网格点的值）
+    """
+    delta_q = np.atleast_2d(np.asarray(delta_q, dtype=np.float64))
+    n = delta_q.shape[1]
+
+    mean = np.mean(delta_q, axis=1, keepdims=True)
+    d = delta_q - mean
+    d2 = d ** 2
+    sum_d2 = np.sum(d2, axis=1)
+    m2 = sum_d2 / n
+    mean = mean[:, 0]
+
+    with np.errstate(all='ignore'):
+        # scipy.stats.skew/kurtosis：三、四阶矩由平方结果相乘得到，方差过小时为NaN
+        m3 = np.mean(d2 * d, axis=1)
+        m4 = np.mean(d2 ** 2, axis=1)
+        zero = m2 <= (np.finfo(np.float64).eps * mean) ** 2
+        skew = np.where(zero, np.nan, m3 / _scalar_power(m2, 1.5))
+        kurtosis = np.where(zero, np.nan, m4 / m2 ** 2.0) - 3
+
+        # 自定义公式按原写法逐元素求幂
+        log_kurtosis = np.log(np.abs(np.mean(d ** 4, axis=1) / m2 ** 2))
+        log_skewness = np.log(np.abs(np.mean(d ** 3, axis=1) / _scalar_power(np.sqrt(sum_d2), 3)))
+        var_ddof1 = sum_d2 / (n - 1)
+
+    return {
+        'min': np.min(delta_q, axis=1),
+        'mean': mean,
+        'var': m2,
+        'var_ddof1': var_ddof1,
+        'skew': skew,
+        'kurtosis': kurtosis,
+        'log_kurtosis': log_kurtosis,
+        'log_skewness': log_skewness,
+        'last': delta_q[:, -1],
+    }
+
+
+def _scalar_power(values, exponent):
+    """逐个元素用标量求幂：数组求幂可能走SIMD实现，末位舍入与逐个电池计算时的标量结果不同"""
+    return np.array([value ** exponent for value in values], dtype=np.float64)
+
+
+def log10_abs(values):
+    """逐个计算 log10|x|（与math.log(abs(x), 10)相同），x为0或非有限值时为NaN"""
+    return np.array([math.log(abs(v), 10) if v != 0 and np.isfinite(v) else np.nan for v in values])
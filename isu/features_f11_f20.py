@@ -1,58 +1,60 @@
 import numpy as np
+from dataset_adapters import ISU_ADAPTER
 
-def calculate_f11_f20_isu(battery_data):
-    """计算ISU数据的F11-F20特征，严格按照指导文件定义"""
+# F11-F20 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = ISU_ADAPTER
+
+# 读取的周期：前5个周期的充电时间，放电容量取自前100个周期的容量衰减向量
+REQUIRED_CYCLES = range(5)
+FADE_CYCLES = 100
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return range(5), horizon
+
+def calculate_f11_f20_isu(battery_data, horizon=100):
+    """计算ISU数据的F11-F20特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
+    
+    view = ADAPTER.view(battery_data)
     
-    cycle_data = battery_data.get('cycle_data', [])
+    # 前horizon个周期放电阶段的最大放电容量（只取正值）
+    discharge_caps = np.maximum(view.discharge_capacity_fade(horizon), 0)
     
     # 获取放电容量的辅助函数
     def get_discharge_capacity(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
-        
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        cap_data = np.array(cycle.get('discharge_capacity_in_Ah', []))
-        
-        if len(current) > 0 and len(cap_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_phase_cap = cap_data[discharge_mask]
-                valid_caps = discharge_phase_cap[discharge_phase_cap > 0]
-                return np.max(valid_caps) if len(valid_caps) > 0 else 0
-        return 0
+        return discharge_caps[cycle_idx]
     
     # F11: 第2次循环的放电容量
     f11 = get_discharge_capacity(1)
     
-    # F12: 最大放电容量与第2次循环的差值
-    all_discharge_caps = []
-    for i in range(min(100, len(cycle_data))):
-        cap = get_discharge_capacity(i)
-        if cap > 0:
-            all_discharge_caps.append(cap)
-    
-    max_discharge_cap = np.max(all_discharge_caps) if len(all_discharge_caps) > 0 else 0
+    # F12: 最大放电容量与第2次循环的差值（容量均非负，前100次全为0时最大值即为0）
+    max_discharge_cap = np.max(discharge_caps) if len(discharge_caps) > 0 else 0
     f12 = max_discharge_cap - f11
     
-    # F13: 第100次循环的放电容量
-    f13 = get_discharge_capacity(99)
+    # F13: 第horizon次循环的放电容量
+    f13 = get_discharge_capacity(horizon - 1)
     
     # F14: 前5个循环的平均充电时间
     charge_times = []
-    for i in range(min(5, len(cycle_data))):
-        cycle = cycle_data[i]
-        current = np.array(cycle.get('current_in_A', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+    for i in range(min(5, len(view))):
+        current = view.array(i, 'current_in_A')
+        time_data = view.array(i, 'time_in_s')
         
         if len(current) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_indices = np.where(charge_mask)[0]
+            charge_indices = view.phases(i).charge_indices
+            if len(charge_indices) > 0:
                 if len(charge_indices) > 1:
-                    # ISU数据中时间是纳秒，需要转换为秒
-                    charge_start_time = time_data[charge_indices[0]] / 1e9
-                    charge_end_time = time_data[charge_indices[-1]] / 1e9
+                    charge_start_time = time_data[charge_indices[0]]
+                    charge_end_time = time_data[charge_indices[-1]]
                     charge_duration = charge_end_time - charge_start_time
                     
                     if 600 <= charge_duration <= 36000:  # 10分钟到10小时
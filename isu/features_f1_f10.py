@@ -1,117 +1,83 @@
 import numpy as np
-import math
-from scipy.interpolate import interp1d
-from scipy import stats
+from dataset_adapters import ISU_ADAPTER
+from feature_utils import delta_q_statistics
+from qv_matrix import delta_q as qv_delta_q
 
-def extract_qv_curves_isu(cycle_data):
-    """提取ISU数据每个周期的Q-V曲线（放电阶段的容量-电压关系）"""
-    qv_curves = []
-    
-    for cycle in cycle_data:
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        discharge_capacity = np.array(cycle.get('discharge_capacity_in_Ah', []))
-        current = np.array(cycle.get('current_in_A', []))
-        
-        if len(voltage) > 0 and len(current) > 0 and len(discharge_capacity) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_voltage = voltage[discharge_mask]
-                discharge_cap = discharge_capacity[discharge_mask]
-                
-                if len(discharge_voltage) > 1 and len(discharge_cap) > 1:
-                    valid_mask = (discharge_cap > 0) & np.isfinite(discharge_voltage) & np.isfinite(discharge_cap)
-                    if np.sum(valid_mask) > 1:
-                        valid_voltage = discharge_voltage[valid_mask]
-                        valid_capacity = discharge_cap[valid_mask]
-                        
-                        sort_idx = np.argsort(-valid_voltage)
-                        sorted_voltage = valid_voltage[sort_idx]
-                        sorted_capacity = valid_capacity[sort_idx]
-                        
-                        qv_curves.append((sorted_voltage, sorted_capacity))
-                        continue
-        
-        qv_curves.append((np.array([]), np.array([])))
-    
-    return qv_curves
+# F1-F10 特征版本号
+FEATURE_VERSION = 3
 
-def calculate_delta_q_isu(qv_curves, cycle_10=10, cycle_100=100):
-    """计算ΔQ₁₀₀₋₁₀(V)：第100次与第10次循环的放电容量差值"""
-    if len(qv_curves) < max(cycle_10, cycle_100):
-        return None
-    
-    v10, q10 = qv_curves[cycle_10-1]
-    v100, q100 = qv_curves[cycle_100-1]
-    
-    if len(v10) < 2 or len(v100) < 2:
+# 数据集适配器
+ADAPTER = ISU_ADAPTER
+
+# 读取的周期：Q-V曲线用第10、100次循环，容量衰减用前100个周期
+REQUIRED_CYCLES = (9, 99)
+FADE_CYCLES = 100
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return (9, horizon - 1), horizon
+
+def calculate_delta_q_isu(view, cycle_10=10, cycle_100=100):
+    """计算ΔQ₁₀₀₋₁₀(V)：第100次与第10次循环的放电容量差值
+
+    即Q(V)矩阵（固定电压网格，见qv_matrix）两行之差，只保留两次循环的电压范围都覆盖的网格点，
+    返回 (ΔQ, 对应的电压网格)；覆盖的网格点不足2个时返回None。
+    """
+    if len(view) < max(cycle_10, cycle_100):
         return None
     
-    min_v = max(np.min(v10), np.min(v100))
-    max_v = min(np.max(v10), np.max(v100))
-    
-    if min_v >= max_v:
+    delta_q, grid = qv_delta_q(view, cycle_100, cycle_10)
+    covered = np.isfinite(delta_q)
+    if np.sum(covered) < 2:
         return None
     
-    common_v = np.linspace(max_v, min_v, 100)
-    
-    f10 = interp1d(v10, q10, kind='linear', bounds_error=False, fill_value="extrapolate")
-    f100 = interp1d(v100, q100, kind='linear', bounds_error=False, fill_value="extrapolate")
-    
-    q10_interp = f10(common_v)
-    q100_interp = f100(common_v)
-    
-    delta_q = q100_interp - q10_interp
-    
-    return delta_q, common_v
+    return delta_q[covered], grid[covered]
 
-def calculate_f1_f10_isu(battery_data):
-    """计算ISU数据的F1-F10特征，严格按照指导文件定义"""
-    
-    cycle_data = battery_data.get('cycle_data', [])
+def delta_q_features_isu(delta_q, grids):
+    """由ΔQ₁₀₀₋₁₀矩阵（每行一颗电池）计算F1-F6，返回N×6数组；grids为各行对应的电压网格
+
+    F1: 最小值；F2: 平均值；F3: 方差；F4: 偏度；F5: 峰度；F6: 最接近2V的网格点处的值
+    """
+    delta_q = np.atleast_2d(delta_q)
+    stats = delta_q_statistics(delta_q)
+    idx_2v = np.argmin(np.abs(np.atleast_2d(grids) - 2.0), axis=1)
+    f6 = delta_q[np.arange(len(idx_2v)), idx_2v]
+    return np.column_stack([stats['min'], stats['mean'], stats['var'], stats['skew'], stats['kurtosis'], f6])
+
+def batch_f1_f6_isu(batteries):
+    """批量计算多颗电池的F1-F6，返回N×6数组，无法计算ΔQ₁₀₀₋₁₀的电池为0行（与逐个计算时相同）
+
+    覆盖的电压网格相同的电池堆叠成一个矩阵，统计量沿行一次算完，结果与逐个电池调用calculate_f1_f10_isu相同。
+    """
+    results = [calculate_delta_q_isu(ADAPTER.view(battery_data)) for battery_data in batteries]
+    features = np.zeros((len(results), 6))
+    same_grid = {}
+    for row, result in enumerate(results):
+        if result is not None:
+            same_grid.setdefault(result[1].tobytes(), []).append(row)
+    for rows in same_grid.values():
+        delta_q = np.stack([results[row][0] for row in rows])
+        features[rows] = delta_q_features_isu(delta_q, np.broadcast_to(results[rows[0]][1], delta_q.shape))
+    return features
+
+def calculate_f1_f10_isu(battery_data, horizon=100):
+    """计算ISU数据的F1-F10特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
     
-    # 提取Q-V曲线
-    qv_curves = extract_qv_curves_isu(cycle_data)
+    view = ADAPTER.view(battery_data)
     
     # 计算ΔQ₁₀₀₋₁₀(V)
-    delta_q_result = calculate_delta_q_isu(qv_curves)
+    delta_q_result = calculate_delta_q_isu(view, cycle_100=horizon)
     
     if delta_q_result is None:
         return [0] * 10
     delta_q, common_v = delta_q_result
-    # F1: ΔQ₁₀₀₋₁₀的最小值
-    f1 = np.min(delta_q)
-    # F2: ΔQ₁₀₀₋₁₀的平均值
-    f2 = np.mean(delta_q)
-    # F3: ΔQ₁₀₀₋₁₀的方差
-    f3 = np.var(delta_q)
-    # F4: ΔQ₁₀₀₋₁₀的偏度
-    f4 = stats.skew(delta_q)
-    # F5: ΔQ₁₀₀₋₁₀的峰度
-    f5 = stats.kurtosis(delta_q)
-    # F6: ΔQ₁₀₀₋₁₀在2V处的值
-    if len(common_v) > 0:
-        idx_2v = np.argmin(np.abs(common_v - 2.0))
-        f6 = delta_q[idx_2v]
-    else:
-        f6 = 0
-    # F7-F8: 第2-100次循环的容量衰减曲线线性拟合的斜率和截距
-    discharge_caps = []
-    for i in range(1, min(100, len(cycle_data))):
-        current = np.array(cycle_data[i].get('current_in_A', []))
-        cap_data = np.array(cycle_data[i].get('discharge_capacity_in_Ah', []))
-        
-        if len(current) > 0 and len(cap_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_phase_cap = cap_data[discharge_mask]
-                if len(discharge_phase_cap) > 0:
-                    discharge_caps.append(np.max(discharge_phase_cap))
-                else:
-                    discharge_caps.append(0)
-            else:
-                discharge_caps.append(0)
-        else:
-            discharge_caps.append(0)
+    f1, f2, f3, f4, f5, f6 = delta_q_features_isu(delta_q, common_v)[0]
+    # F7-F8: 第2-horizon次循环的容量衰减曲线线性拟合的斜率和截距
+    discharge_caps = view.discharge_capacity_fade(horizon)[1:horizon]
     
     if len(discharge_caps) > 1:
         cycles = np.arange(2, 2 + len(discharge_caps))
@@ -121,10 +87,10 @@ def calculate_f1_f10_isu(battery_data):
     else:
         f7 = f8 = 0
     
-    # F9-F10: 第91-100次循环的容量衰减曲线线性拟合的斜率和截距
-    if len(discharge_caps) >= 90:
-        cycles_91_100 = np.arange(91, 101)
-        caps_91_100 = discharge_caps[89:99]
+    # F9-F10: 最后10个周期（默认第91-100次循环）的容量衰减曲线线性拟合的斜率和截距
+    if len(discharge_caps) >= horizon - 10:
+        cycles_91_100 = np.arange(horizon - 9, horizon + 1)
+        caps_91_100 = discharge_caps[horizon - 11:horizon - 1]
         if len(caps_91_100) > 1:
             slope_91_100, intercept_91_100 = np.polyfit(cycles_91_100, caps_91_100, 1)
             f9 = slope_91_100
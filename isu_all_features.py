@@ -1,83 +1,92 @@
-import pickle
 import numpy as np
 import os
+import argparse
 from datetime import datetime  # 导入datetime模块获取当前时间
-from isu.features_f1_f10 import calculate_f1_f10_isu
-from isu.features_f11_f20 import calculate_f11_f20_isu
-from isu.features_f21_f30 import calculate_f21_f30_isu
-from isu.features_f31_f40 import calculate_f31_f40_isu
-from isu.features_f41_f50 import calculate_f41_f50_isu
-from isu.features_f51_f59 import calculate_f51_f59_isu
+from isu import features_f1_f10, features_f11_f20, features_f21_f30, features_f31_f40, features_f41_f50, features_f51_f59
+from dataset_manifest import load_manifest
+from feature_pipeline import extract_all_features, extract_file, iter_results, list_battery_files, write_feature_table
 
-def extract_all_isu_features(battery_data, filename):
-    """提取ISU数据的所有59个特征"""
-    cycle_data = battery_data['cycle_data']
-    if len(cycle_data) < 100:
-        print(f"跳过 {filename}: 周期数不足100个，实际周期数: {len(cycle_data)}")
-        return None, None
-    
-    # 计算各组特征
-    f1_f10 = calculate_f1_f10_isu(battery_data)
-    f11_f20 = calculate_f11_f20_isu(battery_data)
-    f21_f30 = calculate_f21_f30_isu(battery_data)
-    f31_f40 = calculate_f31_f40_isu(battery_data)
-    f41_f50 = calculate_f41_f50_isu(battery_data)
-    f51_f59 = calculate_f51_f59_isu(battery_data)
-    
-    # 验证特征数量
-    print(f"  特征数量检查: F1-F10({len(f1_f10)}), F11-F20({len(f11_f20)}), F21-F30({len(f21_f30)}), F31-F40({len(f31_f40)}), F41-F50({len(f41_f50)}), F51-F59({len(f51_f59)})")
-    
-    # 合并所有特征
-    all_features = f1_f10 + f11_f20 + f21_f30 + f31_f40 + f41_f50 + f51_f59
-    
-    # 标签：循环寿命
-    y = len(cycle_data)
-        
-    return all_features, y
+# 特征组：(组名, 计算函数, 版本号)，按输出列顺序排列
+ISU_FEATURE_GROUPS = [
+    ('F1-F10', features_f1_f10.calculate_f1_f10_isu, features_f1_f10.FEATURE_VERSION),
+    ('F11-F20', features_f11_f20.calculate_f11_f20_isu, features_f11_f20.FEATURE_VERSION),
+    ('F21-F30', features_f21_f30.calculate_f21_f30_isu, features_f21_f30.FEATURE_VERSION),
+    ('F31-F40', features_f31_f40.calculate_f31_f40_isu, features_f31_f40.FEATURE_VERSION),
+    ('F41-F50', features_f41_f50.calculate_f41_f50_isu, features_f41_f50.FEATURE_VERSION),
+    ('F51-F59', features_f51_f59.calculate_f51_f59_isu, features_f51_f59.FEATURE_VERSION),
+]
 
-def process_isu_all_features():
-    """处理ISU数据集提取所有特征"""
-    data_dir = "data/ISU_ILCC"
-    pkl_files = [f for f in os.listdir(data_dir) if f.endswith('.pkl')]
-    print(f"找到 {len(pkl_files)} 个ISU文件")
-    
-    all_features = []
-    all_labels = []
-    processed_files = []
-    
-    for filename in pkl_files :  
+# 默认的特征结果缓存目录
+ISU_CACHE_DIR = "./result/cache/isu"
 
-        file_path = os.path.join(data_dir, filename)
-        with open(file_path, 'rb') as f:
-            battery_data = pickle.load(f)
-        
-        features, label = extract_all_isu_features(battery_data, filename)
-        if features is not None:
-            all_features.append(features)
-            all_labels.append(label)
-            processed_files.append(filename)
-            print(f"处理 {filename}，特征数: {len(features)}，标签: {label}")
+def extract_all_isu_features(battery_data, filename, profiler=None):
+    """提取ISU数据的所有59个特征；profiler为FeatureProfiler时记录每个特征组的耗时和内存峰值"""
+    return extract_all_features(battery_data, filename, ISU_FEATURE_GROUPS, profiler)
+
+def extract_isu_file(file_path, cache_dir=None, profile=False):
+    """加载单个ISU电池文件（pkl或列式存储目录）并提取特征，异常被捕获并以错误信息返回，不影响其他电池"""
+    return extract_file(file_path, ISU_FEATURE_GROUPS, cache_dir, profile)
+
+def iter_isu_results(file_paths, workers=1, cache_dir=None, profile=False):
+    """按文件顺序产出每个电池的提取结果；workers>1时使用进程池并行计算"""
+    return iter_results(file_paths, ISU_FEATURE_GROUPS, workers, cache_dir, profile)
+
+def process_isu_all_features(workers=1, store_root=None, cache_dir=ISU_CACHE_DIR, profile=False, profile_path=None,
+                             horizons=None, layout='wide', prefetch_depth=2, use_manifest=True):
+    """处理ISU数据集提取所有特征
+
+    workers: 并行进程数，1为单进程顺序处理，0表示使用全部CPU核心
+    store_root: 列式存储目录（由columnar_store.py转换得到），指定时代替pkl文件读取
+    cache_dir: 特征结果缓存目录，None表示不使用缓存、全部重新计算
+    profile: 记录每个电池加载和各特征组的墙钟时间、CPU时间、内存峰值及输入规模，结束时输出报告
+    profile_path: 报告文件（.json或.csv），默认为 ./result/isu_profile_月日时分.json
+    horizons: 预测时域列表（如 [25, 50, 75, 100]），一次读取数据计算各时域的F1-F59，None为只算第100次循环
+    layout: 多时域时的表格形式，'wide'为每颗电池一行（列名F1_h25等），'long'为每个时域一行（增加Horizon列）
+    prefetch_depth: 提前读取的电池数，读取与特征计算重叠（进程池时为提前读入页缓存），0为不预读；profile时单进程不预读
+    use_manifest: 读取数据目录下的清单（dataset_manifest.py生成），清单中周期数不足的文件不再读取
+    """
+    file_paths = list_battery_files("data/ISU_ILCC", store_root)
+    # 列式存储目录的周期数由偏移量直接得到，清单只用于pkl文件
+    manifest = load_manifest("data/ISU_ILCC") if use_manifest and store_root is None else None
+    print(f"找到 {len(file_paths)} 个ISU文件")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
 
     # 获取当前时间并格式化为"月日时分"
     current_time = datetime.now().strftime("%m%d%H%M")
     # 构建带时间戳的文件名
     output_filename = f"./result/isu_{current_time}.txt"
+    if profile and profile_path is None:
+        profile_path = f"./result/isu_profile_{current_time}.json"
 
-    
-    # 保存结果
-    with open(output_filename, 'w') as f:
-        # 写入表头
-        header = "Battery_Name\t" + "\t".join([f"F{i}" for i in range(1, 60)]) + "\tCycle_Life\n"
-        f.write(header)
-        
-        for i, filename in enumerate(processed_files):
-            features = all_features[i]
-            label = all_labels[i]
-            feature_str = "\t".join([f"{feat:.6f}" for feat in features])
-            f.write(f"{filename}\t{feature_str}\t{label}\n")
+    # 边计算边写入结果
+    processed_files, failed_files = write_feature_table(output_filename, file_paths, ISU_FEATURE_GROUPS,
+                                                        workers=workers, cache_dir=cache_dir,
+                                                        profile_path=profile_path if profile else None,
+                                                        horizons=horizons, layout=layout,
+                                                        prefetch_depth=prefetch_depth, manifest=manifest)
 
     print(f"ISU所有特征处理完成，共处理 {len(processed_files)} 个文件")
+    if failed_files:
+        print(f"处理失败 {len(failed_files)} 个文件: {failed_files}")
     print(f"结果保存到: {output_filename}")
 
 if __name__ == "__main__":
-    process_isu_all_features()
+    parser = argparse.ArgumentParser(description="提取ISU数据集的F1-F59特征")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--store", default=None, help="从列式存储目录读取（例如 data_store/ISU_ILCC），代替data/ISU_ILCC下的pkl文件")
+    parser.add_argument("--cache-dir", default=ISU_CACHE_DIR, help="特征结果缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存，全部重新计算")
+    parser.add_argument("--profile", action="store_true", help="记录各电池加载和各特征组的耗时与内存峰值（开启tracemalloc，会变慢）")
+    parser.add_argument("--profile-output", default=None, help="性能报告文件（.json或.csv），默认 ./result/isu_profile_月日时分.json")
+    parser.add_argument("--horizons", type=int, nargs='+', default=None, help="预测时域（周期数），例如 --horizons 25 50 75 100")
+    parser.add_argument("--layout", choices=['wide', 'long'], default='wide', help="多时域输出形式：wide每颗电池一行，long每个时域一行")
+    parser.add_argument("--prefetch", type=int, default=2, help="提前读取的电池数，0表示不预读")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用数据目录下的清单")
+    args = parser.parse_args()
+    process_isu_all_features(workers=args.workers, store_root=args.store,
+                             cache_dir=None if args.no_cache else args.cache_dir,
+                             profile=args.profile, profile_path=args.profile_output,
+                             horizons=args.horizons, layout=args.layout, prefetch_depth=args.prefetch,
+                             use_manifest=not args.no_manifest)
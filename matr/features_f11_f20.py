@@ -1,33 +1,45 @@
 import numpy as np
 import math
+from collections.abc import Sequence
+from dataset_adapters import MATR_ADAPTER
 
-def calculate_f11_f20_matr(battery_data):
-    """计算MATR数据的F11-F20特征，严格按照指导文件定义"""
+# F11-F20 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = MATR_ADAPTER
+
+# 读取的周期：前100个周期（放电容量、充电时间、温度）
+REQUIRED_CYCLES = range(100)
+FADE_CYCLES = 0
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return range(horizon), 0
+
+def calculate_f11_f20_matr(battery_data, horizon=100):
+    """计算MATR数据的F11-F20特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
     
-    cycle_data = battery_data.get('cycle_data', [])
+    view = ADAPTER.view(battery_data)
     
-    # MATR数据的cycle_data是列表，不是字典
-    if not isinstance(cycle_data, list) or len(cycle_data) < 2:
+    # MATR数据的cycle_data是列表（列式存储时为等价的周期序列），不是字典
+    if not isinstance(view.cycle_data, Sequence) or len(view) < 2:
         return [0] * 10
     
     # 获取放电容量的辅助函数
     def get_discharge_capacity(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        if not isinstance(cycle, dict):
-            return 0
-            
-        capacity_value = cycle['discharge_capacity_in_Ah']
-
-        if isinstance(capacity_value, (list, np.ndarray)):
-            capacity_array = np.array(capacity_value)
-            # 获取放电阶段的最大容量
-            valid_caps = capacity_array[capacity_array > 0]
-            return np.max(valid_caps) if len(valid_caps) > 0 else 0
-        else:
-            return capacity_value if capacity_value > 0 else 0
+        # 标量容量在视图中为单元素数组，与列表容量统一处理
+        capacity_array = view.array(cycle_idx, 'discharge_capacity_in_Ah')
+        # 获取放电阶段的最大容量
+        valid_caps = capacity_array[capacity_array > 0]
+        return np.max(valid_caps) if len(valid_caps) > 0 else 0
 
 
     # F11: 第2次循环的放电容量 (Discharge capacity, cycle 2)
@@ -36,7 +48,7 @@ def calculate_f11_f20_matr(battery_data):
     # F12: 最大放电容量与第2次循环的差值 (Difference between max discharge capacity and cycle 2)
     # 计算所有周期的放电容量，找到最大值
     all_discharge_caps = []
-    for i in range(min(100, len(cycle_data))):
+    for i in range(min(horizon, len(view))):
         cap = get_discharge_capacity(i)
         if cap > 0:
             all_discharge_caps.append(cap)
@@ -45,25 +57,18 @@ def calculate_f11_f20_matr(battery_data):
     f12 = max_discharge_cap - f11
     
     # F13: 第100次循环的放电容量 (Discharge capacity, cycle 100)
-    f13 = get_discharge_capacity(99)  # 索引99对应第100次循环
+    f13 = get_discharge_capacity(horizon - 1)  # 默认索引99对应第100次循环
     
     # F14: 前5个循环的平均充电时间 (Average charge time, first 5 cycles)
     charge_times = []
-    for i in range(min(5, len(cycle_data))):
-        cycle = cycle_data[i]
-        if not isinstance(cycle, dict):
-            continue
-        current=None
-        time_data=None        
-        current = np.array(cycle['current_in_A'])
-
-        time_data = np.array(cycle['time_in_s'])
+    for i in range(min(5, len(view))):
+        current = view.array(i, 'current_in_A')
+        time_data = view.array(i, 'time_in_s')
         
-        if current is not None and time_data is not None and len(current) > 0 and len(time_data) > 0:
+        if len(current) > 0 and len(time_data) > 0:
             # 找到充电阶段（电流>0）
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_indices = np.where(charge_mask)[0]
+            charge_indices = view.phases(i).charge_indices
+            if len(charge_indices) > 0:
                 if len(charge_indices) > 1:
                     charge_start_time = time_data[charge_indices[0]]
                     charge_end_time = time_data[charge_indices[-1]]
@@ -79,16 +84,12 @@ def calculate_f11_f20_matr(battery_data):
     temp_data_all = []
     temp_time_integral = 0
     
-    for i in range(1, min(100, len(cycle_data))):  # 第2-100次循环
-        cycle = cycle_data[i]
-        if not isinstance(cycle, dict):
-            continue
-            
+    for i in range(1, min(horizon, len(view))):  # 第2-horizon次循环
         # 检查时间字段
         time_data = None
         for field in ['time_in_s', 'time', 'timestamp']:
-            if field in cycle:
-                time_data = np.array(cycle[field])
+            if view.has_field(i, field):
+                time_data = view.array(i, field)
                 break
         
         # 检查多种可能的温度字段名
@@ -96,8 +97,8 @@ def calculate_f11_f20_matr(battery_data):
         temp_data = None
         
         for temp_field in temp_fields:
-            if temp_field in cycle:
-                temp_data = np.array(cycle[temp_field])
+            if view.has_field(i, temp_field):
+                temp_data = view.array(i, temp_field)
                 if len(temp_data) > 0 and not np.all(np.isnan(temp_data)):
                     break
         
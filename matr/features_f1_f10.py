@@ -1,23 +1,38 @@
 import numpy as np
-import math
 from scipy.interpolate import interp1d
-from scipy import stats
+from dataset_adapters import MATR_ADAPTER
+from feature_utils import delta_q_statistics, log10_abs
 
-def extract_qv_curves_matr(cycle_data):
+# F1-F10 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = MATR_ADAPTER
+
+# 读取的周期：Qdlin用第10、100次循环，容量衰减用前100个周期
+REQUIRED_CYCLES = (9, 99)
+FADE_CYCLES = 100
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return (9, horizon - 1), horizon
+
+def extract_qv_curves_matr(view):
     """从MATR数据中提取每个周期的Q-V曲线（放电阶段的容量-电压关系）"""
     qv_curves = []
     
-    for cycle in cycle_data:
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        discharge_capacity = np.array(cycle.get('discharge_capacity_in_Ah', []))
-        current = np.array(cycle.get('current_in_A', []))
+    for cycle_idx in range(len(view)):
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        discharge_capacity = view.array(cycle_idx, 'discharge_capacity_in_Ah')
+        current = view.array(cycle_idx, 'current_in_A')
         
         if len(voltage) > 0 and len(current) > 0 and len(discharge_capacity) > 0:
             # 筛选放电阶段：电流为负值
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_voltage = voltage[discharge_mask]
-                discharge_cap = discharge_capacity[discharge_mask]
+            discharge_indices = view.phases(cycle_idx).discharge_indices
+            if len(discharge_indices) > 0:
+                discharge_voltage = voltage[discharge_indices]
+                discharge_cap = discharge_capacity[discharge_indices]
                 
                 if len(discharge_voltage) > 1 and len(discharge_cap) > 1:
                     # 修改有效数据筛选条件：降低容量阈值，因为MATR数据中容量值很小
@@ -81,72 +96,81 @@ def calculate_delta_q_matr(qv_curves, cycle_10=10, cycle_100=100):
     
     return delta_q, common_v
 
-def calculate_f1_f10_matr(battery_data):
-    """计算MATR数据的F1-F10特征，使用Qdlin字段"""
+def delta_q_features_matr(delta_q):
+    """由ΔQ₁₀₀₋₁₀矩阵（每行一颗电池）计算F1-F6，返回N×6数组
+
+    F1: log10|最小值|；F2: 平均值；F3: 方差；F4: 偏度；
+    F5: 峰度（ln|m4/m2²|，未减3）；F6: 2V处的值，Qdlin为3.5V到2V的1000个点，取最后一个点
+    """
+    stats = delta_q_statistics(delta_q)
+    return np.column_stack([log10_abs(stats['min']), stats['mean'], stats['var'],
+                            stats['skew'], stats['log_kurtosis'], stats['last']])
+
+def delta_q_matrix_matr(batteries):
+    """把各电池第100次与第10次循环的Qdlin之差堆叠成N×网格点数的矩阵
+
+    周期数不足100、缺少Qdlin或两次循环Qdlin长度不一致的电池为NaN行，返回 (矩阵, 有效行掩码)。
+    """
+    rows = []
+    for battery_data in batteries:
+        view = ADAPTER.view(battery_data)
+        delta_q = None
+        if len(view) >= 100 and view.has_field(9, 'Qdlin') and view.has_field(99, 'Qdlin'):
+            Qdlin_10 = view.array(9, 'Qdlin')
+            Qdlin_100 = view.array(99, 'Qdlin')
+            if len(Qdlin_10) == len(Qdlin_100):
+                delta_q = Qdlin_100 - Qdlin_10
+        rows.append(delta_q)
+
+    valid = np.array([row is not None for row in rows], dtype=bool)
+    lengths = {len(row) for row in rows if row is not None}
+    if len(lengths) > 1:
+        raise ValueError(f"各电池的Qdlin网格点数不一致: {sorted(lengths)}")
+    matrix = np.full((len(rows), lengths.pop() if lengths else 0), np.nan)
+    for i, row in enumerate(rows):
+        if row is not None:
+            matrix[i] = row
+    return matrix, valid
+
+def batch_f1_f6_matr(batteries):
+    """批量计算多颗电池的F1-F6，返回N×6数组，无法计算的电池为NaN行
+
+    各电池的ΔQ₁₀₀₋₁₀堆叠成一个矩阵，统计量沿行一次算完，结果与逐个电池调用calculate_f1_f10_matr相同。
+    """
+    matrix, valid = delta_q_matrix_matr(batteries)
+    features = np.full((len(valid), 6), np.nan)
+    if valid.any():
+        features[valid] = delta_q_features_matr(matrix[valid])
+    return features
+
+def calculate_f1_f10_matr(battery_data, horizon=100):
+    """计算MATR数据的F1-F10特征，使用Qdlin字段
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
     
-    cycle_data = battery_data.get('cycle_data', [])
+    view = ADAPTER.view(battery_data)
     
     # 获取Qdlin数据的函数
     def get_qdlin(cycle_idx):
-        if cycle_idx < len(cycle_data):
-            cycle = cycle_data[cycle_idx]
-            if isinstance(cycle, dict) and 'Qdlin' in cycle:
-                return np.array(cycle['Qdlin'])
+        if cycle_idx < len(view) and view.has_field(cycle_idx, 'Qdlin'):
+            return view.array(cycle_idx, 'Qdlin')
         return None
     
     # F1-F6: 基于Qdlin计算ΔQ₁₀₀₋₁₀
-    if len(cycle_data) >= 100:       
+    if len(view) >= horizon:
         Qdlin_10 = get_qdlin(9)
-        Qdlin_100 = get_qdlin(99)
+        Qdlin_100 = get_qdlin(horizon - 1)
         
         if Qdlin_10 is not None and Qdlin_100 is not None and len(Qdlin_10) == len(Qdlin_100):
             # 计算ΔQ(V) = Q₁₀₀(V) - Q₁₀(V)
             delta_q = Qdlin_100 - Qdlin_10
 
-            f1=math.log(np.abs(np.min(delta_q)), 10)
-
-            # F2: ΔQ₁₀₀₋₁₀的平均值
-            f2 = np.mean(delta_q)            
-            # F3: ΔQ₁₀₀₋₁₀的方差
-            f3 = np.var(delta_q)            
-            # F4: ΔQ₁₀₀₋₁₀的偏度
-            f4 = stats.skew(delta_q)            
-            # F5: ΔQ₁₀₀₋₁₀的峰度
-
-            def get_Kurtosis(data):
-                mean = np.mean(data)
-                numerator = np.mean((data - mean) **4)  # 四阶中心矩的均值
-                denominator = (np.mean((data - mean)** 2)) **2  # 二阶中心矩（方差）的平方
-                fraction = numerator / denominator  # 总体峰度（未减3）
-                result = np.log(np.abs(fraction))  # 取绝对值的自然对数
-                return result
-
-            f5=get_Kurtosis(delta_q)        
-            # F6: ΔQ₁₀₀₋₁₀在2V处的值
-            # Qdlin通常是在固定电压点的数据，假设是从3.5V到2V的1000个点
-            # 取最后一个点作为2V处的值
-            f6 = delta_q[-1] if len(delta_q) > 0 else 0
+            f1, f2, f3, f4, f5, f6 = delta_q_features_matr(delta_q)[0]
               
-    # F7-F8: 第2-100次循环的容量衰减曲线线性拟合的斜率和截距
-    discharge_caps = []
-    for i in range(1, min(100, len(cycle_data))):
-        current = np.array(cycle_data[i].get('current_in_A', []))
-        cap_data = np.array(cycle_data[i].get('discharge_capacity_in_Ah', []))
-        
-        if len(current) > 0 and len(cap_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_phase_cap = cap_data[discharge_mask]
-                # 取放电阶段的最大容量值
-                valid_caps = discharge_phase_cap[discharge_phase_cap > 0]
-                if len(valid_caps) > 0:
-                    discharge_caps.append(np.max(valid_caps))
-                else:
-                    discharge_caps.append(0)
-            else:
-                discharge_caps.append(0)
-        else:
-            discharge_caps.append(0)
+    # F7-F8: 第2-horizon次循环的容量衰减曲线线性拟合的斜率和截距
+    # 放电阶段的最大容量，只取正值（无正值的周期记为0）
+    discharge_caps = np.maximum(view.discharge_capacity_fade(horizon)[1:horizon], 0)
     
     # 线性拟合
     if len(discharge_caps) > 1:
@@ -157,10 +181,10 @@ def calculate_f1_f10_matr(battery_data):
     else:
         f7 = f8 = 0
     
-    # F9-F10: 第91-100次循环的容量衰减曲线线性拟合的斜率和截距
-    if len(discharge_caps) >= 90:
-        cycles_91_100 = np.arange(91, 101)
-        caps_91_100 = discharge_caps[89:99]
+    # F9-F10: 最后10个周期（默认第91-100次循环）的容量衰减曲线线性拟合的斜率和截距
+    if len(discharge_caps) >= horizon - 10:
+        cycles_91_100 = np.arange(horizon - 9, horizon + 1)
+        caps_91_100 = discharge_caps[horizon - 11:horizon - 1]
         if len(caps_91_100) > 1:
             slope_91_100, intercept_91_100 = np.polyfit(cycles_91_100, caps_91_100, 1)
             f9 = slope_91_100
@@ -1,46 +1,55 @@
 import numpy as np
 import math
 from scipy import stats
+from dataset_adapters import MATR_ADAPTER
 
-def calculate_f21_f30_matr(battery_data):
-    """计算MATR数据的F21-F30特征，严格按照指导文件定义"""
+# F21-F30 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = MATR_ADAPTER
+
+# 读取的周期：第10、100次循环
+REQUIRED_CYCLES = (9, 99)
+FADE_CYCLES = 100
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return (9, horizon - 1), horizon
+
+def calculate_f21_f30_matr(battery_data, horizon=100):
+    """计算MATR数据的F21-F30特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
     
     # 提取循环数据
-    cycle_data = battery_data.get('cycle_data', [])
+    view = ADAPTER.view(battery_data)
+    idx_h = horizon - 1
     
     # 获取放电容量的辅助函数
     def get_discharge_capacity(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
-        
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        cap_data = np.array(cycle.get('discharge_capacity_in_Ah', []))
-        
-        if len(current) > 0 and len(cap_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_phase_cap = cap_data[discharge_mask]
-                valid_caps = discharge_phase_cap[discharge_phase_cap > 0]
-                return np.max(valid_caps) if len(valid_caps) > 0 else 0
-        return 0
+        # 放电阶段的最大容量，只取正值
+        return max(view.discharge_capacity_fade(horizon)[cycle_idx], 0)
     
     # 获取放电能量的辅助函数
     def get_discharge_energy(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_voltage = voltage[discharge_mask]
-                discharge_current = current[discharge_mask]
-                discharge_time = time_data[discharge_mask]
+            discharge_indices = view.phases(cycle_idx).discharge_indices
+            if len(discharge_indices) > 0:
+                discharge_voltage = voltage[discharge_indices]
+                discharge_current = current[discharge_indices]
+                discharge_time = time_data[discharge_indices]
                 
                 if len(discharge_time) > 1:
                     # 能量 = 平均功率 × 时间
@@ -51,66 +60,61 @@ def calculate_f21_f30_matr(battery_data):
     
     # 获取循环时间的辅助函数
     def get_cycle_time(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        time_data = np.array(cycle.get('time_in_s', []))
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(time_data) > 1:
             return time_data[-1] - time_data[0]
         return 0
     
     # F21: 第100次与第10次循环的放电容量差值 (Discharge Capacity [Ah] 100-10)
-    cap_100 = get_discharge_capacity(99) if len(cycle_data) > 99 else 0
-    cap_10 = get_discharge_capacity(9) if len(cycle_data) > 9 else 0
+    cap_100 = get_discharge_capacity(idx_h) if len(view) > idx_h else 0
+    cap_10 = get_discharge_capacity(9) if len(view) > 9 else 0
     f21 = cap_100 - cap_10
     
     # F22: 第100次与第10次循环的放电能量差值 (Discharge Energy [Wh] 100-10)
-    energy_100 = get_discharge_energy(99) if len(cycle_data) > 99 else 0
-    energy_10 = get_discharge_energy(9) if len(cycle_data) > 9 else 0
+    energy_100 = get_discharge_energy(idx_h) if len(view) > idx_h else 0
+    energy_10 = get_discharge_energy(9) if len(view) > 9 else 0
     f22 = energy_100 - energy_10
     
     # F23: 第100次与第10次循环的循环时间差值 (Cycle Time [s] 100-10)
-    time_100 = get_cycle_time(99) if len(cycle_data) > 99 else 0
-    time_10 = get_cycle_time(9) if len(cycle_data) > 9 else 0
+    time_100 = get_cycle_time(idx_h) if len(view) > idx_h else 0
+    time_10 = get_cycle_time(9) if len(view) > 9 else 0
     f23 = time_100 - time_10
     
     # F24: 第100次循环的充电开始端电压 (Terminal Voltage @ Start of charge [V])
     def get_charge_start_voltage(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
         
         if len(current) > 0 and len(voltage) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_indices = np.where(charge_mask)[0]
-                if len(charge_indices) > 0:
-                    return voltage[charge_indices[0]]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                return voltage[charge_indices[0]]
         return 0
     
-    f24 = get_charge_start_voltage(99) if len(cycle_data) > 99 else 0
+    f24 = get_charge_start_voltage(idx_h) if len(view) > idx_h else 0
     
     # F25-F26: 第100次循环的CC/CV段充电时间 (Charge time of CC/CV segment [s])
     def get_cc_cv_times(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0, 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 if len(charge_current) > 10:
                     # 简化的CC/CV识别：CC段电流相对稳定，CV段电压相对稳定
@@ -133,64 +137,61 @@ def calculate_f21_f30_matr(battery_data):
                     return cc_time, cv_time
         return 0, 0
     
-    cc_time_100, cv_time_100 = get_cc_cv_times(99) if len(cycle_data) > 99 else (0, 0)
+    cc_time_100, cv_time_100 = get_cc_cv_times(idx_h) if len(view) > idx_h else (0, 0)
     f25 = cc_time_100  # CC段充电时间
     f26 = cv_time_100  # CV段充电时间
     
     # F27: 第100次循环的CC段平均电流 (Mean current during CC segment [A])
     def get_cc_mean_current(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
+        current = view.array(cycle_idx, 'current_in_A')
         
         if len(current) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
                 if len(charge_current) > 0:
                     # 简化：取充电电流的平均值作为CC段电流
                     return np.mean(charge_current)
         return 0
     
-    f27 = get_cc_mean_current(99) if len(cycle_data) > 99 else 0
+    f27 = get_cc_mean_current(idx_h) if len(view) > idx_h else 0
     
     # F28: 第100次循环的CV段平均电压 (Mean voltage during CV segment [V])
     def get_cv_mean_voltage(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
         
         if len(current) > 0 and len(voltage) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_voltage = voltage[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_voltage = voltage[charge_indices]
                 if len(charge_voltage) > 0:
                     # 简化：取充电电压的平均值作为CV段电压
                     return np.mean(charge_voltage)
         return 0
     
-    f28 = get_cv_mean_voltage(99) if len(cycle_data) > 99 else 0
+    f28 = get_cv_mean_voltage(idx_h) if len(view) > idx_h else 0
     
     # F29: 第100次循环的CCCV段斜率 (Slope of CCCV-CCCT segment)
     def get_cccv_slope(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 if len(charge_time) > 2:
                     # 计算电压-时间曲线的斜率
@@ -198,22 +199,21 @@ def calculate_f21_f30_matr(battery_data):
                     return slope
         return 0
     
-    f29 = get_cccv_slope(99) if len(cycle_data) > 99 else 0
+    f29 = get_cccv_slope(idx_h) if len(view) > idx_h else 0
     
     # F30: 第100次循环的CVCC段斜率 (Slope of CVCC-CVCT segment)
     def get_cvcc_slope(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 if len(charge_time) > 2:
                     # 计算电流-时间曲线的斜率
@@ -221,6 +221,6 @@ def calculate_f21_f30_matr(battery_data):
                     return slope
         return 0
     
-    f30 = get_cvcc_slope(99) if len(cycle_data) > 99 else 0
+    f30 = get_cvcc_slope(idx_h) if len(view) > idx_h else 0
     
     return [f21, f22, f23, f24, f25, f26, f27, f28, f29, f30]
\ No newline at end of file
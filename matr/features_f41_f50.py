@@ -2,29 +2,48 @@ import numpy as np
 import math
 from scipy import stats
 from scipy.spatial.distance import directed_hausdorff
+from dataset_adapters import MATR_ADAPTER
+from feature_utils import calculate_hausdorff_distance_single_segment
 
-def calculate_f41_f50_matr(battery_data):
-    """计算MATR数据的F41-F50特征，严格按照指导文件定义"""
+# F41-F50 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = MATR_ADAPTER
+
+# 读取的周期：第100次循环
+REQUIRED_CYCLES = (99,)
+FADE_CYCLES = 0
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return (horizon - 1,), 0
+
+def calculate_f41_f50_matr(battery_data, horizon=100):
+    """计算MATR数据的F41-F50特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    """
     
     # 提取循环数据
-    cycle_data = battery_data.get('cycle_data', [])
+    view = ADAPTER.view(battery_data)
     
     # 获取第100次循环的充电段数据
     def get_charge_segments_with_current(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return [], []
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 if len(charge_voltage) > 2:
                     # 分为前半段(CCCV-CCCT)和后半段(CVCC-CVCT)
@@ -64,27 +83,8 @@ def calculate_f41_f50_matr(battery_data):
                     return np.mean(np.abs(d2v_dt2))
         return 0
     
-    # 计算豪斯多夫距离（段内距离）
-    def calculate_hausdorff_distance_single_segment(segment):
-        if len(segment) < 2:
-            return 0
-        
-        # 计算段内点之间的最大距离
-        points = segment
-        if len(points) < 2:
-            return 0
-            
-        # 计算所有点对之间的距离
-        distances = []
-        for i in range(len(points)):
-            for j in range(i+1, len(points)):
-                dist = np.linalg.norm(points[i] - points[j])
-                distances.append(dist)
-        
-        return np.max(distances) if distances else 0
-    
     # 获取第100次循环的充电段数据
-    segment1, segment2 = get_charge_segments_with_current(99)  # 第100次循环
+    segment1, segment2 = get_charge_segments_with_current(horizon - 1)  # 默认第100次循环
     
     # F41: CCCV-CCCT段的峰度系数 eq 5
     f41 = calculate_kurtosis(segment1[:, 1]) if len(segment1) > 0 else 0
@@ -106,13 +106,12 @@ def calculate_f41_f50_matr(battery_data):
     
     # F47: MVF——mean voltage falloff，5min after discharge
     def get_voltage_falloff(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
             # 找到放电结束点
@@ -149,24 +148,23 @@ def calculate_f41_f50_matr(battery_data):
                                         return voltage_start - voltage_end  # 电压下降量
         return 0
     
-    f47 = get_voltage_falloff(99)  # 第100次循环的MVF
+    f47 = get_voltage_falloff(horizon - 1)  # 默认第100次循环的MVF
     
     # F48: CC阶段4.0-4.2V的等电压差时间间隔
     def get_cc_voltage_time_interval(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 # 识别CC段（电流相对稳定）
                 if len(charge_current) > 10:
@@ -190,24 +188,23 @@ def calculate_f41_f50_matr(battery_data):
                                 return time_42 - time_40
         return 0
     
-    f48 = get_cc_voltage_time_interval(99)  # 第100次循环
+    f48 = get_cc_voltage_time_interval(horizon - 1)  # 默认第100次循环
     
     # F49: CC阶段4.0-4.2V的充电容量
     def get_cc_capacity(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        voltage = np.array(cycle.get('voltage_in_V', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        voltage = view.array(cycle_idx, 'voltage_in_V')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 # 识别CC段
                 if len(charge_current) > 10:
@@ -232,22 +229,21 @@ def calculate_f41_f50_matr(battery_data):
                                 return capacity
         return 0
     
-    f49 = get_cc_capacity(99)  # 第100次循环
+    f49 = get_cc_capacity(horizon - 1)  # 默认第100次循环
     
     # F50: CV阶段4A-0.1A的等电流差时间间隔
     def get_cv_current_time_interval(cycle_idx):
-        if cycle_idx >= len(cycle_data):
+        if cycle_idx >= len(view):
             return 0
         
-        cycle = cycle_data[cycle_idx]
-        current = np.array(cycle.get('current_in_A', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 # 识别CV段（电流递减）
                 if len(charge_current) > 10:
@@ -272,6 +268,6 @@ def calculate_f41_f50_matr(battery_data):
                                 return time_01a - time_4a
         return 0
     
-    f50 = get_cv_current_time_interval(99)  # 第100次循环
+    f50 = get_cv_current_time_interval(horizon - 1)  # 默认第100次循环
     
     return [f41, f42, f43, f44, f45, f46, f47, f48, f49, f50]
\ No newline at end of file
@@ -1,30 +1,53 @@
 import numpy as np
 import math
 from scipy import stats
+from dataset_adapters import MATR_ADAPTER
 
-def calculate_f51_f59_matr(battery_data):
-    """计算MATR数据的F51-F59特征，严格按照指导文件定义"""
+# F51-F59 特征版本号
+FEATURE_VERSION = 1
+
+# 数据集适配器
+ADAPTER = MATR_ADAPTER
+
+# 读取的周期：F59累计时间最多用到第104次循环；F58需要全部周期的容量衰减向量
+REQUIRED_CYCLES = range(104)
+FADE_CYCLES = None
+
+
+def horizon_requirements(horizon):
+    """预测时域为horizon时读取的周期和容量衰减前缀周期数，horizon=100时即REQUIRED_CYCLES、FADE_CYCLES"""
+    return range(horizon + 4), None
+
+def calculate_f51_f59_matr(battery_data, horizon=100):
+    """计算MATR数据的F51-F59特征，严格按照指导文件定义
+
+    horizon: 预测时域，第horizon次循环代替第100次循环（默认100）
+    F58按全部周期的容量衰减向量计算，与horizon无关
+    """
     
     # 提取循环数据
-    cycle_data = battery_data.get('cycle_data', [])
+    view = ADAPTER.view(battery_data)
+    
+    if len(view) == 0:
+        return [0, 0, 0, 0, 0, 0, 0, 1, 0]
     
-    # 获取第100次循环数据
-    if len(cycle_data) > 99:
-        cycle_100 = cycle_data[99]
+    # 第horizon次循环的索引
+    if len(view) > horizon - 1:
+        idx_100 = horizon - 1
     else:
-        # 如果没有第100次循环，使用最后一次循环
-        cycle_100 = cycle_data[-1] if cycle_data else {}
+        # 如果没有第horizon次循环，使用最后一次循环
+        idx_100 = len(view) - 1
     
     # F51: CV阶段4A-0.1A的充电容量
     def get_cv_capacity_4a_01a():
-        current = np.array(cycle_100.get('current_in_A', []))
-        charge_cap = np.array(cycle_100.get('charge_capacity_in_Ah', []))
+        current = view.array(idx_100, 'current_in_A')
+        charge_cap = view.array(idx_100, 'charge_capacity_in_Ah')
         
         if len(current) > 0 and len(charge_cap) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_capacity = charge_cap[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_capacity = charge_cap[charge_indices]
                 
                 # 识别CV段（电流递减）
                 if len(charge_current) > 10:
@@ -49,27 +72,27 @@ def calculate_f51_f59_matr(battery_data):
     
     # F52: CC阶段4.0-4.2V的温度变化率
     def get_cc_temp_change_rate_4v():
-        current = np.array(cycle_100.get('current_in_A', []))
-        voltage = np.array(cycle_100.get('voltage_in_V', []))
-        time_data = np.array(cycle_100.get('time_in_s', []))
+        current = view.array(idx_100, 'current_in_A')
+        voltage = view.array(idx_100, 'voltage_in_V')
+        time_data = view.array(idx_100, 'time_in_s')
         
         # 检查多种可能的温度字段名
         temp_fields = ['temperature_in_C', 'temp_in_C', 'T_in_C', 'temperature', 'temp']
         temp_data = None
         
         for temp_field in temp_fields:
-            if temp_field in cycle_100:
-                temp_data = np.array(cycle_100[temp_field])
+            if view.has_field(idx_100, temp_field):
+                temp_data = view.array(idx_100, temp_field)
                 if len(temp_data) > 0 and not np.all(np.isnan(temp_data)):
                     break
         
         if temp_data is not None and len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_temp = temp_data[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_temp = temp_data[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 # 识别CC段并限定4.0-4.2V范围
                 if len(charge_current) > 10:
@@ -99,25 +122,25 @@ def calculate_f51_f59_matr(battery_data):
     
     # F53: CV阶段4A-0.1A的温度变化率
     def get_cv_temp_change_rate_4a():
-        current = np.array(cycle_100.get('current_in_A', []))
-        time_data = np.array(cycle_100.get('time_in_s', []))
+        current = view.array(idx_100, 'current_in_A')
+        time_data = view.array(idx_100, 'time_in_s')
         
         # 检查多种可能的温度字段名
         temp_fields = ['temperature_in_C', 'temp_in_C', 'T_in_C', 'temperature', 'temp']
         temp_data = None
         
         for temp_field in temp_fields:
-            if temp_field in cycle_100:
-                temp_data = np.array(cycle_100[temp_field])
+            if view.has_field(idx_100, temp_field):
+                temp_data = view.array(idx_100, temp_field)
                 if len(temp_data) > 0 and not np.all(np.isnan(temp_data)):
                     break
         
         if temp_data is not None and len(current) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_temp = temp_data[charge_mask]
-                charge_time = time_data[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_temp = temp_data[charge_indices]
+                charge_time = time_data[charge_indices]
                 
                 # 识别CV段并限定4A-0.1A范围
                 if len(charge_current) > 10:
@@ -147,14 +170,14 @@ def calculate_f51_f59_matr(battery_data):
     
     # F54: CC充电容量（全CC段）
     def get_cc_capacity_all():
-        current = np.array(cycle_100.get('current_in_A', []))
-        charge_cap = np.array(cycle_100.get('charge_capacity_in_Ah', []))
+        current = view.array(idx_100, 'current_in_A')
+        charge_cap = view.array(idx_100, 'charge_capacity_in_Ah')
         
         if len(current) > 0 and len(charge_cap) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_capacity = charge_cap[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_capacity = charge_cap[charge_indices]
                 
                 # 识别CC段（电流相对稳定）
                 if len(charge_current) > 10:
@@ -173,14 +196,14 @@ def calculate_f51_f59_matr(battery_data):
     
     # F55: CV充电容量（全CV段）
     def get_cv_capacity_all():
-        current = np.array(cycle_100.get('current_in_A', []))
-        charge_cap = np.array(cycle_100.get('charge_capacity_in_Ah', []))
+        current = view.array(idx_100, 'current_in_A')
+        charge_cap = view.array(idx_100, 'charge_capacity_in_Ah')
         
         if len(current) > 0 and len(charge_cap) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_capacity = charge_cap[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_capacity = charge_cap[charge_indices]
                 
                 # 识别CV段（电流递减）
                 if len(charge_current) > 10:
@@ -199,16 +222,16 @@ def calculate_f51_f59_matr(battery_data):
     
     # F56: CC充电模式结束时曲线的斜率
     def get_cc_end_slope():
-        current = np.array(cycle_100.get('current_in_A', []))
-        voltage = np.array(cycle_100.get('voltage_in_V', []))
-        time_data = np.array(cycle_100.get('time_in_s', []))
+        current = view.array(idx_100, 'current_in_A')
+        voltage = view.array(idx_100, 'voltage_in_V')
+        time_data = view.array(idx_100, 'time_in_s')
         
         if len(current) > 0 and len(voltage) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
-                charge_time = time_data[charge_mask]  # MATR数据已经是秒，不需要转换
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
+                charge_time = time_data[charge_indices]  # MATR数据已经是秒，不需要转换
                 
                 # 识别CC段
                 if len(charge_current) > 10:
@@ -235,14 +258,14 @@ def calculate_f51_f59_matr(battery_data):
     
     # F57: CC充电曲线拐角处的垂直斜率
     def get_cc_corner_slope():
-        current = np.array(cycle_100.get('current_in_A', []))
-        voltage = np.array(cycle_100.get('voltage_in_V', []))
+        current = view.array(idx_100, 'current_in_A')
+        voltage = view.array(idx_100, 'voltage_in_V')
         
         if len(current) > 0 and len(voltage) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_current = current[charge_mask]
-                charge_voltage = voltage[charge_mask]
+            charge_indices = view.phases(idx_100).charge_indices
+            if len(charge_indices) > 0:
+                charge_current = current[charge_indices]
+                charge_voltage = voltage[charge_indices]
                 
                 # 找到CC到CV的转换点（拐角）
                 if len(charge_current) > 10:
@@ -268,23 +291,9 @@ def calculate_f51_f59_matr(battery_data):
     f57 = get_cc_corner_slope()
     
     # F58: 最大容量对应的循环次数 (保持原有实现，与文档一致)
-    discharge_capacities = []
-    for cycle in cycle_data:
-        current = np.array(cycle.get('current_in_A', []))
-        discharge_cap = np.array(cycle.get('discharge_capacity_in_Ah', []))
-        
-        if len(current) > 0 and len(discharge_cap) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_phase_cap = discharge_cap[discharge_mask]
-                max_cap = np.max(discharge_phase_cap) if len(discharge_phase_cap) > 0 else 0
-                discharge_capacities.append(max_cap)
-            else:
-                discharge_capacities.append(0)
-        else:
-            discharge_capacities.append(0)
+    discharge_capacities = view.discharge_capacity_fade()
     
-    if discharge_capacities:
+    if len(discharge_capacities) > 0:
         max_cap_cycle = np.argmax(discharge_capacities) + 1
         f58 = max_cap_cycle
     else:
@@ -295,28 +304,13 @@ def calculate_f51_f59_matr(battery_data):
         """计算从初始循环到最大放电容量所在循环的总充电时间与总放电时间之和"""
         
         # 1. 定位最大放电容量所在的循环
-        # 提取前100次循环的放电容量数据
-        qdischarge = []
-        for i in range(1, min(100, len(cycle_data))):  # 从第2次循环开始（索引1）
-            cycle = cycle_data[i]
-            current = np.array(cycle.get('current_in_A', []))
-            discharge_cap = np.array(cycle.get('discharge_capacity_in_Ah', []))
-            
-            if len(current) > 0 and len(discharge_cap) > 0:
-                discharge_mask = current < 0
-                if np.any(discharge_mask):
-                    discharge_phase_cap = discharge_cap[discharge_mask]
-                    max_cap = np.max(discharge_phase_cap) if len(discharge_phase_cap) > 0 else 0
-                    qdischarge.append(max_cap)
-                else:
-                    qdischarge.append(0)
-            else:
-                qdischarge.append(0)
+        # 提取前horizon次循环的放电容量数据
+        qdischarge = view.discharge_capacity_fade(horizon)[1:horizon]  # 从第2次循环开始（索引1）
         
-        if not qdischarge:
+        if len(qdischarge) == 0:
             return 0
         
-        # 过滤异常值：将放电容量大于1.3的值置为0
+        # 过滤异常值：将放电容量大于1.3的值置为0（复制一份，容量衰减向量为只读共享数据）
         qdischarge = np.array(qdischarge)
         qdischarge[qdischarge > 1.3] = 0
         
@@ -328,22 +322,21 @@ def calculate_f51_f59_matr(battery_data):
         all_charge_time = 0
         
         # 遍历从第1次循环到最大容量所在循环
-        for cycle_idx in range(min(max_qd_index, len(cycle_data))):
-            cycle = cycle_data[cycle_idx]
-            current = np.array(cycle.get('current_in_A', []))
-            time_data = np.array(cycle.get('time_in_s', []))
+        for cycle_idx in range(min(max_qd_index, len(view))):
+            current = view.array(cycle_idx, 'current_in_A')
+            time_data = view.array(cycle_idx, 'time_in_s')
             
             if len(current) > 0 and len(time_data) > 0:
                 # 计算放电时间
-                discharge_time = get_discharge_time(cycle)
+                discharge_time = get_discharge_time(cycle_idx)
                 all_discharge_time += discharge_time
                 
                 # 计算充电时间
-                charge_time = get_charge_time(cycle)
+                charge_time = get_charge_time(cycle_idx)
                 if charge_time > 100:  # 时间异常处理
                     # 尝试从后续循环获取合理值
-                    for next_idx in range(cycle_idx + 1, min(cycle_idx + 5, len(cycle_data))):
-                        next_charge_time = get_charge_time(cycle_data[next_idx])
+                    for next_idx in range(cycle_idx + 1, min(cycle_idx + 5, len(view))):
+                        next_charge_time = get_charge_time(next_idx)
                         if next_charge_time <= 100:
                             charge_time = next_charge_time
                             break
@@ -356,36 +349,32 @@ def calculate_f51_f59_matr(battery_data):
         charge_and_dis_time = all_charge_time + all_discharge_time
         return charge_and_dis_time
     
-    def get_discharge_time(cycle):
+    def get_discharge_time(cycle_idx):
         """获取单个循环的放电时间"""
-        current = np.array(cycle.get('current_in_A', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(time_data) > 0:
-            discharge_mask = current < 0
-            if np.any(discharge_mask):
-                discharge_indices = np.where(discharge_mask)[0]
-                if len(discharge_indices) > 0:
-                    start_time = time_data[discharge_indices[0]]
-                    end_time = time_data[discharge_indices[-1]]
-                    duration = end_time - start_time  # MATR数据已经是秒，直接使用
-                    return duration
+            discharge_indices = view.phases(cycle_idx).discharge_indices
+            if len(discharge_indices) > 0:
+                start_time = time_data[discharge_indices[0]]
+                end_time = time_data[discharge_indices[-1]]
+                duration = end_time - start_time  # MATR数据已经是秒，直接使用
+                return duration
         return 0
     
-    def get_charge_time(cycle):
+    def get_charge_time(cycle_idx):
         """获取单个循环的充电时间"""
-        current = np.array(cycle.get('current_in_A', []))
-        time_data = np.array(cycle.get('time_in_s', []))
+        current = view.array(cycle_idx, 'current_in_A')
+        time_data = view.array(cycle_idx, 'time_in_s')
         
         if len(current) > 0 and len(time_data) > 0:
-            charge_mask = current > 0
-            if np.any(charge_mask):
-                charge_indices = np.where(charge_mask)[0]
-                if len(charge_indices) > 0:
-                    start_time = time_data[charge_indices[0]]
-                    end_time = time_data[charge_indices[-1]]
-                    duration = end_time - start_time  # MATR数据已经是秒，直接使用
-                    return duration
+            charge_indices = view.phases(cycle_idx).charge_indices
+            if len(charge_indices) > 0:
+                start_time = time_data[charge_indices[0]]
+                end_time = time_data[charge_indices[-1]]
+                duration = end_time - start_time  # MATR数据已经是秒，直接使用
+                return duration
         return 0
     
     f59 = get_c_dc_time()
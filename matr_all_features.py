@@ -0,0 +1,74 @@
+import os
+import argparse
+from matr import features_f1_f10, features_f11_f20, features_f21_f30, features_f31_f40, features_f41_f50, features_f51_f59
+from dataset_manifest import load_manifest
+from feature_pipeline import extract_all_features, list_battery_files, write_feature_table
+
+# 特征组：(组名, 计算函数, 版本号)，按输出列顺序排列
+MATR_FEATURE_GROUPS = [
+    ('F1-F10', features_f1_f10.calculate_f1_f10_matr, features_f1_f10.FEATURE_VERSION),
+    ('F11-F20', features_f11_f20.calculate_f11_f20_matr, features_f11_f20.FEATURE_VERSION),
+    ('F21-F30', features_f21_f30.calculate_f21_f30_matr, features_f21_f30.FEATURE_VERSION),
+    ('F31-F40', features_f31_f40.calculate_f31_f40_matr, features_f31_f40.FEATURE_VERSION),
+    ('F41-F50', features_f41_f50.calculate_f41_f50_matr, features_f41_f50.FEATURE_VERSION),
+    ('F51-F59', features_f51_f59.calculate_f51_f59_matr, features_f51_f59.FEATURE_VERSION),
+]
+
+# 默认的特征结果缓存目录
+MATR_CACHE_DIR = "./result/cache/matr"
+
+# extract_features.py 读取的特征表
+MATR_OUTPUT_FILE = "matr_all_features.txt"
+
+def extract_all_matr_features(battery_data, filename):
+    """提取MATR数据的所有59个特征"""
+    return extract_all_features(battery_data, filename, MATR_FEATURE_GROUPS)
+
+def process_matr_all_features(workers=1, store_root=None, cache_dir=MATR_CACHE_DIR,
+                              output_filename=MATR_OUTPUT_FILE, resume=True, horizons=None, layout='wide',
+                              prefetch_depth=2, use_manifest=True):
+    """处理MATR数据集提取所有特征，输出Battery_Name、F1-F59、Cycle_Life共61列
+
+    每个电池计算完成后立即写入输出文件；resume为True时跳过输出文件中已完成的电池，
+    中途中断后重新运行即可从断点继续。
+    horizons: 预测时域列表（如 [25, 50, 75, 100]），一次读取数据计算各时域的F1-F59，None为只算第100次循环
+    layout: 多时域时的表格形式，'wide'为每颗电池一行（列名F1_h25等），'long'为每个时域一行（增加Horizon列）
+    prefetch_depth: 提前读取的电池数，读取与特征计算重叠（进程池时为提前读入页缓存），0为不预读
+    use_manifest: 读取数据目录下的清单（dataset_manifest.py生成），清单中周期数不足的文件不再读取
+    """
+    file_paths = list_battery_files("data/MATR", store_root)
+    # 列式存储目录的周期数由偏移量直接得到，清单只用于pkl文件
+    manifest = load_manifest("data/MATR") if use_manifest and store_root is None else None
+    print(f"找到 {len(file_paths)} 个MATR文件")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    processed_files, failed_files = write_feature_table(output_filename, file_paths, MATR_FEATURE_GROUPS,
+                                                        workers=workers, cache_dir=cache_dir, resume=resume,
+                                                        horizons=horizons, layout=layout,
+                                                        prefetch_depth=prefetch_depth, manifest=manifest)
+
+    print(f"MATR所有特征处理完成，本次处理 {len(processed_files)} 个文件")
+    if failed_files:
+        print(f"处理失败 {len(failed_files)} 个文件: {failed_files}")
+    print(f"结果保存到: {output_filename}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取MATR数据集的F1-F59特征，生成matr_all_features.txt")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0表示使用全部CPU核心")
+    parser.add_argument("--store", default=None, help="从列式存储目录读取（例如 data_store/MATR），代替data/MATR下的pkl文件")
+    parser.add_argument("--cache-dir", default=MATR_CACHE_DIR, help="特征结果缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存，全部重新计算")
+    parser.add_argument("--output", default=MATR_OUTPUT_FILE, help="输出文件")
+    parser.add_argument("--restart", action="store_true", help="忽略已有输出文件，从头重新生成")
+    parser.add_argument("--horizons", type=int, nargs='+', default=None, help="预测时域（周期数），例如 --horizons 25 50 75 100")
+    parser.add_argument("--layout", choices=['wide', 'long'], default='wide', help="多时域输出形式：wide每颗电池一行，long每个时域一行")
+    parser.add_argument("--prefetch", type=int, default=2, help="提前读取的电池数，0表示不预读")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用数据目录下的清单")
+    args = parser.parse_args()
+    process_matr_all_features(workers=args.workers, store_root=args.store,
+                              cache_dir=None if args.no_cache else args.cache_dir,
+                              output_filename=args.output, resume=not args.restart,
+                              horizons=args.horizons, layout=args.layout, prefetch_depth=args.prefetch,
+                              use_manifest=not args.no_manifest)
@@ -0,0 +1,223 @@
+import os
+import pickle
+import argparse
+from collections.abc import Sequence
+import numpy as np
+from cycle_view import CycleView, _to_column, discharge_capacity_fade
+from feature_pipeline import MIN_CYCLES, canonical_view, compute_groups, cycle_requirements, merge_groups, min_cycles
+from qv_matrix import qv_rows
+
+# 特征组声明需要全部周期时保留的周期数上限（与F59最多用到第104次循环一致）
+DEFAULT_RETAIN = 104
+
+# 到达时即转换为数组的信号字段
+SIGNAL_FIELDS = ['current_in_A', 'voltage_in_V', 'charge_capacity_in_Ah', 'discharge_capacity_in_Ah',
+                 'time_in_s', 'temperature_in_C', 'Qdlin']
+
+# 预先计算Q(V)矩阵行的参考周期（第10次循环）
+REFERENCE_CYCLE = 9
+
+
+class OnlineCycles(Sequence):
+    """在线接收的周期序列：只保留前retain个周期字典，之后的周期只计数
+
+    访问未保留的周期会抛出KeyError，特征组读取的周期都应在REQUIRED_CYCLES声明的范围内。
+    """
+
+    def __init__(self, retain):
+        self.retain = retain
+        self.kept = []
+        self.count = 0
+
+    def append(self, cycle):
+        if self.count < self.retain:
+            self.kept.append(cycle)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, cycle_idx):
+        if isinstance(cycle_idx, slice):
+            return [self[i] for i in range(*cycle_idx.indices(len(self)))]
+        if cycle_idx < 0:
+            cycle_idx += len(self)
+        if not 0 <= cycle_idx < len(self):
+            raise IndexError("周期索引越界")
+        if cycle_idx >= len(self.kept):
+            raise KeyError(f"第{cycle_idx + 1}个周期未保留（只保留前{self.retain}个周期）")
+        return self.kept[cycle_idx]
+
+
+class OnlineCycleView(CycleView):
+    """增量构建的周期视图：容量衰减向量随周期到达逐个追加，不再扫描历史周期"""
+
+    def __init__(self, battery_info, retain):
+        super().__init__(battery_info)
+        self.cycle_data = OnlineCycles(retain)
+        self._fade_buffer = np.zeros(256, dtype=np.float64)
+
+    def append_cycle(self, cycle):
+        """追加一个周期并计算它的容量衰减值，返回该值"""
+        cycle_idx = len(self.cycle_data)
+        self.cycle_data.append(cycle)
+        if cycle_idx < self.cycle_data.retain:
+            current = self.array(cycle_idx, 'current_in_A')
+            capacity = self.array(cycle_idx, 'discharge_capacity_in_Ah')
+        else:
+            raw = cycle if isinstance(cycle, dict) else {}
+            current = _to_column(raw.get('current_in_A'))
+            capacity = _to_column(raw.get('discharge_capacity_in_Ah'))
+        # 与CycleView._compute_fade相同：按较短者对齐后求放电阶段的最大放电容量
+        n = min(len(current), len(capacity))
+        value = discharge_capacity_fade(current[:n], capacity[:n], [0, n])[0] if n > 0 else 0.0
+
+        if cycle_idx >= len(self._fade_buffer):
+            self._fade_buffer = np.concatenate([self._fade_buffer, np.zeros_like(self._fade_buffer)])
+        self._fade_buffer[cycle_idx] = value
+        return value
+
+    def discharge_capacity_fade(self, stop=None):
+        n_cycles = len(self) if stop is None else min(stop, len(self))
+        fade = self._fade_buffer[:n_cycles].view()
+        fade.setflags(write=False)
+        return fade
+
+    def clear_cache(self):
+        """只释放派生结果；保留周期的数组在到达时已转换，容量衰减向量不可重建，均保留"""
+        self._derived.clear()
+
+
+class IncrementalFeatureExtractor:
+    """单个通道的在线特征提取器：逐个周期输入，每个周期的更新只与该周期的采样点数有关
+
+    维护的状态：
+    - 容量衰减向量（每个周期放电阶段的最大放电容量）及全程最大容量和所在周期（F58）
+    - 前retain个周期的数组与阶段表（到达时即转换），第10次循环的Q-V参考曲线
+    - 只依赖前retain个周期的特征组结果：周期数达到retain后计算一次并固定，之后只重算依赖全部周期的特征组
+
+    周期数达到MIN_CYCLES（第100个周期到达）后features()即可返回特征，
+    结果与对同样这些周期调用extract_all_features完全相同。
+    """
+
+    def __init__(self, groups, battery_info=None, retain=None):
+        self.groups = groups
+        cycles, _ = cycle_requirements(groups)
+        if retain is None:
+            retain = DEFAULT_RETAIN if cycles is None else max(max(cycles) + 1, min_cycles(groups))
+        self.retain = retain
+        info = {key: value for key, value in (battery_info or {}).items() if key != 'cycle_data'}
+        self.view = OnlineCycleView(info, retain)
+        # 特征组声明了数据集适配器时在规范周期视图上计算，换算后的信号同样在到达时缓存
+        self.canonical = canonical_view(self.view, groups)
+        self.max_capacity = None
+        self.max_capacity_cycle = None
+        self._frozen = {}
+
+    def __len__(self):
+        return len(self.view)
+
+    @property
+    def ready(self):
+        """是否已有足够周期计算特征"""
+        return len(self.view) >= min_cycles(self.groups)
+
+    @property
+    def fade(self):
+        """当前的容量衰减向量（只读）"""
+        return self.view.discharge_capacity_fade()
+
+    def add_cycle(self, cycle):
+        """输入一个新周期（与cycle_data中元素相同的字典）"""
+        cycle_idx = len(self.view)
+        value = self.view.append_cycle(cycle)
+
+        # 与np.argmax一致：取第一个最大值，出现NaN时取第一个NaN
+        if self.max_capacity is None or (not np.isnan(self.max_capacity) and
+                                         (np.isnan(value) or value > self.max_capacity)):
+            self.max_capacity = value
+            self.max_capacity_cycle = cycle_idx + 1
+
+        if cycle_idx < self.retain:
+            # 保留周期的信号和阶段表在到达时转换，之后计算特征时直接复用
+            for field in SIGNAL_FIELDS:
+                if self.canonical.has_field(cycle_idx, field):
+                    self.canonical.array(cycle_idx, field)
+            self.canonical.phases(cycle_idx)
+            if cycle_idx == REFERENCE_CYCLE:
+                qv_rows(self.canonical, [cycle_idx])
+
+    def add_cycles(self, cycles):
+        for cycle in cycles:
+            self.add_cycle(cycle)
+
+    def _fixed_groups(self):
+        """只依赖前retain个周期和前若干周期容量衰减的特征组，周期数达到retain后结果不再变化"""
+        fixed = set()
+        for group in self.groups:
+            required, fade_cycles = cycle_requirements([group])
+            if required is not None and fade_cycles is not None and max(required, default=-1) < self.retain \
+                    and fade_cycles <= self.retain:
+                fixed.add(group[0])
+        return fixed
+
+    def features(self):
+        """按当前已输入的周期计算全部特征，返回 (特征列表, 循环寿命标签)；周期数不足时返回 (None, None)"""
+        if not self.ready:
+            return None, None
+        cached = {}
+        if len(self.view) >= self.retain:
+            if not self._frozen:
+                fixed = self._fixed_groups()
+                groups = [group for group in self.groups if group[0] in fixed]
+                self._frozen = compute_groups(self.canonical, groups)
+            cached = self._frozen
+        results = compute_groups(self.canonical, self.groups, cached)
+        return merge_groups(results, self.groups, quiet=True), len(self.view)
+
+
+class ChannelMonitor:
+    """同时跟踪多个通道的在线特征，每个通道一个IncrementalFeatureExtractor"""
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.channels = {}
+
+    def add_cycle(self, channel, cycle, battery_info=None):
+        """向通道输入一个周期，通道第一次出现时创建提取器，返回该通道的提取器"""
+        extractor = self.channels.get(channel)
+        if extractor is None:
+            extractor = IncrementalFeatureExtractor(self.groups, battery_info)
+            self.channels[channel] = extractor
+        extractor.add_cycle(cycle)
+        return extractor
+
+    def ready_channels(self):
+        return [channel for channel, extractor in self.channels.items() if extractor.ready]
+
+    def features(self, channel):
+        return self.channels[channel].features()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐个周期回放电池文件，演示在线特征提取")
+    parser.add_argument("file", help="电池pkl文件")
+    parser.add_argument("--format", choices=['isu', 'matr'], default='isu', help="数据集格式")
+    args = parser.parse_args()
+
+    if args.format == 'isu':
+        from isu_all_features import ISU_FEATURE_GROUPS as groups
+    else:
+        from matr_all_features import MATR_FEATURE_GROUPS as groups
+
+    with open(args.file, 'rb') as f:
+        battery = pickle.load(f)
+
+    extractor = IncrementalFeatureExtractor(groups, battery)
+    for cycle in battery.get('cycle_data', []):
+        extractor.add_cycle(cycle)
+        if len(extractor) == MIN_CYCLES:
+            features, _ = extractor.features()
+            print(f"{os.path.basename(args.file)}: 第{MIN_CYCLES}个周期到达，已可计算 {len(features)} 个特征")
+    features, label = extractor.features()
+    print(f"共 {label} 个周期，最大容量 {extractor.max_capacity} 出现在第 {extractor.max_capacity_cycle} 个周期")
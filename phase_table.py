@@ -0,0 +1,92 @@
+import numpy as np
+
+# 阶段编号
+PHASE_REST = 0
+PHASE_CC_CHARGE = 1
+PHASE_CV_CHARGE = 2
+PHASE_DISCHARGE = 3
+
+PHASE_NAMES = {
+    PHASE_REST: 'rest',
+    PHASE_CC_CHARGE: 'cc_charge',
+    PHASE_CV_CHARGE: 'cv_charge',
+    PHASE_DISCHARGE: 'discharge',
+}
+
+
+def find_cv_start(charge_current):
+    """在充电段电流中定位CC→CV转换点（充电样本内的位置）
+
+    以电流跳变超过0.5倍标准差的第一个点作为CV起点；找不到合适的跳变时取充电段中点。
+    充电样本不超过10个时无法划分，返回None。
+    """
+    if len(charge_current) <= 10:
+        return None
+
+    current_diff = np.abs(np.diff(charge_current))
+    threshold = np.std(charge_current) * 0.5
+    jumps = np.flatnonzero(current_diff > threshold)
+    cv_start = jumps[0] + 1 if len(jumps) > 0 else 0
+
+    if 0 < cv_start < len(charge_current) - 1:
+        return int(cv_start)
+    # 简单分割：前半段CC，后半段CV
+    return len(charge_current) // 2
+
+
+class PhaseTable:
+    """单个周期的阶段表：按电流符号一次性划分静置/CC充电/CV充电/放电，并以游程形式记录各段起止索引
+
+    charge_indices / discharge_indices 为电流>0 / <0 的样本索引；
+    cv_start 为CV段在充电样本中的起始位置（无法划分时为None，此时充电样本全部记为CC段）；
+    starts / ends / phases 为游程编码的阶段表，第k段覆盖 [starts[k], ends[k])。
+    """
+
+    def __init__(self, current):
+        current = np.asarray(current)
+        n = len(current)
+
+        self.charge_indices = np.flatnonzero(current > 0)
+        self.discharge_indices = np.flatnonzero(current < 0)
+        self.cv_start = find_cv_start(current[self.charge_indices])
+
+        labels = np.full(n, PHASE_REST, dtype=np.int8)
+        labels[self.discharge_indices] = PHASE_DISCHARGE
+        labels[self.charge_indices] = PHASE_CC_CHARGE
+        if self.cv_start is not None:
+            labels[self.charge_indices[self.cv_start:]] = PHASE_CV_CHARGE
+        self.labels = labels
+
+        # 游程编码：标签变化处即为阶段边界
+        if n > 0:
+            change = np.flatnonzero(np.diff(labels)) + 1
+            self.starts = np.concatenate(([0], change))
+            self.ends = np.concatenate((change, [n]))
+        else:
+            self.starts = np.empty(0, dtype=np.intp)
+            self.ends = np.empty(0, dtype=np.intp)
+        self.phases = labels[self.starts]
+
+    @property
+    def cc_indices(self):
+        """CC充电段样本索引"""
+        if self.cv_start is None:
+            return self.charge_indices
+        return self.charge_indices[:self.cv_start]
+
+    @property
+    def cv_indices(self):
+        """CV充电段样本索引"""
+        if self.cv_start is None:
+            return self.charge_indices[:0]
+        return self.charge_indices[self.cv_start:]
+
+    def segments(self, phase):
+        """返回某一阶段所有连续段的 (起始索引, 结束索引) 列表，结束索引不包含在内"""
+        mask = self.phases == phase
+        return list(zip(self.starts[mask].tolist(), self.ends[mask].tolist()))
+
+    def first_phase(self):
+        """周期内第一个非静置阶段，全为静置时返回PHASE_REST"""
+        active = self.phases[self.phases != PHASE_REST]
+        return int(active[0]) if len(active) > 0 else PHASE_REST
@@ -0,0 +1,43 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 预读文件时每次读取的块大小
+READ_BLOCK_BYTES = 1 << 20
+
+
+def prefetch(items, load, depth=2):
+    """在后台线程中提前调用load(item)，按items的顺序产出 (item, future)
+
+    处理当前项时后面最多depth项已提交给读取线程，读完的结果留在内存中等待取用，
+    depth限制了同时驻留内存的预读结果数（背压）。读取线程只有一个，文件按顺序读取。
+    调用方提前停止迭代时，未开始的读取被取消，已开始的读取完成后丢弃。
+    """
+    window = deque()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            for item in items:
+                window.append((item, executor.submit(load, item)))
+                if len(window) > depth:
+                    yield window.popleft()
+            while window:
+                yield window.popleft()
+        finally:
+            for _, future in window:
+                future.cancel()
+
+
+def warm_file(path):
+    """顺序读一遍文件（列式存储目录为其中全部文件）并丢弃内容，使之后的读取命中操作系统页缓存"""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(root, name) for root, _, names in os.walk(path) for name in sorted(names)]
+    total = 0
+    for file_path in paths:
+        with open(file_path, 'rb', buffering=0) as f:
+            while True:
+                block = f.read(READ_BLOCK_BYTES)
+                if not block:
+                    break
+                total += len(block)
+    return total
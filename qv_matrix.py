@@ -0,0 +1,126 @@
+import numpy as np
+
+# 默认电压网格点数，与MATR的Qdlin一致
+QV_GRID_POINTS = 1000
+
+# 固定电压网格的范围(V)：ISU电池的放电电压窗口，与MATR的Qdlin（3.5V到2V）一样从高到低排列
+QV_VOLTAGE_HIGH = 4.2
+QV_VOLTAGE_LOW = 3.0
+
+
+def discharge_qv_points(view, cycle_idx):
+    """单个周期放电段的Q-V采样点 (电压, 放电容量)，保持采样顺序；有效点不足2个时返回None
+
+    只保留容量>0且电压、容量均为有限值的点；排序在interp_curves中对全部周期一次完成。
+    """
+    voltage = view.array(cycle_idx, 'voltage_in_V')
+    discharge_capacity = view.array(cycle_idx, 'discharge_capacity_in_Ah')
+    current = view.array(cycle_idx, 'current_in_A')
+    if len(voltage) == 0 or len(current) == 0 or len(discharge_capacity) == 0:
+        return None
+
+    discharge_indices = view.phases(cycle_idx).discharge_indices
+    if len(discharge_indices) < 2:
+        return None
+    discharge_voltage = voltage[discharge_indices]
+    discharge_cap = discharge_capacity[discharge_indices]
+
+    valid_mask = (discharge_cap > 0) & np.isfinite(discharge_voltage) & np.isfinite(discharge_cap)
+    if np.sum(valid_mask) < 2:
+        return None
+    return discharge_voltage[valid_mask], discharge_cap[valid_mask]
+
+
+def voltage_grid(n_points=QV_GRID_POINTS):
+    """Q(V)矩阵的固定电压网格：QV_VOLTAGE_HIGH到QV_VOLTAGE_LOW的n_points个等距点，从高到低"""
+    return np.linspace(QV_VOLTAGE_HIGH, QV_VOLTAGE_LOW, n_points)
+
+
+def interp_curves(curves, grid):
+    """把若干条Q-V曲线一次插值到同一电压网格上，每条曲线一行
+
+    曲线为 (电压, 放电容量) 采样点（discharge_qv_points的结果，不要求有序），网格须单调（升序或降序）；
+    网格点超出该曲线电压范围处为NaN，无效曲线（None）为NaN行。
+    各曲线首尾拼接后一次排序，网格点在各曲线中的位置（即 np.searchsorted(电压, 网格, side='right')）由
+    采样点落入网格区间的计数累加得到，之后按所在线段线性插值，全部曲线没有逐条循环。
+    结果与对每条按电压稳定排序后的曲线调用np.interp相同，包括网格点恰好等于重复电压的情况
+    （如放电在截止电压停留多个采样点）：此时与np.interp一样取电压相同的最后一个采样点的容量。
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    matrix = np.full((len(curves), len(grid)), np.nan)
+    valid = [row for row, curve in enumerate(curves) if curve is not None]
+    if not valid or len(grid) == 0:
+        return matrix
+
+    lengths = np.array([len(curves[row][0]) for row in valid], dtype=np.int64)
+    offsets = np.zeros(len(valid) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    x = np.concatenate([np.asarray(curves[row][0], dtype=np.float64) for row in valid])
+    y = np.concatenate([np.asarray(curves[row][1], dtype=np.float64) for row in valid])
+
+    # 各曲线内按电压稳定排序（电压相同的点保持采样顺序）
+    n_curves, n_grid = len(valid), len(grid)
+    curve_ids = np.repeat(np.arange(n_curves), lengths)
+    order = np.lexsort((x, curve_ids))
+    x = x[order]
+    y = y[order]
+
+    # 每个网格点在所属曲线中的位置 searchsorted(side='right') 即该曲线中电压不大于它的采样点数：
+    # 把采样点按电压落入升序网格的区间计数（区间k为 网格[k-1] < 电压 <= 网格[k]），再沿网格累加
+    descending = n_grid > 1 and grid[0] > grid[-1]
+    ascending = grid[::-1] if descending else grid
+    bins = np.searchsorted(ascending, x, side='left')
+    counts = np.bincount(curve_ids * (n_grid + 1) + bins, minlength=n_curves * (n_grid + 1))
+    idx = np.cumsum(counts.reshape(n_curves, n_grid + 1)[:, :n_grid], axis=1)
+
+    # 线段左端点为电压不大于网格点的最后一个采样点，限制在[0, 点数-2]；lo为其在拼接数组中的下标。
+    # 未被限制时 x[lo] <= 网格点 < x[lo+1]，线段宽度为正；电压相同的零宽线段只可能在网格点恰好等于
+    # 端点电压时被选中，这两种情况直接取端点的容量，不做插值
+    np.clip(idx - 1, 0, lengths[:, None] - 2, out=idx)
+    lo = idx + offsets[:-1, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 各线段斜率只算一次；跨曲线的线段和零宽线段的结果不会被用到
+        slope = np.diff(y) / np.diff(x)
+        rows = slope[lo] * (ascending - x[lo]) + y[lo]
+    rows = np.where(x[lo] == ascending, y[lo], rows)
+    rows = np.where(x[lo + 1] == ascending, y[lo + 1], rows)
+
+    outside = (ascending < x[offsets[:-1]][:, None]) | (ascending > x[offsets[1:] - 1][:, None])
+    rows[outside] = np.nan
+    if descending:
+        rows = rows[:, ::-1]
+    matrix[valid] = rows
+    return matrix
+
+
+def qv_rows(view, cycle_indices, n_points=QV_GRID_POINTS):
+    """Q(V)矩阵中指定周期的行，返回 len(cycle_indices)×n_points 数组
+
+    每行为该周期放电容量在固定电压网格（voltage_grid）上的插值，相当于MATR的Qdlin；
+    超出该周期放电电压范围的网格点为NaN，没有有效放电曲线的周期为NaN行。
+    各行按周期缓存在周期视图上，尚未计算的周期一次批量插值；只读取所需的周期。
+    """
+    rows = view.derived(('qv_rows', n_points), dict)
+    missing = sorted({cycle_idx for cycle_idx in cycle_indices if cycle_idx not in rows})
+    if missing:
+        curves = [discharge_qv_points(view, cycle_idx) for cycle_idx in missing]
+        for cycle_idx, row in zip(missing, interp_curves(curves, voltage_grid(n_points))):
+            rows[cycle_idx] = row
+    matrix = np.empty((len(cycle_indices), n_points))
+    for k, cycle_idx in enumerate(cycle_indices):
+        matrix[k] = rows[cycle_idx]
+    return matrix
+
+
+def qv_matrix(view, n_points=QV_GRID_POINTS):
+    """整颗电池全部周期的Q(V)矩阵，返回 (矩阵, 电压网格)"""
+    return qv_rows(view, range(len(view)), n_points), voltage_grid(n_points)
+
+
+def delta_q(view, cycle_j, cycle_i, n_points=QV_GRID_POINTS):
+    """ΔQ_{j-i}(V)：第cycle_j次与第cycle_i次循环（从1开始计数）Q(V)矩阵的行差，返回 (ΔQ, 电压网格)
+
+    任一周期的电压范围未覆盖的网格点为NaN；只读取这两个周期。
+    """
+    q_i, q_j = qv_rows(view, [cycle_i - 1, cycle_j - 1], n_points)
+    return q_j - q_i, voltage_grid(n_points)
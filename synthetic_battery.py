@@ -0,0 +1,173 @@
+import os
+import pickle
+import argparse
+import numpy as np
+
+# 各数据集的电池参数：电压窗口(V)、标称容量(Ah)、充放电倍率(C)
+CELL_PROFILES = {
+    'isu': {'v_max': 4.2, 'v_min': 3.0, 'nominal_capacity': 0.25, 'charge_c_rate': 1.0, 'discharge_c_rate': 1.0},
+    'matr': {'v_max': 3.6, 'v_min': 2.0, 'nominal_capacity': 1.1, 'charge_c_rate': 4.0, 'discharge_c_rate': 4.0},
+}
+
+# MATR的Qdlin：放电容量在3.5V到2.0V之间1000个等距电压点上的插值
+QDLIN_VOLTAGES = np.linspace(3.5, 2.0, 1000)
+
+# 一个周期内各阶段占的采样点比例：静置、恒流充电、恒压充电、静置、恒流放电、静置
+PHASE_FRACTIONS = (0.05, 0.30, 0.20, 0.05, 0.35, 0.05)
+
+# 静置阶段时长(s)
+REST_SECONDS = 600.0
+
+
+def capacity_fade(n_cycles, nominal_capacity, linear_fade=2e-4, knee_cycle=None, knee_fade=2e-6):
+    """各周期的实际容量：线性衰减，knee_cycle之后叠加二次加速衰减（拐点）"""
+    k = np.arange(n_cycles)
+    if knee_cycle is None:
+        knee_cycle = int(0.7 * n_cycles)
+    fade = linear_fade * k + knee_fade * np.maximum(k - knee_cycle, 0) ** 2
+    return nominal_capacity * np.maximum(1 - fade, 0.05)
+
+
+def _phase_sizes(samples):
+    sizes = [max(2, int(round(samples * frac))) for frac in PHASE_FRACTIONS]
+    # 多出或不足的点放在放电阶段
+    sizes[4] = max(2, sizes[4] + samples - sum(sizes))
+    return sizes
+
+
+def make_cycle(cycle_idx, capacity, samples, profile, rng, t_start=0.0, fmt='isu', noise=1.0):
+    """生成一个“静置-恒流充电-恒压充电-静置-恒流放电-静置”周期，返回 (周期字典, 下一周期起始时间s)
+
+    电流充电为正、放电为负；充放电容量由电流对时间积分得到，与电流、时间保持一致。
+    """
+    v_max, v_min = profile['v_max'], profile['v_min']
+    v_range = v_max - v_min
+    i_charge = profile['charge_c_rate'] * profile['nominal_capacity']
+    i_discharge = profile['discharge_c_rate'] * profile['nominal_capacity']
+    n_rest1, n_cc, n_cv, n_rest2, n_dis, n_rest3 = _phase_sizes(samples)
+
+    # 各阶段时长：恒流充入80%容量，恒压电流指数衰减充入其余20%，恒流放出全部容量
+    cc_seconds = 0.8 * capacity / i_charge * 3600
+    cv_seconds = 0.2 * capacity / (i_charge * (1 - np.exp(-4)) / 4) * 3600
+    dis_seconds = capacity / i_discharge * 3600
+
+    def phase_time(n, seconds):
+        return np.full(n, seconds / n)
+
+    dt = np.concatenate([phase_time(n_rest1, REST_SECONDS), phase_time(n_cc, cc_seconds),
+                         phase_time(n_cv, cv_seconds), phase_time(n_rest2, REST_SECONDS),
+                         phase_time(n_dis, dis_seconds), phase_time(n_rest3, REST_SECONDS)])
+
+    def ramp(n):
+        return np.linspace(0, 1, n)
+
+    v_rest = v_min + 0.3 * v_range
+    current = np.concatenate([
+        np.zeros(n_rest1),
+        np.full(n_cc, i_charge) + rng.normal(0, 0.002 * i_charge * noise, n_cc),
+        i_charge * np.exp(-4 * ramp(n_cv)),
+        np.zeros(n_rest2),
+        np.full(n_dis, -i_discharge) + rng.normal(0, 0.002 * i_discharge * noise, n_dis),
+        np.zeros(n_rest3),
+    ])
+    v_relaxed = v_max - 0.05 * v_range
+    # 放电电压：欧姆压降后缓慢下降，接近放电末端时快速跌落到截止电压
+    v_dis_start = v_relaxed - 0.05 * v_range
+    x_dis = ramp(n_dis)
+    discharge_voltage = v_dis_start - (v_dis_start - v_min) * (0.3 * x_dis + 0.7 * x_dis ** 6)
+    voltage = np.concatenate([
+        np.full(n_rest1, v_rest),
+        v_rest + (v_max - v_rest) * ramp(n_cc) ** 0.6,
+        np.full(n_cv, v_max),
+        v_max - (v_max - v_relaxed) * (1 - np.exp(-5 * ramp(n_rest2))),
+        discharge_voltage,
+        v_min + 0.15 * v_range * (1 - np.exp(-5 * ramp(n_rest3))),
+    ]) + rng.normal(0, 1e-4 * noise, len(dt))
+
+    dq = current * dt / 3600
+    charge_capacity = np.cumsum(np.where(current > 0, dq, 0))
+    discharge_capacity = np.cumsum(np.where(current < 0, -dq, 0))
+    time_s = t_start + np.concatenate([[0.0], np.cumsum(dt[:-1])])
+
+    cycle = {
+        'cycle_number': cycle_idx + 1,
+        'current_in_A': current.tolist(),
+        'voltage_in_V': voltage.tolist(),
+        'charge_capacity_in_Ah': charge_capacity.tolist(),
+        'discharge_capacity_in_Ah': discharge_capacity.tolist(),
+        'temperature_in_C': None,
+        'internal_resistance_in_ohm': None,
+    }
+    if fmt == 'isu':
+        # ISU的时间戳为纳秒整数
+        cycle['time_in_s'] = (time_s * 1e9).astype(np.int64).tolist()
+    else:
+        cycle['time_in_s'] = time_s.tolist()
+        # 放电时温度随电流发热上升，静置时回落
+        heat = np.cumsum(np.abs(current) * dt) / max(np.sum(np.abs(current) * dt), 1e-12)
+        temperature = 30 + 3 * np.sin(np.pi * heat) + rng.normal(0, 0.1 * noise, len(dt))
+        cycle['temperature_in_C'] = temperature.tolist()
+        # 放电段按未加噪声的电压插值到Qdlin电压网格（np.interp要求横坐标升序）
+        dis = slice(n_rest1 + n_cc + n_cv + n_rest2, n_rest1 + n_cc + n_cv + n_rest2 + n_dis)
+        dis_capacity = discharge_capacity[dis]
+        qdlin = np.interp(QDLIN_VOLTAGES[::-1], discharge_voltage[::-1], dis_capacity[::-1])[::-1]
+        cycle['Qdlin'] = qdlin.tolist()
+    return cycle, time_s[-1] + dt[-1]
+
+
+def make_battery(fmt='isu', n_cycles=150, samples_per_cycle=300, seed=0, knee_cycle=None, noise=1.0):
+    """生成一颗与ISU/MATR数据集结构相同的合成电池（字典，cycle_data为周期字典列表）
+
+    每个周期的采样点数在samples_per_cycle上下随机浮动约5%；seed相同时结果完全相同。
+    """
+    if fmt not in CELL_PROFILES:
+        raise ValueError(f"未知的数据集格式: {fmt}，可选 {list(CELL_PROFILES)}")
+    profile = CELL_PROFILES[fmt]
+    rng = np.random.default_rng(seed)
+    capacities = capacity_fade(n_cycles, profile['nominal_capacity'], knee_cycle=knee_cycle)
+    capacities = capacities * (1 + rng.normal(0, 1e-3 * noise, n_cycles))
+
+    # ISU时间戳从Unix时间开始，MATR从0开始
+    t = 1.6e9 if fmt == 'isu' else 0.0
+    jitter = max(1, samples_per_cycle // 20)
+    cycle_data = []
+    for cycle_idx in range(n_cycles):
+        samples = max(40, samples_per_cycle + int(rng.integers(-jitter, jitter + 1)))
+        cycle, t = make_cycle(cycle_idx, capacities[cycle_idx], samples, profile, rng, t, fmt, noise)
+        cycle_data.append(cycle)
+
+    prefix = 'ISU-ILCC' if fmt == 'isu' else 'MATR'
+    return {
+        'cell_id': f'{prefix}_synthetic_{seed}',
+        'cycle_data': cycle_data,
+        'nominal_capacity_in_Ah': profile['nominal_capacity'],
+    }
+
+
+def write_dataset(output_dir, fmt='isu', n_batteries=4, n_cycles=150, samples_per_cycle=300, seed=0):
+    """生成若干颗合成电池并保存为pkl文件，目录结构与data/ISU_ILCC、data/MATR相同，返回文件路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(n_batteries):
+        # 周期数错开，使各电池寿命不同
+        battery = make_battery(fmt, n_cycles + 10 * i, samples_per_cycle, seed=seed + i)
+        path = os.path.join(output_dir, f"{battery['cell_id']}.pkl")
+        with open(path, 'wb') as f:
+            pickle.dump(battery, f)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成与ISU/MATR结构相同的合成电池数据")
+    parser.add_argument("--format", choices=sorted(CELL_PROFILES), default="isu", help="数据集格式")
+    parser.add_argument("--output", default=None, help="输出目录，默认 data_synthetic/ISU_ILCC 或 data_synthetic/MATR")
+    parser.add_argument("--batteries", type=int, default=4, help="电池数")
+    parser.add_argument("--cycles", type=int, default=150, help="每颗电池的周期数")
+    parser.add_argument("--samples", type=int, default=300, help="每个周期的采样点数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join("data_synthetic", "ISU_ILCC" if args.format == 'isu' else "MATR")
+    paths = write_dataset(output_dir, args.format, args.batteries, args.cycles, args.samples, args.seed)
+    print(f"已生成 {len(paths)} 个合成电池文件到 {output_dir}")